@@ -0,0 +1,176 @@
+"""
+Admission control: per-session and per-client rate limits plus load shedding.
+
+Every HTTP request is checked before it is routed:
+
+1. token buckets per session and per client address, kept separately for
+   each priority class so a chat flood cannot spend a client's booking budget;
+   an empty bucket answers 429 with ``Retry-After`` set to when the next token
+   is due;
+2. a global cap on requests in flight. Priority routes (``/book`` by default)
+   may use the whole cap; every other route stops at the cap minus a reserve,
+   so bookings still get in while ``/chat`` and ``/events`` are saturated.
+   Requests beyond the cap are answered 503 with ``Retry-After`` at once
+   instead of queueing behind the ones already running.
+
+The session is read from the ``X-Session-Id`` header, the ``session_id``
+query parameter or, for small JSON POST bodies, the ``session_id`` field.
+Limits are per worker process. WebSocket connections are not limited.
+"""
+
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from metrics import ADMISSION_REJECTED
+from serialization import dumps
+from session_store import ANONYMOUS_SESSION_ID
+
+# Largest request body read to find a session id; bigger bodies are only
+# limited per client
+MAX_SNIFF_BYTES = 16 * 1024
+
+# Routes that are never limited, so health checks and scrapes work under load
+EXEMPT_PATHS = frozenset({"/", "/metrics"})
+
+SESSION_ID_PATTERN = re.compile(rb'"session_id"\s*:\s*"((?:[^"\\]|\\.){1,256})"')
+
+
+class TokenBuckets:
+    """Bounded map of key -> token bucket refilling at ``rate`` per second up to ``burst``"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        # key -> [tokens, time of last refill]; least recently used first
+        self._buckets: "OrderedDict[Tuple, List[float]]" = OrderedDict()
+
+    def take(self, key: Tuple, now: Optional[float] = None) -> float:
+        """Spend a token for ``key``; 0.0 if there was one, else seconds until the next"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                # A forgotten key starts again with a full bucket
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying rate limits and a prioritised in-flight cap"""
+
+    def __init__(
+        self,
+        app,
+        max_in_flight: int = 0,
+        priority_reserve: Optional[int] = None,
+        priority_paths: Iterable[str] = ("/book",),
+        session_rate: float = 0.0,
+        session_burst: Optional[float] = None,
+        client_rate: float = 0.0,
+        client_burst: Optional[float] = None,
+        shed_retry_after_seconds: int = 1
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        reserve = max_in_flight // 4 if priority_reserve is None else priority_reserve
+        # In-flight limit for routes without priority; 0 or less means no cap
+        self.normal_in_flight = max(max_in_flight - reserve, 1) if max_in_flight > 0 else 0
+        self.priority_paths = frozenset(priority_paths)
+        self.session_buckets = TokenBuckets(session_rate, session_burst or 2 * session_rate) if session_rate > 0 else None
+        self.client_buckets = TokenBuckets(client_rate, client_burst or 2 * client_rate) if client_rate > 0 else None
+        self.shed_retry_after_seconds = shed_retry_after_seconds
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        priority = "priority" if scope["path"] in self.priority_paths else "normal"
+        limit = self.max_in_flight if priority == "priority" else self.normal_in_flight
+        # Shed first: it costs nothing, while finding the session may read the body
+        if limit and self.in_flight >= limit:
+            await self._reject(send, priority, "overloaded", 503, self.shed_retry_after_seconds)
+            return
+
+        if self.client_buckets is not None:
+            client = scope.get("client")
+            wait = self.client_buckets.take((priority, client[0] if client else ""))
+            if wait:
+                await self._reject(send, priority, "client_rate", 429, wait)
+                return
+        if self.session_buckets is not None:
+            session_id, receive = await self._session_id(scope, receive)
+            if session_id is not None and session_id != ANONYMOUS_SESSION_ID:
+                wait = self.session_buckets.take((priority, session_id))
+                if wait:
+                    await self._reject(send, priority, "session_rate", 429, wait)
+                    return
+
+        # Checked again: reading the body may have let other requests in
+        if limit and self.in_flight >= limit:
+            await self._reject(send, priority, "overloaded", 503, self.shed_retry_after_seconds)
+            return
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _session_id(self, scope, receive):
+        """Session id of the request, and a receive callable that replays any body read"""
+        headers = dict(scope["headers"])
+        session_id = headers.get(b"x-session-id")
+        if session_id:
+            return session_id.decode("latin-1"), receive
+        if scope["query_string"]:
+            values = parse_qs(scope["query_string"].decode("latin-1")).get("session_id")
+            if values:
+                return values[0], receive
+        if (scope["method"] != "POST"
+                or not headers.get(b"content-type", b"").startswith(b"application/json")
+                or not headers.get(b"content-length", b"").isdigit()
+                or int(headers[b"content-length"]) > MAX_SNIFF_BYTES):
+            return None, receive
+
+        messages = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            more_body = message.get("more_body", False)
+        body = b"".join(message.get("body", b"") for message in messages)
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+
+        match = SESSION_ID_PATTERN.search(body)
+        return (match.group(1).decode("utf-8", "replace") if match else None), replay
+
+    async def _reject(self, send, priority: str, reason: str, status: int, retry_after: float):
+        ADMISSION_REJECTED.inc(priority, reason)
+        body = dumps({"detail": "Too many requests" if status == 429 else "Server is busy, try again shortly"})
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -3,24 +3,82 @@ AI Booking Agent for processing chat messages and handling appointment bookings.
 """
 
 import logging
-import re
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+from availability import next_boundary
+from datetime_resolver import DateTimeResolver, ResolvedDateTime
+from intent_engine import IntentClassifier
+from llm_fallback import Extraction
+from metrics import CHAT_INTENTS
+from suggestions import format_slot
 
 logger = logging.getLogger(__name__)
 
+# Placeholder put in a reply by the handlers; the suggested times are looked up
+# once the message text is ready so streaming clients can show it first
+PENDING_SUGGESTIONS = object()
+
+class StaticReply(dict):
+    """A reply that only changes with the service catalog
+
+    Built once per catalog and returned to every caller, so it must not be
+    mutated. ``body`` caches its serialized HTTP response for the app.
+    """
+    __slots__ = ("body",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.body: Optional[bytes] = None
+
 class BookingAgent:
     """AI agent for handling booking conversations and appointments"""
 
-    def __init__(self, calendar_service=None):
-        """Initialize BookingAgent with optional calendar service"""
+    def __init__(self, calendar_service=None, suggestion_table=None, llm_fallback=None):
+        """Initialize BookingAgent with optional calendar service, suggested-times table and LLM fallback"""
         self.calendar_service = calendar_service
+        self.suggestion_table = suggestion_table
+        # Asked about messages the keyword rules leave as "general"
+        self.llm_fallback = llm_fallback
         self.services = {
             "haircut": {"duration": 60, "name": "Haircut"},
             "styling": {"duration": 90, "name": "Hair Styling"},
             "coloring": {"duration": 120, "name": "Hair Coloring"},
             "consultation": {"duration": 30, "name": "Consultation"}
         }
+        self.intent_classifier = IntentClassifier()
+        self.datetime_resolver = DateTimeResolver()
+
+    @property
+    def services(self) -> Dict[str, Dict[str, Any]]:
+        """Service catalog; assign a new dict to change it and rebuild the static replies"""
+        return self._services
+
+    @services.setter
+    def services(self, services: Dict[str, Dict[str, Any]]):
+        self._services = services
+        self.static_replies = self._build_static_replies()
+
+    def _build_static_replies(self) -> Dict[str, StaticReply]:
+        """Replies that depend on nothing but the catalog, keyed by intent"""
+        services_text = "\n".join(
+            f"• {service['name']} ({service['duration']} minutes)" for service in self._services.values()
+        )
+        messages = {
+            "service_information": f"Here are our available services:\n\n{services_text}\n\nWould you like to book any of these services?",
+            "greeting": "Hello! Welcome to TailorTalk. I'm here to help you book appointments for our salon services. How can I assist you today?",
+            "general": "I'm here to help you with booking appointments and information about our services. Would you like to book an appointment or learn about our services?",
+        }
+        return {
+            intent: StaticReply(
+                message=message,
+                intent=intent,
+                booking_data=None,
+                suggested_times=[],
+                requires_confirmation=False
+            )
+            for intent, message in messages.items()
+        }
 
     async def process_message(
         self,
@@ -31,24 +89,74 @@ class BookingAgent:
         """
         Process user message and determine intent and response
         """
+        response = await self._respond(message, session_id, conversation_history)
+        CHAT_INTENTS.inc(response["intent"])
+        if response["suggested_times"] is PENDING_SUGGESTIONS:
+            try:
+                response["suggested_times"] = await self._resolve_suggested_times(response)
+            except Exception as e:
+                logger.error(f"Error resolving suggested times: {e}")
+                response["suggested_times"] = []
+        return response
+
+    async def stream_message(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Process user message, yielding (event, data) pairs as parts of the reply resolve:
+        the message text first, then booking_data, then suggested_times.
+        """
+        response = await self._respond(message, session_id, conversation_history)
+        CHAT_INTENTS.inc(response["intent"])
+        yield "message", {
+            "message": response["message"],
+            "intent": response["intent"],
+            "requires_confirmation": response["requires_confirmation"]
+        }
+        yield "booking_data", response["booking_data"]
+
+        suggested_times = response["suggested_times"]
+        if suggested_times is PENDING_SUGGESTIONS:
+            try:
+                suggested_times = await self._resolve_suggested_times(response)
+            except Exception as e:
+                logger.error(f"Error resolving suggested times: {e}")
+                suggested_times = []
+        yield "suggested_times", suggested_times
+
+    async def _respond(
+        self,
+        message: str,
+        session_id: Optional[str],
+        conversation_history: Optional[List[Dict]]
+    ) -> Dict[str, Any]:
+        """Build the reply for a message, leaving suggested times pending"""
         try:
-            message_lower = message.lower().strip()
+            intent = self.intent_classifier.classify(message)
+            hints = None
+            if intent == self.intent_classifier.default_intent and self.llm_fallback is not None:
+                hints = await self.llm_fallback.extract(message)
+                if hints is not None:
+                    intent = hints.intent
 
             # Detect booking intent
-            if self._is_booking_request(message_lower):
-                return await self._handle_booking_request(message, session_id)
+            if intent == "booking":
+                return await self._handle_booking_request(message, session_id, conversation_history, hints)
 
             # Detect availability inquiry
-            elif self._is_availability_request(message_lower):
-                return await self._handle_availability_request(message, session_id)
+            elif intent == "availability":
+                return await self._handle_availability_request(message, session_id, hints)
 
             # Detect service inquiry
-            elif self._is_service_inquiry(message_lower):
+            elif intent == "service":
                 return await self._handle_service_inquiry(message, session_id)
 
             # General greeting or conversation
             else:
-                return await self._handle_general_conversation(message, session_id)
+                return await self._handle_general_conversation(message, session_id, intent)
 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
@@ -62,54 +170,80 @@ class BookingAgent:
 
     def _is_booking_request(self, message: str) -> bool:
         """Check if message contains booking intent"""
-        booking_keywords = [
-            "book", "schedule", "appointment", "reserve", "make an appointment",
-            "i want to book", "can i book", "schedule me", "i need"
-        ]
-        return any(keyword in message for keyword in booking_keywords)
+        return self.intent_classifier.matches(message)["booking"]
 
     def _is_availability_request(self, message: str) -> bool:
         """Check if message is asking about availability"""
-        availability_keywords = [
-            "available", "free", "open", "when can", "what times",
-            "availability", "slots", "schedule"
-        ]
-        return any(keyword in message for keyword in availability_keywords)
+        return self.intent_classifier.matches(message)["availability"]
 
     def _is_service_inquiry(self, message: str) -> bool:
         """Check if message is asking about services"""
-        service_keywords = [
-            "service", "what do you offer", "price", "cost", "how much",
-            "services", "haircut", "styling", "coloring"
-        ]
-        return any(keyword in message for keyword in service_keywords)
+        return self.intent_classifier.matches(message)["service"]
 
-    async def _handle_booking_request(self, message: str, session_id: str) -> Dict[str, Any]:
+    async def _handle_booking_request(
+        self,
+        message: str,
+        session_id: str,
+        conversation_history: Optional[List[Dict]] = None,
+        hints: Optional[Extraction] = None
+    ) -> Dict[str, Any]:
         """Handle booking request messages"""
 
-        # Extract service type if mentioned
-        service_type = self._extract_service_type(message)
+        # Extract service type if mentioned, falling back to the model's
+        # reading of the message and then to earlier turns
+        service_type = (
+            self._extract_service_type(message)
+            or self._service_from_hints(hints)
+            or self._service_from_history(conversation_history)
+        )
 
         # Extract date/time if mentioned
-        date_time_info = self._extract_datetime_info(message)
-
-        if service_type and date_time_info:
+        duration = self._service_duration(service_type)
+        date_time_info = self._extract_datetime_info(message, duration) or self._datetime_from_hints(hints, duration)
+
+        if service_type and date_time_info and date_time_info.exact_time:
+            booking_data = {
+                "service_type": service_type,
+                "preferred_time": date_time_info.description,
+                "title": f"{service_type} appointment",
+                "start_time": date_time_info.start.isoformat(),
+                "end_time": date_time_info.end.isoformat()
+            }
+            free_slots = await self._find_free_slots(date_time_info.start, date_time_info.end, duration)
+            if free_slots is not None and not free_slots:
+                alternatives = await self._find_alternatives(date_time_info.start, date_time_info.end)
+                return {
+                    "message": f"Sorry, {date_time_info.description} is already taken. Would one of these times work for your {service_type} appointment instead?",
+                    "intent": "booking_slot_taken",
+                    "booking_data": {"service_type": service_type},
+                    "suggested_times": [self._format_slot(slot["start"]) for slot in alternatives],
+                    "requires_confirmation": False
+                }
             return {
-                "message": f"Great! I can help you book a {service_type} appointment. Let me check availability for {date_time_info}.",
+                "message": f"Great! {date_time_info.description} is available for your {service_type} appointment. Shall I book it?",
                 "intent": "booking_with_details",
+                "booking_data": booking_data,
+                "suggested_times": [],
+                "requires_confirmation": True
+            }
+        elif service_type and date_time_info:
+            free_slots = await self._find_free_slots(date_time_info.start, date_time_info.end, duration)
+            return {
+                "message": f"Great! I can help you book a {service_type} appointment. Here are the open times for {date_time_info.description}.",
+                "intent": "booking_needs_time",
                 "booking_data": {
                     "service_type": service_type,
-                    "preferred_time": date_time_info
+                    "preferred_time": date_time_info.description
                 },
-                "suggested_times": [],
-                "requires_confirmation": True
+                "suggested_times": self._format_slots(free_slots) if free_slots is not None else PENDING_SUGGESTIONS,
+                "requires_confirmation": False
             }
         elif service_type:
             return {
                 "message": f"I'd be happy to book a {service_type} appointment for you! When would you prefer to come in?",
                 "intent": "booking_needs_time",
                 "booking_data": {"service_type": service_type},
-                "suggested_times": self._get_suggested_times(),
+                "suggested_times": PENDING_SUGGESTIONS,
                 "requires_confirmation": False
             }
         else:
@@ -121,17 +255,27 @@ class BookingAgent:
                 "requires_confirmation": False
             }
 
-    async def _handle_availability_request(self, message: str, session_id: str) -> Dict[str, Any]:
+    async def _handle_availability_request(
+        self,
+        message: str,
+        session_id: str,
+        hints: Optional[Extraction] = None
+    ) -> Dict[str, Any]:
         """Handle availability inquiry messages"""
 
-        date_info = self._extract_datetime_info(message)
+        date_info = self._extract_datetime_info(message) or self._datetime_from_hints(hints)
 
         if date_info:
+            free_slots = await self._find_free_slots(date_info.start, date_info.end, 60)
             return {
-                "message": f"Let me check our availability for {date_info}. I'll show you the open time slots.",
+                "message": f"Let me check our availability for {date_info.description}. I'll show you the open time slots.",
                 "intent": "check_availability",
-                "booking_data": {"requested_date": date_info},
-                "suggested_times": self._get_suggested_times(),
+                "booking_data": {
+                    "requested_date": date_info.description,
+                    "start_time": date_info.start.isoformat(),
+                    "end_time": date_info.end.isoformat()
+                },
+                "suggested_times": self._format_slots(free_slots) if free_slots is not None else PENDING_SUGGESTIONS,
                 "requires_confirmation": False
             }
         else:
@@ -139,48 +283,29 @@ class BookingAgent:
                 "message": "I can check our availability for you! What date are you looking for?",
                 "intent": "availability_needs_date",
                 "booking_data": None,
-                "suggested_times": self._get_suggested_times(),
+                "suggested_times": PENDING_SUGGESTIONS,
                 "requires_confirmation": False
             }
 
     async def _handle_service_inquiry(self, message: str, session_id: str) -> Dict[str, Any]:
         """Handle service information requests"""
+        return self.static_replies["service_information"]
 
-        services_info = []
-        for key, service in self.services.items():
-            services_info.append(f"• {service['name']} ({service['duration']} minutes)")
-
-        services_text = "\n".join(services_info)
-
-        return {
-            "message": f"Here are our available services:\n\n{services_text}\n\nWould you like to book any of these services?",
-            "intent": "service_information",
-            "booking_data": None,
-            "suggested_times": [],
-            "requires_confirmation": False
-        }
-
-    async def _handle_general_conversation(self, message: str, session_id: str) -> Dict[str, Any]:
+    async def _handle_general_conversation(
+        self,
+        message: str,
+        session_id: str,
+        intent: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Handle general conversation and greetings"""
 
-        greetings = ["hello", "hi", "hey", "good morning", "good afternoon"]
+        if intent is None:
+            intent = self.intent_classifier.classify(message)
 
-        if any(greeting in message.lower() for greeting in greetings):
-            return {
-                "message": "Hello! Welcome to TailorTalk. I'm here to help you book appointments for our salon services. How can I assist you today?",
-                "intent": "greeting",
-                "booking_data": None,
-                "suggested_times": [],
-                "requires_confirmation": False
-            }
+        if intent == "greeting":
+            return self.static_replies["greeting"]
         else:
-            return {
-                "message": "I'm here to help you with booking appointments and information about our services. Would you like to book an appointment or learn about our services?",
-                "intent": "general",
-                "booking_data": None,
-                "suggested_times": [],
-                "requires_confirmation": False
-            }
+            return self.static_replies["general"]
 
     def _extract_service_type(self, message: str) -> Optional[str]:
         """Extract service type from message"""
@@ -192,25 +317,82 @@ class BookingAgent:
 
         return None
 
-    def _extract_datetime_info(self, message: str) -> Optional[str]:
-        """Extract date/time information from message"""
-        # Simple pattern matching for common date/time expressions
-        patterns = [
-            r'tomorrow',
-            r'today',
-            r'next week',
-            r'monday|tuesday|wednesday|thursday|friday|saturday|sunday',
-            r'\d{1,2}[:/]\d{1,2}',  # Time like 2:30 or 14:30
-            r'\d{1,2}(am|pm)',      # Time like 2pm
-        ]
-
-        for pattern in patterns:
-            if re.search(pattern, message.lower()):
-                # For demo purposes, return a simplified version
-                return "the requested time"
-
+    def _service_from_history(self, conversation_history: Optional[List[Dict]]) -> Optional[str]:
+        """Find the most recent service the user mentioned in earlier turns"""
+        for exchange in reversed(conversation_history or []):
+            service_type = self._extract_service_type(exchange.get("user", ""))
+            if service_type:
+                return service_type
         return None
 
+    def _service_from_hints(self, hints: Optional[Extraction]) -> Optional[str]:
+        """Display name of the service the model found, if any"""
+        if hints is None or hints.service not in self.services:
+            return None
+        return self.services[hints.service]['name']
+
+    def _datetime_from_hints(self, hints: Optional[Extraction], duration_minutes: int = 60) -> Optional[ResolvedDateTime]:
+        """Resolve the date/time phrase the model found, if any"""
+        if hints is None or not hints.when:
+            return None
+        return self._extract_datetime_info(hints.when, duration_minutes)
+
+    def _service_duration(self, service_name: Optional[str]) -> int:
+        """Duration in minutes of a service given its display name"""
+        for service_info in self.services.values():
+            if service_info['name'] == service_name:
+                return service_info['duration']
+        return 60
+
+    def _extract_datetime_info(self, message: str, duration_minutes: int = 60) -> Optional[ResolvedDateTime]:
+        """Resolve date/time information in the message to a concrete range"""
+        return self.datetime_resolver.resolve(message, duration_minutes=duration_minutes)
+
+    async def _find_free_slots(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        duration_minutes: int
+    ) -> Optional[List[Dict[str, datetime]]]:
+        """Free slots in a range, or None when no calendar is available to ask"""
+        if self.calendar_service is None:
+            return None
+        try:
+            return await self.calendar_service.get_available_slots(
+                start_time=max(start_time, next_boundary(datetime.now(start_time.tzinfo))),
+                end_time=end_time,
+                duration_minutes=duration_minutes
+            )
+        except Exception as e:
+            logger.error(f"Error checking availability: {e}")
+            return None
+
+    async def _find_alternatives(self, start_time: datetime, end_time: datetime) -> List[Dict[str, datetime]]:
+        """Nearest free slots to a taken time"""
+        try:
+            return await self.calendar_service.find_alternative_slots(start_time, end_time)
+        except Exception as e:
+            logger.error(f"Error finding alternative slots: {e}")
+            return []
+
+    @staticmethod
+    def _format_slot(start_time: datetime) -> str:
+        """Human-readable slot label, e.g. 'Monday, October 19 at 9:00 AM'"""
+        return format_slot(start_time)
+
+    def _format_slots(self, slots: List[Dict[str, datetime]], limit: int = 6) -> List[str]:
+        return [self._format_slot(slot['start']) for slot in slots[:limit]]
+
+    async def _resolve_suggested_times(self, response: Dict[str, Any]) -> List[str]:
+        """Look up the suggested times for a reply from the precomputed table"""
+        if self.suggestion_table is not None:
+            service_type = (response.get("booking_data") or {}).get("service_type")
+            suggested = self.suggestion_table.get(self._service_duration(service_type))
+            if suggested is not None:
+                return suggested
+        # Table not built yet (or not configured): fall back to fixed times
+        return self._get_suggested_times()
+
     def _get_suggested_times(self) -> List[str]:
         """Get suggested appointment times"""
         # Generate some sample time slots for the next few days
@@ -5,90 +5,430 @@ Handles chat interactions and calendar operations.
 
 import os
 import json
+import base64
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.datastructures import State
 
-from models import ChatRequest, ChatResponse, BookingRequest, BookingResponse
-from agent import BookingAgent
+from models import (
+    ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchResponse, ChatBatchItem,
+    BookingRequest, BookingResponse, AvailabilityBatchRequest
+)
+from admission import AdmissionControlMiddleware
+from agent import BookingAgent, StaticReply
+from availability import AvailabilityEngine, pack_rows, run_lengths
 from calendar_service import GoogleCalendarService
+from event_store import EventStore, SlotConflictError
+from idempotency import IdempotencyKeyMismatchError, IdempotencyStore, SharedIdempotencyStore, fingerprint
+from llm_fallback import LLMFallback
+from outbox import CalendarSync, HttpCalendarBackend
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS_REGISTRY, MetricsMiddleware
+from pagination import NDJSON_MEDIA_TYPE, InvalidCursorError, decode_cursor, encode_cursor, ndjson_lines, take
+from serialization import FastJSONResponse, dumps
+from session_store import ANONYMOUS_SESSION_ID, SessionStore, SharedSessionStore
+from structured_logging import RequestLogContextMiddleware, configure_logging, parse_sample_rates
+from suggestions import SuggestionTable
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="TailorTalk AI Booking Agent", version="1.0.0")
+# Routes live on a router that create_app() mounts, so importing this module
+# only imports code: stores and services are built per app instance and kept
+# on its state, and logging starts and stops with the app
+router = APIRouter()
 
-# Enable CORS for Streamlit frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Concurrent items processed per batch request
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+# With several workers (uvicorn --workers / gunicorn -w), sessions and
+# idempotency keys must live in a SQLite file every worker opens; bookings
+# already do, through the event store at EVENT_STORE_PATH
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")
+
+def create_app() -> FastAPI:
+    """
+    Build the services and the FastAPI app.
+
+    Each call builds its own services, kept on ``app.state``. Run with
+    ``uvicorn app:create_app --factory``; ``uvicorn app:app`` also works and
+    builds the app on first access.
+    """
+    # Initialize services. With CALENDAR_SYNC_URL set (the Google Calendar v3
+    # API, or the offline benchmarks/calendar_stub.py), writes commit locally
+    # with an outbox entry and background workers push them to that calendar
+    sync_url = os.getenv("CALENDAR_SYNC_URL")
+    calendar_service = GoogleCalendarService(outbox=bool(sync_url))
+    calendar_sync = CalendarSync(
+        calendar_service.event_store,
+        HttpCalendarBackend(
+            sync_url,
+            token=os.getenv("CALENDAR_SYNC_TOKEN"),
+            time_zone=os.getenv("CALENDAR_SYNC_TIME_ZONE"),
+            timeout_seconds=float(os.getenv("CALENDAR_SYNC_TIMEOUT_SECONDS", "10"))
+        ),
+        workers=int(os.getenv("CALENDAR_SYNC_WORKERS", "4")),
+        batch_size=int(os.getenv("CALENDAR_SYNC_BATCH_SIZE", "16")),
+        max_attempts=int(os.getenv("CALENDAR_SYNC_MAX_ATTEMPTS", "20"))
+    ) if sync_url else None
+    if calendar_sync is not None:
+        calendar_service.write_listeners.append(calendar_sync.on_calendar_write)
+    # Model fallback for messages the keyword rules cannot classify; any
+    # OpenAI-compatible endpoint works, e.g. the offline benchmarks/llm_stub.py
+    llm_url = os.getenv("LLM_FALLBACK_URL")
+    llm_fallback = LLMFallback(
+        base_url=llm_url,
+        model=os.getenv("LLM_FALLBACK_MODEL", "gpt-4o-mini"),
+        api_key=os.getenv("LLM_FALLBACK_API_KEY") or os.getenv("OPENAI_API_KEY"),
+        timeout_seconds=float(os.getenv("LLM_FALLBACK_TIMEOUT_SECONDS", "1.5")),
+        batch_window_seconds=float(os.getenv("LLM_FALLBACK_BATCH_WINDOW_MS", "10")) / 1000,
+        max_batch=int(os.getenv("LLM_FALLBACK_MAX_BATCH", "16")),
+        cache_size=int(os.getenv("LLM_FALLBACK_CACHE_SIZE", "10000"))
+    ) if llm_url else None
+    booking_agent = BookingAgent(calendar_service, llm_fallback=llm_fallback)
+    suggestion_table = SuggestionTable(
+        calendar_service,
+        durations=[service["duration"] for service in booking_agent.services.values()],
+        refresh_seconds=float(os.getenv("SUGGESTION_REFRESH_SECONDS", "300"))
+    )
+    booking_agent.suggestion_table = suggestion_table
+    calendar_service.write_listeners.append(suggestion_table.on_calendar_write)
+
+    if SHARED_STATE_PATH:
+        # The owner of a key renews its claim while the booking runs; a claim
+        # not renewed for IDEMPOTENCY_LEASE_SECONDS is taken over by a retry
+        idempotency_store = SharedIdempotencyStore(
+            SHARED_STATE_PATH,
+            ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600))),
+            lease_seconds=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "30"))
+        )
+        session_store = SharedSessionStore(
+            SHARED_STATE_PATH,
+            idle_seconds=float(os.getenv("SESSION_IDLE_SECONDS", str(30 * 60)))
+        )
+    else:
+        idempotency_store = IdempotencyStore(
+            max_entries=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+            ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+        )
+        session_store = SessionStore(
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "10000")),
+            idle_seconds=float(os.getenv("SESSION_IDLE_SECONDS", str(30 * 60))),
+            spill_path=os.getenv("SESSION_SPILL_PATH")
+        )
+
+    application = FastAPI(
+        title="TailorTalk AI Booking Agent",
+        version="1.0.0",
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan
+    )
+    state = application.state
+    state.calendar_service = calendar_service
+    state.calendar_sync = calendar_sync
+    state.llm_fallback = llm_fallback
+    state.booking_agent = booking_agent
+    state.suggestion_table = suggestion_table
+    state.idempotency_store = idempotency_store
+    state.session_store = session_store
+    state.log_listener = None
+    state.purge_task = None
+
+    # Enable CORS for Streamlit frontend
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    application.add_middleware(MetricsMiddleware)
+    # Per-route INFO sampling, e.g. LOG_SAMPLE_RATES="/chat=0.05,/availability=0.1"
+    application.add_middleware(
+        RequestLogContextMiddleware,
+        sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+        default_rate=float(os.getenv("LOG_SAMPLE_DEFAULT", "1.0"))
+    )
+    # Outermost, so refused requests cost as little as possible; each limit is
+    # off unless set, e.g. ADMISSION_MAX_IN_FLIGHT=64 ADMISSION_SESSION_RATE=2
+    max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0"))
+    session_rate = float(os.getenv("ADMISSION_SESSION_RATE", "0"))
+    client_rate = float(os.getenv("ADMISSION_CLIENT_RATE", "0"))
+    if max_in_flight > 0 or session_rate > 0 or client_rate > 0:
+        reserve = os.getenv("ADMISSION_PRIORITY_RESERVE")
+        application.add_middleware(
+            AdmissionControlMiddleware,
+            max_in_flight=max_in_flight,
+            priority_reserve=int(reserve) if reserve else None,
+            priority_paths=[path.strip() for path in os.getenv("ADMISSION_PRIORITY_PATHS", "/book").split(",") if path.strip()],
+            session_rate=session_rate,
+            session_burst=float(os.getenv("ADMISSION_SESSION_BURST", "0")) or None,
+            client_rate=client_rate,
+            client_burst=float(os.getenv("ADMISSION_CLIENT_BURST", "0")) or None
+        )
+    application.include_router(router)
+    return application
+
+def __getattr__(name: str):
+    # Lazily build the app for `uvicorn app:app`
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize services
-calendar_service = GoogleCalendarService()
-booking_agent = BookingAgent(calendar_service)
+async def purge_expired_state(state: State, interval_seconds: float = 60.0):
+    """Periodically drop idle sessions, expired shared idempotency keys and old change-feed entries"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        purged = await call_session_store(state.session_store.purge_expired)
+        if purged:
+            logger.info(f"Purged {purged} idle chat sessions")
+        if SHARED_STATE_PATH:
+            await asyncio.to_thread(state.idempotency_store.purge_expired)
+        await asyncio.to_thread(state.calendar_service.event_store.prune_changes)
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """Start logging and background work with the app; stop them, flushing queued log records, on shutdown"""
+    state = application.state
+    # Configure logging: records are queued and written by a background thread;
+    # past LOG_QUEUE_SIZE queued records, new ones are dropped and counted
+    state.log_listener = configure_logging(
+        level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
+        json_format=os.getenv("LOG_FORMAT", "text").lower() == "json",
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    )
     try:
         # Test calendar service connection
-        await calendar_service.test_connection()
+        await state.calendar_service.test_connection()
         logger.info("Calendar service initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize calendar service: {e}")
 
-@app.get("/")
+    # Kept so the loop is not garbage collected and shutdown can cancel it
+    state.purge_task = asyncio.create_task(purge_expired_state(state))
+    state.suggestion_table.start()
+    if state.calendar_sync is not None:
+        state.calendar_sync.start()
+
+    yield
+
+    state.purge_task.cancel()
+    await asyncio.gather(state.purge_task, return_exceptions=True)
+    await state.suggestion_table.stop()
+    if state.calendar_sync is not None:
+        await state.calendar_sync.close()
+    if state.llm_fallback is not None:
+        await state.llm_fallback.close()
+    state.log_listener.stop()
+
+@router.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "TailorTalk AI Booking Agent is running"}
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def call_session_store(method, *args):
+    """Call a session store method; the shared store's SQLite calls run in a thread"""
+    # Another worker's write lock can hold a shared store call for its
+    # busy_timeout, which must not stall the event loop
+    if SHARED_STATE_PATH:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+async def load_conversation_history(state: State, request: ChatRequest) -> List[Dict[str, str]]:
+    """History for a chat turn, from the request or the server-side session"""
+    # Sessions with a real id keep their history server-side, so clients
+    # only need to send the new message
+    if request.conversation_history or request.session_id == ANONYMOUS_SESSION_ID:
+        return request.conversation_history
+    session = await call_session_store(state.session_store.get, request.session_id)
+    return list(session.history) if session else []
+
+async def record_exchange(state: State, request: ChatRequest, assistant_message: str):
+    """Append a finished turn to the server-side session"""
+    if request.session_id != ANONYMOUS_SESSION_ID:
+        await call_session_store(
+            state.session_store.append_exchange, request.session_id, request.message, assistant_message
+        )
+
+async def run_chat_turn(state: State, request: ChatRequest) -> Dict[str, Any]:
+    """Process one chat message and record it in the session"""
+    logger.info("Received chat request: %s", request.message, extra={"fields": {"session_id": request.session_id}})
+    
+    # Process message through the booking agent
+    response = await state.booking_agent.process_message(
+        message=request.message,
+        session_id=request.session_id,
+        conversation_history=await load_conversation_history(state, request)
+    )
+    
+    logger.info(
+        "Agent response: %s", response,
+        extra={"fields": {"session_id": request.session_id, "intent": response.get("intent")}}
+    )
+    
+    await record_exchange(state, request, response.get("message", ""))
+    return response
+
+def chat_response_content(response: Dict[str, Any]) -> Dict[str, Any]:
+    """The ChatResponse fields of an agent reply"""
+    return {
+        "message": response.get("message", "I'm sorry, I couldn't process that request."),
+        "booking_data": response.get("booking_data"),
+        "suggested_times": response.get("suggested_times", []),
+        "requires_confirmation": response.get("requires_confirmation", False)
+    }
+
+def chat_response_body(response: Dict[str, Any]) -> bytes:
+    """Serialized ChatResponse; static replies are serialized once and reused"""
+    if isinstance(response, StaticReply):
+        if response.body is None:
+            response.body = dumps(chat_response_content(response))
+        return response.body
+    return dumps(chat_response_content(response))
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(http_request: Request, request: ChatRequest):
     """
     Handle chat interactions with the booking agent.
     """
+    state = http_request.app.state
     try:
-        logger.info(f"Received chat request: {request.message}")
-        
-        # Process message through the booking agent
-        response = await booking_agent.process_message(
-            message=request.message,
-            session_id=request.session_id,
-            conversation_history=request.conversation_history
-        )
-        
-        logger.info(f"Agent response: {response}")
-        
-        return ChatResponse(
-            message=response.get("message", "I'm sorry, I couldn't process that request."),
-            booking_data=response.get("booking_data"),
-            suggested_times=response.get("suggested_times", []),
-            requires_confirmation=response.get("requires_confirmation", False)
-        )
+        # The agent's replies already have ChatResponse's shape, so skip
+        # model validation and send the bytes directly
+        return Response(chat_response_body(await run_chat_turn(state, request)), media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error processing chat request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/book", response_model=BookingResponse)
-async def book_appointment(request: BookingRequest):
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(http_request: Request, batch: ChatBatchRequest):
+    """
+    Handle many chat messages in one round trip, with bounded concurrency.
+    Results are returned in request order.
+    """
+    state = http_request.app.state
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def run(request: ChatRequest) -> ChatBatchItem:
+        async with semaphore:
+            try:
+                response = ChatResponse(**chat_response_content(await run_chat_turn(state, request)))
+                return ChatBatchItem(success=True, response=response)
+            except Exception as e:
+                logger.error(f"Error processing batched chat request: {e}")
+                return ChatBatchItem(success=False, error=str(e))
+
+    return ChatBatchResponse(responses=await asyncio.gather(*(run(request) for request in batch.requests)))
+
+async def stream_chat_events(state: State, request: ChatRequest):
+    """Run a chat turn, yielding (event, data) pairs as the reply resolves"""
+    async for event, data in state.booking_agent.stream_message(
+        message=request.message,
+        session_id=request.session_id,
+        conversation_history=await load_conversation_history(state, request)
+    ):
+        if event == "message":
+            await record_exchange(state, request, data["message"])
+        yield event, data
+    yield "done", None
+
+@router.post("/chat/stream")
+async def chat_stream(http_request: Request, request: ChatRequest):
+    """
+    Stream a chat reply as Server-Sent Events: message, booking_data,
+    suggested_times, then done.
+    """
+    state = http_request.app.state
+    logger.info("Received streaming chat request: %s", request.message, extra={"fields": {"session_id": request.session_id}})
+
+    async def sse():
+        try:
+            async for event, data in stream_chat_events(state, request):
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: str = ANONYMOUS_SESSION_ID
+):
+    """
+    Persistent chat connection. Each incoming {"message": ...} frame is answered
+    with {"event": ..., "data": ...} frames ending in a "done" event.
+    """
+    state = websocket.app.state
+    await websocket.accept()
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            try:
+                # Parsed here so a malformed frame gets an error event, not a closed socket
+                payload = json.loads(frame)
+                request = ChatRequest(**{"session_id": session_id, **payload})
+                async for event, data in stream_chat_events(state, request):
+                    await websocket.send_text(json.dumps({"event": event, "data": data}, default=str))
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing websocket chat message: {e}")
+                await websocket.send_json({"event": "error", "data": {"detail": str(e)}})
+    except WebSocketDisconnect:
+        logger.info(f"Chat websocket closed for session {session_id}")
+
+@router.post("/book", response_model=BookingResponse)
+async def book_appointment(
+    http_request: Request,
+    request: BookingRequest,
+    idempotency_key: Optional[str] = Header(default=None)
+):
     """
     Book an appointment in the calendar.
+
+    Retries carrying the same Idempotency-Key header get the stored
+    response back instead of creating another event.
     """
+    state = http_request.app.state
+    if not idempotency_key:
+        status_code, response = await _book(state.calendar_service, request)
+        return FastJSONResponse(status_code=status_code, content=response)
+
+    try:
+        (status_code, response), replayed = await state.idempotency_store.run(
+            idempotency_key,
+            fingerprint(request.model_dump(mode="json")),
+            lambda: _book(state.calendar_service, request),
+            # Only definite outcomes are replayed; failures may be retried
+            should_store=lambda result: result[0] == 409 or result[1]["success"]
+        )
+    except IdempotencyKeyMismatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return FastJSONResponse(status_code=status_code, content=response, headers=headers)
+
+async def _book(calendar_service: GoogleCalendarService, request: BookingRequest) -> Tuple[int, Dict[str, Any]]:
+    """Run a booking and return (status code, BookingResponse as JSON)"""
     try:
-        logger.info(f"Booking appointment: {request}")
+        logger.info("Booking appointment: %s", request)
         
-        # Create the event in Google Calendar
-        event = await calendar_service.create_event(
+        # Check for overlaps and create the event in one atomic step
+        event = await calendar_service.book_event(
             title=request.title,
             description=request.description,
             start_time=request.start_time,
@@ -96,70 +436,325 @@ async def book_appointment(request: BookingRequest):
             attendee_email=request.attendee_email
         )
         
-        return BookingResponse(
+        response = BookingResponse(
             success=True,
             event_id=event.get("id"),
             message=f"Appointment booked successfully for {request.start_time.strftime('%B %d, %Y at %I:%M %p')}",
             event_details=event
         )
+        return 200, response.model_dump(mode="json")
         
+    except SlotConflictError:
+        alternatives = await calendar_service.find_alternative_slots(request.start_time, request.end_time)
+        response = BookingResponse(
+            success=False,
+            conflict=True,
+            message=f"The time {request.start_time.strftime('%B %d, %Y at %I:%M %p')} is already booked",
+            alternative_slots=alternatives
+        )
+        return 409, response.model_dump(mode="json")
+
     except Exception as e:
         logger.error(f"Error booking appointment: {e}")
-        return BookingResponse(
+        response = BookingResponse(
             success=False,
             message=f"Failed to book appointment: {str(e)}"
         )
+        return 200, response.model_dump(mode="json")
+
+def _slot_json(slot: Dict[str, datetime]) -> Dict[str, str]:
+    return {"start": slot["start"].isoformat(), "end": slot["end"].isoformat()}
+
+def _slot_cursor(slot: Dict[str, datetime]) -> str:
+    return encode_cursor(slot["start"].isoformat())
+
+def _event_cursor(event: Dict[str, Any]) -> str:
+    return encode_cursor(*EventStore.sort_key(event))
 
-@app.get("/availability")
+def _wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+@router.get("/availability")
 async def check_availability(
+    request: Request,
     start_date: str, 
     end_date: str, 
-    duration_minutes: int = 60
+    duration_minutes: int = 60,
+    limit: Optional[int] = Query(default=None, ge=1),
+    cursor: Optional[str] = None,
+    accept: Optional[str] = Header(default=None)
 ):
     """
     Check calendar availability for a given date range.
+
+    With ``limit``, returns one page and a ``next_cursor`` to pass back as
+    ``cursor``. With ``Accept: application/x-ndjson``, streams one slot per
+    line as it is computed (plus a final ``next_cursor`` line when paged).
     """
+    state = request.app.state
     try:
         start_dt = datetime.fromisoformat(start_date)
         end_dt = datetime.fromisoformat(end_date)
-        
-        available_slots = await calendar_service.get_available_slots(
+        after = datetime.fromisoformat(decode_cursor(cursor)[0]) if cursor else None
+    except (InvalidCursorError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        slots = state.calendar_service.iter_available_slots(
             start_time=start_dt,
             end_time=end_dt,
-            duration_minutes=duration_minutes
+            duration_minutes=duration_minutes,
+            after=after
         )
+        if _wants_ndjson(accept):
+            return StreamingResponse(
+                ndjson_lines(slots, _slot_json, limit, _slot_cursor),
+                media_type=NDJSON_MEDIA_TYPE
+            )
+
+        if limit is None:
+            return {"available_slots": [_slot_json(slot) async for slot in slots]}
+        page, more = await take(slots, limit)
+        return {
+            "available_slots": [_slot_json(slot) for slot in page],
+            "next_cursor": _slot_cursor(page[-1]) if more else None
+        }
         
+    except Exception as e:
+        logger.error(f"Error checking availability: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/availability/grid")
+async def availability_grid(
+    request: Request,
+    start_date: str,
+    end_date: str,
+    cell_minutes: int = Query(default=30, ge=5, le=240),
+    encoding: str = Query(default="bitset", pattern="^(bitset|rle)$"),
+    accept: Optional[str] = Header(default=None)
+):
+    """
+    Free/busy grid for a calendar overview: one row per working day, one cell
+    per ``cell_minutes`` from the start of working hours, free when every
+    minute of the cell is free.
+
+    ``bitset`` rows are ``ceil(cells_per_day / 8)`` little-endian bytes (bit
+    ``j`` = cell ``j``), concatenated and base64-encoded; ``rle`` rows are
+    alternating busy/free cell counts, starting with busy. With
+    ``Accept: application/octet-stream`` the bitset is sent as raw bytes.
+    """
+    state = request.app.state
+    try:
+        start_dt = datetime.fromisoformat(start_date)
+        end_dt = datetime.fromisoformat(end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        grid = await state.calendar_service.get_availability_grid(start_dt, end_dt, cell_minutes=cell_minutes)
+        days = [day.isoformat() for day, _ in grid]
+        # Same default working hours as get_availability_grid
+        engine = AvailabilityEngine()
+        cells = engine.cell_count(cell_minutes)
+
+        if accept and "application/octet-stream" in accept:
+            return Response(
+                pack_rows((row for _, row in grid), cells),
+                media_type="application/octet-stream",
+                headers={
+                    "X-Grid-Days": ",".join(days),
+                    "X-Grid-Cells-Per-Day": str(cells),
+                    "X-Grid-Cell-Minutes": str(cell_minutes),
+                }
+            )
+
+        if encoding == "rle":
+            rows = [run_lengths(row, cells) for _, row in grid]
+        else:
+            rows = base64.b64encode(pack_rows((row for _, row in grid), cells)).decode()
+        return {
+            "days": days,
+            "day_start": f"{engine.working_hours_start:02d}:00",
+            "cell_minutes": cell_minutes,
+            "cells_per_day": cells,
+            "encoding": encoding,
+            "grid": rows
+        }
+
+    except Exception as e:
+        logger.error(f"Error building availability grid: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/availability/resources")
+async def check_resource_availability(
+    request: Request,
+    service: str,
+    start_date: str,
+    end_date: str,
+    duration_minutes: Optional[int] = None,
+    step_minutes: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """
+    Find slots where a qualified stylist and the station a service needs are
+    all free, with the resource assigned to each role.
+    """
+    state = request.app.state
+    service_info = state.booking_agent.services.get(service)
+    if service_info is None:
+        raise HTTPException(status_code=400, detail=f"Unknown service: {service}")
+    try:
+        start_dt = datetime.fromisoformat(start_date)
+        end_dt = datetime.fromisoformat(end_date)
+
+        slots = await state.calendar_service.get_resource_slots(
+            service,
+            start_time=start_dt,
+            end_time=end_dt,
+            duration_minutes=duration_minutes or service_info["duration"],
+            step_minutes=step_minutes,
+            limit=limit
+        )
+
         return {
             "available_slots": [
                 {
                     "start": slot["start"].isoformat(),
-                    "end": slot["end"].isoformat()
+                    "end": slot["end"].isoformat(),
+                    "resources": slot["resources"]
                 }
-                for slot in available_slots
+                for slot in slots
             ]
         }
-        
+
     except Exception as e:
-        logger.error(f"Error checking availability: {e}")
+        logger.error(f"Error checking resource availability: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/events")
-async def get_events(start_date: str, end_date: str):
+@router.post("/availability/batch")
+async def check_availability_batch(request: Request, batch: AvailabilityBatchRequest):
+    """
+    Check availability for many (calendar, range, duration) queries at once.
+    Each distinct calendar range is read only once across the batch.
+    """
+    state = request.app.state
+    queries = []
+    for query in batch.queries:
+        try:
+            start_dt = datetime.fromisoformat(query.start_date)
+            end_dt = datetime.fromisoformat(query.end_date)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        queries.append({
+            "calendar_id": query.calendar_id,
+            "start_time": start_dt,
+            "end_time": end_dt,
+            "duration_minutes": query.duration_minutes
+        })
+
+    results = await state.calendar_service.get_available_slots_batch(queries, max_concurrency=BATCH_MAX_CONCURRENCY)
+
+    answers = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Error checking batched availability: {result}")
+            answers.append({"error": str(result)})
+        else:
+            answers.append({
+                "available_slots": [
+                    {"start": slot["start"].isoformat(), "end": slot["end"].isoformat()}
+                    for slot in result
+                ]
+            })
+    return {"results": answers}
+
+@router.get("/events")
+async def get_events(
+    request: Request,
+    start_date: str,
+    end_date: str,
+    limit: Optional[int] = Query(default=None, ge=1),
+    cursor: Optional[str] = None,
+    accept: Optional[str] = Header(default=None)
+):
     """
     Get events from the calendar for a given date range.
+
+    Paging (``limit``/``cursor``) and ``Accept: application/x-ndjson``
+    streaming work as for /availability; the cursor resumes after the last
+    event's start time and id.
     """
+    state = request.app.state
     try:
         start_dt = datetime.fromisoformat(start_date)
         end_dt = datetime.fromisoformat(end_date)
-        
-        events = await calendar_service.get_events(start_dt, end_dt)
-        
-        return {"events": events}
+        after = tuple(decode_cursor(cursor)) if cursor else None
+        if after is not None and (len(after) != 2 or not isinstance(after[0], int)):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    except (InvalidCursorError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if _wants_ndjson(accept):
+            events = state.calendar_service.iter_events(start_dt, end_dt, after=after)
+            return StreamingResponse(
+                ndjson_lines(events, lambda event: event, limit, _event_cursor),
+                media_type=NDJSON_MEDIA_TYPE
+            )
+
+        if limit is None and after is None:
+            events = await state.calendar_service.get_events(start_dt, end_dt)
+            return {"events": events}
+        if limit is None:
+            return {"events": [event async for event in state.calendar_service.iter_events(start_dt, end_dt, after=after)]}
+        page, more = await take(state.calendar_service.iter_events(start_dt, end_dt, after=after), limit)
+        return {"events": page, "next_cursor": _event_cursor(page[-1]) if more else None}
         
     except Exception as e:
         logger.error(f"Error fetching events: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats")
+async def cache_stats(request: Request):
+    """
+    Hit/miss/eviction counters for the calendar range cache, plus executed
+    vs. coalesced counts for identical concurrent calendar reads.
+    """
+    state = request.app.state
+    calendar_service = state.calendar_service
+    return {**calendar_service.cache.stats(), "coalescing": calendar_service.flights.stats()}
+
+@router.get("/llm/stats")
+async def llm_stats(request: Request):
+    """
+    LLM fallback lookups by outcome, cache hit rate and model call counts.
+    """
+    state = request.app.state
+    if state.llm_fallback is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.llm_fallback.stats()}
+
+@router.get("/sync/stats")
+async def sync_stats(request: Request):
+    """
+    Calendar outbox: pushes by outcome and the backlog still to deliver.
+    """
+    state = request.app.state
+    if state.calendar_sync is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.calendar_sync.stats()}
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Request, intent and calendar-call metrics in the Prometheus text format.
+    """
+    return Response(METRICS_REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1 and not SHARED_STATE_PATH:
+        logger.warning("Running several workers without SHARED_STATE_PATH: sessions and idempotency keys stay per worker")
+    # Workers import the module and call the factory themselves
+    uvicorn.run("app:create_app", factory=True, host="0.0.0.0", port=8000, workers=workers)
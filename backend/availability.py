@@ -0,0 +1,247 @@
+"""
+Availability engine that finds free time using per-day minute bitmaps.
+
+Each day's working window is an integer whose bit ``i`` stands for minute
+``i`` after the start of working hours. Booked events are OR-ed into a busy
+bitmap, so a whole range of days is evaluated with a handful of bit operations
+per event instead of walking candidate slots one by one.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MINUTE = timedelta(minutes=1)
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = frozenset(range(5))  # Monday to Friday
+
+Interval = Tuple[datetime, datetime]
+
+
+def _floor_minutes(delta: timedelta) -> int:
+    return delta // MINUTE
+
+
+def _ceil_minutes(delta: timedelta) -> int:
+    return -((-delta) // MINUTE)
+
+
+def next_boundary(value: datetime, minutes: int = 30) -> datetime:
+    """Round a datetime up to the next multiple of ``minutes`` past the hour"""
+    rounded = value.replace(second=0, microsecond=0)
+    if rounded < value:
+        rounded += MINUTE
+    return rounded + timedelta(minutes=-rounded.minute % minutes)
+
+
+def span_mask(start: int, end: int) -> int:
+    """Bitmask with bits [start, end) set"""
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def run_starts(bits: int, length: int) -> int:
+    """Bits ``i`` such that bits ``i .. i + length - 1`` are all set in ``bits``"""
+    covered = 1
+    while bits and covered < length:
+        shift = min(covered, length - covered)
+        bits &= bits >> shift
+        covered += shift
+    return bits
+
+
+def has_run(bits: int, length: int) -> bool:
+    """Check whether ``bits`` contains ``length`` consecutive set bits"""
+    if length <= 0:
+        return True
+    return run_starts(bits, length) != 0
+
+
+def free_runs(bits: int, min_length: int = 1) -> List[Tuple[int, int]]:
+    """Return (start, end) bit offsets of every run of set bits at least ``min_length`` long"""
+    runs = []
+    starts = bits & ~(bits << 1)
+    ends = bits & ~(bits >> 1)
+    while starts:
+        low_start = starts & -starts
+        low_end = ends & -ends
+        run_start = low_start.bit_length() - 1
+        run_end = low_end.bit_length()
+        if run_end - run_start >= min_length:
+            runs.append((run_start, run_end))
+        starts ^= low_start
+        ends ^= low_end
+    return runs
+
+
+def cell_bitmap(free: int, width: int, cell_minutes: int) -> int:
+    """Downsample a day's minute bitmap: cell ``j`` is set when all its minutes are free"""
+    cells = -(-width // cell_minutes)
+    # A short last cell is judged on the minutes it actually has
+    starts = run_starts(free | span_mask(width, cells * cell_minutes), cell_minutes)
+    result = 0
+    for cell in range(cells):
+        if starts >> (cell * cell_minutes) & 1:
+            result |= 1 << cell
+    return result
+
+
+def run_lengths(bits: int, length: int) -> List[int]:
+    """Alternating unset/set run lengths over ``length`` bits, starting with unset (maybe 0)"""
+    lengths = []
+    position = 0
+    for run_start, run_end in free_runs(bits):
+        lengths.extend((run_start - position, run_end - run_start))
+        position = run_end
+    if position < length:
+        lengths.append(length - position)
+    return lengths
+
+
+def pack_rows(rows: Iterable[int], cells: int) -> bytes:
+    """Concatenate bitmaps as fixed-width little-endian rows of ``ceil(cells / 8)`` bytes"""
+    row_bytes = (cells + 7) // 8
+    return b"".join(row.to_bytes(row_bytes, "little") for row in rows)
+
+
+def align(value: datetime, tzinfo) -> datetime:
+    """Make an event boundary comparable with datetimes in ``tzinfo`` (None: naive local time)"""
+    if tzinfo is None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    if tzinfo is not None and value.tzinfo is None:
+        return value.replace(tzinfo=tzinfo)
+    return value
+
+
+def event_interval(event: Dict[str, Any], parse) -> Optional[Interval]:
+    """Extract (start, end) from an event in either flat or Google ``dateTime`` form"""
+    bounds = []
+    for key in ("start", "end"):
+        value = event.get(key)
+        if isinstance(value, dict):
+            value = value.get("dateTime") or value.get("date")
+        if isinstance(value, str):
+            value = parse(value)
+        if not isinstance(value, datetime):
+            return None
+        bounds.append(value)
+    return bounds[0], bounds[1]
+
+
+class AvailabilityEngine:
+    """Computes free slots inside working hours from a set of busy intervals"""
+
+    def __init__(
+        self,
+        working_hours_start: int = 9,
+        working_hours_end: int = 17,
+        working_days: Iterable[int] = WEEKDAYS
+    ):
+        if not 0 <= working_hours_start < working_hours_end <= 24:
+            raise ValueError("Working hours must satisfy 0 <= start < end <= 24")
+        self.working_hours_start = working_hours_start
+        self.working_hours_end = working_hours_end
+        self.working_days = frozenset(working_days)
+        self.width = (working_hours_end - working_hours_start) * 60
+
+    def day_origin(self, day: date, tzinfo=None) -> datetime:
+        """Datetime of bit 0 in the given day's bitmap"""
+        return datetime.combine(day, time(self.working_hours_start), tzinfo=tzinfo)
+
+    def free_bitmaps(
+        self,
+        busy_intervals: Iterable[Interval],
+        start_time: datetime,
+        end_time: datetime
+    ) -> List[Tuple[date, int]]:
+        """Return (day, free bitmap) for every working day whose working hours the range overlaps"""
+        tzinfo = start_time.tzinfo
+        first_day = start_time.date()
+        num_days = (end_time.date() - first_day).days + 1
+        if num_days <= 0:
+            return []
+
+        # Work in whole minutes from midnight of the first day so each event
+        # costs one subtraction and a few integer operations per day it spans
+        base = datetime.combine(first_day, time(0), tzinfo=tzinfo)
+        offset = self.working_hours_start * 60
+        width = self.width
+        busy = [0] * num_days
+        for event_start, event_end in busy_intervals:
+            if event_start.tzinfo is not tzinfo:
+                event_start = align(event_start, tzinfo)
+                event_end = align(event_end, tzinfo)
+            lo_minute = _floor_minutes(event_start - base)
+            hi_minute = _ceil_minutes(event_end - base)
+            if hi_minute <= lo_minute:
+                continue
+
+            first = max(lo_minute // MINUTES_PER_DAY, 0)
+            last = min((hi_minute - 1) // MINUTES_PER_DAY, num_days - 1)
+            for index in range(first, last + 1):
+                day_start = index * MINUTES_PER_DAY + offset
+                lo = max(lo_minute - day_start, 0)
+                hi = min(hi_minute - day_start, width)
+                if hi > lo:
+                    busy[index] |= ((1 << (hi - lo)) - 1) << lo
+
+        days = []
+        for index in range(num_days):
+            day = first_day + timedelta(days=index)
+            if day.weekday() not in self.working_days:
+                continue
+            origin = self.day_origin(day, tzinfo)
+            lo = max(_ceil_minutes(start_time - origin), 0)
+            hi = min(_floor_minutes(end_time - origin), self.width)
+            # An exclusive midnight end (or a start after hours) leaves no span
+            if lo >= hi:
+                continue
+            days.append((day, span_mask(lo, hi) & ~busy[index]))
+        return days
+
+    def cell_count(self, cell_minutes: int) -> int:
+        """Cells per day in an occupancy grid"""
+        return -(-self.width // cell_minutes)
+
+    def occupancy_grid(
+        self,
+        busy_intervals: Iterable[Interval],
+        start_time: datetime,
+        end_time: datetime,
+        cell_minutes: int = 30
+    ) -> List[Tuple[date, int]]:
+        """Return (day, cell bitmap) for every working day in range; a set bit is a free cell"""
+        if cell_minutes <= 0:
+            raise ValueError("cell_minutes must be positive")
+        return [
+            (day, cell_bitmap(free, self.width, cell_minutes))
+            for day, free in self.free_bitmaps(busy_intervals, start_time, end_time)
+        ]
+
+    def find_slots(
+        self,
+        busy_intervals: Iterable[Interval],
+        start_time: datetime,
+        end_time: datetime,
+        duration_minutes: int = 60,
+        step_minutes: Optional[int] = None
+    ) -> List[Dict[str, datetime]]:
+        """Find every slot of ``duration_minutes`` inside the free runs of the range"""
+        if duration_minutes <= 0:
+            raise ValueError("duration_minutes must be positive")
+        step = step_minutes or duration_minutes
+        tzinfo = start_time.tzinfo
+
+        slots = []
+        for day, free in self.free_bitmaps(busy_intervals, start_time, end_time):
+            if not has_run(free, duration_minutes):
+                continue
+            origin = self.day_origin(day, tzinfo)
+            for run_start, run_end in free_runs(free, duration_minutes):
+                for minute in range(run_start, run_end - duration_minutes + 1, step):
+                    slot_start = origin + timedelta(minutes=minute)
+                    slots.append({
+                        'start': slot_start,
+                        'end': slot_start + timedelta(minutes=duration_minutes)
+                    })
+        return slots
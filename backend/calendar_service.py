@@ -4,128 +4,562 @@ Google Calendar service for managing calendar operations.
 
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
 
-# Mock implementation for development - replace with actual Google Calendar API later
+from availability import AvailabilityEngine, event_interval, next_boundary
+from event_store import EventNotFoundError, EventStore, SlotConflictError
+from metrics import timed_calendar_call
+from range_cache import RangeCache, day_buckets
+from scheduler import ResourceScheduler
+from singleflight import SingleFlight
+
+# Events live in a local SQLite store until the Google Calendar API is wired up
 logger = logging.getLogger(__name__)
 
+# Change-feed rows read per query when catching up on other workers' writes
+CHANGE_FEED_BATCH = 1000
+
+# Days of slots computed at a time when streaming long ranges
+SLOT_WINDOW_DAYS = 7
+
+# Events read per store query when streaming long ranges
+EVENT_PAGE_SIZE = 500
+
 class GoogleCalendarService:
     """Service for interacting with Google Calendar API"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        event_store: Optional[EventStore] = None,
+        cache: Optional[RangeCache] = None,
+        scheduler: Optional[ResourceScheduler] = None,
+        outbox: bool = False
+    ):
         self.calendar_id = 'primary'
-        logger.info("Google Calendar service initialized (mock mode)")
+        # Stylists and stations, each with its own calendar
+        self.scheduler = scheduler or ResourceScheduler()
+        # Local store standing in for the Google Calendar API; with ``outbox``
+        # it also queues every write for outbox.CalendarSync to push upstream
+        self.event_store = event_store or EventStore(
+            os.getenv("EVENT_STORE_PATH", "tailortalk_events.db"), outbox=outbox
+        )
+        # Callbacks run with the event after every write (create, update, delete)
+        self.write_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.cache = cache or RangeCache(
+            ttl_seconds=float(os.getenv("CALENDAR_CACHE_TTL_SECONDS", "60")),
+            max_bytes=int(os.getenv("CALENDAR_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        )
+        # Identical concurrent reads share one fetch or computation; flights
+        # are keyed by the cache's write clock, so none spans a write
+        self.flights = SingleFlight()
+        # Position in the store's change feed, for writes made by other workers
+        self._data_version = self.event_store.data_version()
+        self._change_seq = self.event_store.last_change_seq()
+        self._change_poll: Optional[Tuple[Dict[str, bool], asyncio.Future]] = None
+        logger.info("Google Calendar service initialized (local event store)")
 
+    @timed_calendar_call
     async def test_connection(self):
         """Test the connection to Google Calendar"""
         try:
-            logger.info("Calendar connection test passed (mock mode)")
+            self.event_store.count(self.calendar_id)
+            logger.info("Calendar connection test passed (local event store)")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Google Calendar: {e}")
             raise
 
-    async def get_events(self, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+    @timed_calendar_call
+    async def get_events(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        calendar_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """Get events from the calendar within the specified time range"""
         try:
-            # Mock implementation - return sample events
-            mock_events = [
-                {
-                    'id': 'mock_event_1',
-                    'summary': 'Hair Appointment - John Doe',
-                    'start': start_time.isoformat(),
-                    'end': (start_time + timedelta(hours=1)).isoformat(),
-                    'description': 'Haircut appointment',
-                    'location': 'Salon'
-                }
-            ]
-            return mock_events
+            calendar_id = calendar_id or self.calendar_id
+            await self.sync_remote_changes()
+            key = ("events", calendar_id, start_time, end_time)
+            found, events = self.cache.get(key)
+            if not found:
+                token = self.cache.token()
+
+                async def fetch():
+                    # Off the event loop, so long range reads don't stall other requests
+                    events = await asyncio.to_thread(self.event_store.range, calendar_id, start_time, end_time)
+                    self.cache.put(key, events, day_buckets([calendar_id], start_time, end_time), token)
+                    return events
+
+                events = await self.flights.do("get_events", (key, token), fetch)
+            return list(events)
         except Exception as e:
             logger.error(f"Error fetching events: {e}")
             raise
 
+    async def iter_events(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        calendar_id: Optional[str] = None,
+        after: Optional[Tuple[int, str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield events in the range in (start, id) order, a page at a time
+
+        Resumes after the ``after`` key (see ``EventStore.sort_key``), so
+        cursor pagination and streaming never hold the whole range.
+        """
+        calendar_id = calendar_id or self.calendar_id
+        await self.sync_remote_changes()
+        while True:
+            page = await asyncio.to_thread(
+                self.event_store.range_page, calendar_id, start_time, end_time, after, EVENT_PAGE_SIZE
+            )
+            for event in page:
+                yield event
+            if len(page) < EVENT_PAGE_SIZE:
+                return
+            after = self.event_store.sort_key(page[-1])
+
+    async def iter_available_slots(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        duration_minutes: int = 60,
+        working_hours_start: int = 9,
+        working_hours_end: int = 17,
+        calendar_ids: Optional[List[str]] = None,
+        step_minutes: Optional[int] = None,
+        after: Optional[datetime] = None
+    ) -> AsyncIterator[Dict[str, datetime]]:
+        """Yield free slots in start order, SLOT_WINDOW_DAYS at a time
+
+        Slots never cross midnight, so computing the range window by window
+        gives the same slots as ``get_available_slots`` while holding only one
+        window's events. With ``after``, slots starting at or before it are
+        skipped and windows before its day are not computed at all.
+        """
+        window_start = start_time
+        if after is not None:
+            window_start = max(start_time, after.replace(hour=0, minute=0, second=0, microsecond=0))
+        while window_start < end_time:
+            midnight = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            window_end = min(midnight + timedelta(days=SLOT_WINDOW_DAYS), end_time)
+            slots = await self.get_available_slots(
+                window_start,
+                window_end,
+                duration_minutes=duration_minutes,
+                working_hours_start=working_hours_start,
+                working_hours_end=working_hours_end,
+                calendar_ids=calendar_ids,
+                step_minutes=step_minutes
+            )
+            for slot in slots:
+                if after is None or slot['start'] > after:
+                    yield slot
+            window_start = window_end
+
+    @timed_calendar_call
     async def get_available_slots(
         self,
         start_time: datetime,
         end_time: datetime,
         duration_minutes: int = 60,
         working_hours_start: int = 9,
-        working_hours_end: int = 17    
+        working_hours_end: int = 17,
+        calendar_ids: Optional[List[str]] = None,
+        step_minutes: Optional[int] = None,
+        events_by_calendar: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        token: Optional[int] = None
     ) -> List[Dict[str, datetime]]:
-        """Find available time slots in the given time range"""
+        """Find available time slots in the given time range
+
+        A slot is free only when every calendar in ``calendar_ids`` (default:
+        this service's calendar) has no event overlapping it. Calendars found in
+        ``events_by_calendar`` use those already-fetched events for the range;
+        pass the cache ``token`` taken before they were read, so a write made
+        since then keeps the result out of the cache.
+        """
         try:
-            # Mock implementation - generate sample available slots
-            available_slots = []
-            current_date = start_time.date()
-            end_date = end_time.date()
-
-            while current_date <= end_date:
-                # Skip weekends
-                if current_date.weekday() < 5:  # Monday to Friday
-                    # Generate 3 slots per day for demo
-                    for hour in [9, 14, 16]:
-                        slot_start = datetime.combine(current_date, datetime.min.time().replace(hour=hour))
-                        if slot_start >= start_time and slot_start <= end_time:
-                            available_slots.append({
-                                'start': slot_start,
-                                'end': slot_start + timedelta(minutes=duration_minutes)
-                            })
-                
-                current_date += timedelta(days=1)
-
-            return available_slots[:10]  # Return first 10 slots
+            calendar_ids = list(calendar_ids or [self.calendar_id])
+            await self.sync_remote_changes()
+            key = (
+                "slots", tuple(calendar_ids), start_time, end_time, duration_minutes,
+                working_hours_start, working_hours_end, step_minutes
+            )
+            found, slots = self.cache.get(key)
+            if found:
+                return list(slots)
+            if token is None:
+                token = self.cache.token()
+
+            async def compute():
+                engine = AvailabilityEngine(working_hours_start, working_hours_end)
+
+                busy_intervals = await self._busy_intervals(calendar_ids, start_time, end_time, events_by_calendar)
+                slots = engine.find_slots(
+                    busy_intervals,
+                    start_time,
+                    end_time,
+                    duration_minutes=duration_minutes,
+                    step_minutes=step_minutes
+                )
+                self.cache.put(key, slots, day_buckets(calendar_ids, start_time, end_time), token)
+                return slots
+
+            slots = await self.flights.do("get_available_slots", (key, token), compute)
+            return list(slots)
 
         except Exception as e:
             logger.error(f"Error finding available slots: {e}")
             raise
 
+    async def _busy_intervals(
+        self,
+        calendar_ids: List[str],
+        start_time: datetime,
+        end_time: datetime,
+        events_by_calendar: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ) -> List[Tuple[datetime, datetime]]:
+        """(start, end) of every event in the range across the calendars"""
+        busy_intervals = []
+        for calendar_id in calendar_ids:
+            if events_by_calendar is not None and calendar_id in events_by_calendar:
+                events = events_by_calendar[calendar_id]
+            else:
+                events = await self.get_events(start_time, end_time, calendar_id=calendar_id)
+            for event in events:
+                interval = event_interval(event, self._parse_datetime)
+                if interval is not None:
+                    busy_intervals.append(interval)
+        return busy_intervals
+
+    @timed_calendar_call
+    async def get_availability_grid(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        cell_minutes: int = 30,
+        working_hours_start: int = 9,
+        working_hours_end: int = 17,
+        calendar_ids: Optional[List[str]] = None
+    ) -> List[Tuple[Any, int]]:
+        """Free/busy grid: (day, bitmap with bit ``j`` set when cell ``j`` is free)
+
+        Built from the same busy intervals as ``get_available_slots`` and
+        cached the same way; cell 0 starts at ``working_hours_start``.
+        """
+        try:
+            calendar_ids = list(calendar_ids or [self.calendar_id])
+            await self.sync_remote_changes()
+            key = (
+                "grid", tuple(calendar_ids), start_time, end_time, cell_minutes,
+                working_hours_start, working_hours_end
+            )
+            found, grid = self.cache.get(key)
+            if found:
+                return list(grid)
+            token = self.cache.token()
+
+            async def compute():
+                engine = AvailabilityEngine(working_hours_start, working_hours_end)
+                busy_intervals = await self._busy_intervals(calendar_ids, start_time, end_time)
+                grid = engine.occupancy_grid(busy_intervals, start_time, end_time, cell_minutes)
+                self.cache.put(key, grid, day_buckets(calendar_ids, start_time, end_time), token)
+                return grid
+
+            grid = await self.flights.do("get_availability_grid", (key, token), compute)
+            return list(grid)
+
+        except Exception as e:
+            logger.error(f"Error building availability grid: {e}")
+            raise
+
+    @timed_calendar_call
+    async def get_resource_slots(
+        self,
+        service: str,
+        start_time: datetime,
+        end_time: datetime,
+        duration_minutes: int = 60,
+        step_minutes: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Find slots where every resource the service needs is free
+
+        Each slot carries ``resources``: the id of the resource (and calendar)
+        assigned to each role, e.g. ``{'stylist': ..., 'chair': ...}``.
+        """
+        try:
+            resource_ids = self.scheduler.resources_for(service)
+            await self.sync_remote_changes()
+            key = ("resource_slots", service, start_time, end_time, duration_minutes, step_minutes, limit)
+            found, slots = self.cache.get(key)
+            if found:
+                return list(slots)
+            token = self.cache.token()
+
+            busy_by_resource = {}
+            for resource_id in resource_ids:
+                events = await self.get_events(start_time, end_time, calendar_id=resource_id)
+                busy_by_resource[resource_id] = [
+                    interval for interval in (event_interval(event, self._parse_datetime) for event in events)
+                    if interval is not None
+                ]
+
+            slots = self.scheduler.find_slots(
+                service,
+                duration_minutes,
+                busy_by_resource,
+                start_time,
+                end_time,
+                step_minutes=step_minutes,
+                limit=limit
+            )
+            self.cache.put(key, slots, day_buckets(resource_ids, start_time, end_time), token)
+            return list(slots)
+
+        except Exception as e:
+            logger.error(f"Error finding resource slots: {e}")
+            raise
+
+    @timed_calendar_call
+    async def get_available_slots_batch(
+        self,
+        queries: List[Dict[str, Any]],
+        max_concurrency: int = 8
+    ) -> List[Any]:
+        """Answer many availability queries, reading each (calendar, range) once
+
+        Each query holds ``start_time``, ``end_time`` and optionally
+        ``duration_minutes`` and ``calendar_id``. Results come back in query
+        order; a failed query yields its exception instead of a slot list.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # Taken before any events are read: slots computed from them must not
+        # be cached if a write lands while the batch runs
+        await self.sync_remote_changes()
+        token = self.cache.token()
+
+        ranges = {}
+        for query in queries:
+            calendar_id = query.get("calendar_id") or self.calendar_id
+            ranges.setdefault((calendar_id, query["start_time"], query["end_time"]), None)
+
+        async def fetch(range_key):
+            calendar_id, start_time, end_time = range_key
+            async with semaphore:
+                return await self.get_events(start_time, end_time, calendar_id=calendar_id)
+
+        fetched = await asyncio.gather(*(fetch(range_key) for range_key in ranges), return_exceptions=True)
+        events_by_range = dict(zip(ranges, fetched))
+
+        async def answer(query):
+            calendar_id = query.get("calendar_id") or self.calendar_id
+            events = events_by_range[(calendar_id, query["start_time"], query["end_time"])]
+            if isinstance(events, Exception):
+                raise events
+            async with semaphore:
+                return await self.get_available_slots(
+                    query["start_time"],
+                    query["end_time"],
+                    duration_minutes=query.get("duration_minutes", 60),
+                    calendar_ids=[calendar_id],
+                    events_by_calendar={calendar_id: events},
+                    token=token
+                )
+
+        return await asyncio.gather(*(answer(query) for query in queries), return_exceptions=True)
+
+    @timed_calendar_call
     async def create_event(
         self,
         title: str,
         description: str,
         start_time: datetime,
         end_time: datetime,
-        attendee_email: Optional[str] = None
+        attendee_email: Optional[str] = None,
+        calendar_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """Create a new event in the calendar"""
         try:
-            # Mock implementation
-            mock_event = {
-                'id': f'mock_event_{datetime.now().timestamp()}',
-                'summary': title,
-                'description': description,
-                'start': {'dateTime': start_time.isoformat()},
-                'end': {'dateTime': end_time.isoformat()},
-                'status': 'confirmed'
-            }
-            
-            logger.info(f"Created mock event: {mock_event['id']}")
-            return mock_event
+            event = await asyncio.to_thread(
+                self.event_store.insert,
+                calendar_id=calendar_id or self.calendar_id,
+                summary=title,
+                description=description,
+                start_time=start_time,
+                end_time=end_time,
+                attendee_email=attendee_email
+            )
+            self._invalidate_event(event)
+
+            logger.info(f"Created event: {event['id']}")
+            return event
 
         except Exception as e:
             logger.error(f"Error creating event: {e}")
             raise
 
+    @timed_calendar_call
+    async def book_event(
+        self,
+        title: str,
+        description: str,
+        start_time: datetime,
+        end_time: datetime,
+        attendee_email: Optional[str] = None,
+        calendar_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create an event only if the time is free; raises SlotConflictError otherwise"""
+        try:
+            event = await asyncio.to_thread(
+                self.event_store.insert,
+                calendar_id=calendar_id or self.calendar_id,
+                summary=title,
+                description=description,
+                start_time=start_time,
+                end_time=end_time,
+                attendee_email=attendee_email,
+                if_free=True
+            )
+            self._invalidate_event(event)
+
+            logger.info(f"Booked event: {event['id']}")
+            return event
+
+        except SlotConflictError as e:
+            logger.info(f"Booking conflict: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error booking event: {e}")
+            raise
+
+    @timed_calendar_call
+    async def find_alternative_slots(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        calendar_id: Optional[str] = None,
+        count: int = 3,
+        search_days: int = 3
+    ) -> List[Dict[str, datetime]]:
+        """Free slots of the same length closest to the requested start time"""
+        duration_minutes = max(int((end_time - start_time).total_seconds() // 60), 1)
+        # Never offer times in the past; start from the next half hour
+        now = next_boundary(datetime.now(start_time.tzinfo))
+        window_start = max(start_time - timedelta(days=search_days), now)
+        slots = await self.get_available_slots(
+            window_start,
+            start_time + timedelta(days=search_days),
+            duration_minutes=duration_minutes,
+            calendar_ids=[calendar_id or self.calendar_id],
+            step_minutes=30
+        )
+        slots.sort(key=lambda slot: abs((slot['start'] - start_time).total_seconds()))
+        return slots[:count]
+
+    @timed_calendar_call
     async def update_event(self, event_id: str, **kwargs) -> Dict[str, Any]:
         """Update an existing event"""
         try:
-            logger.info(f"Updated mock event: {event_id}")
-            return {'id': event_id, 'status': 'updated'}
+            previous = await asyncio.to_thread(self.event_store.get, event_id)
+            event = await asyncio.to_thread(self.event_store.update, event_id, **kwargs)
+            self._invalidate_event(previous)
+            self._invalidate_event(event)
+            logger.info(f"Updated event: {event_id}")
+            return event
         except Exception as e:
             logger.error(f"Error updating event: {e}")
             raise
 
+    @timed_calendar_call
     async def delete_event(self, event_id: str) -> bool:
         """Delete an event from the calendar"""
         try:
-            logger.info(f"Deleted mock event: {event_id}")
-            return True
+            try:
+                previous = await asyncio.to_thread(self.event_store.get, event_id)
+            except EventNotFoundError:
+                previous = None
+            deleted = await asyncio.to_thread(self.event_store.delete, event_id)
+            if previous is not None:
+                self._invalidate_event(previous)
+            logger.info(f"Deleted event: {event_id}" if deleted else f"Event not found for delete: {event_id}")
+            return deleted
         except Exception as e:
             logger.error(f"Error deleting event: {e}")
             return False
 
+    async def sync_remote_changes(self) -> int:
+        """Apply writes committed by other processes sharing the event store
+
+        Cheap when nothing changed: one ``PRAGMA data_version`` read. Otherwise
+        the change feed is replayed through the same invalidation and listener
+        path as local writes. Returns the number of changes applied.
+        """
+        # Off the event loop: another worker holding the write lock can keep
+        # these reads waiting for up to the store's busy_timeout. Readers that
+        # arrive before a poll starts reading share it; later ones start the
+        # next, so every read still sees the writes committed before it began
+        poll = self._change_poll
+        if poll is None or poll[0]["started"]:
+            poll = self._change_poll = self._start_change_poll()
+        version, changes = await asyncio.shield(poll[1])
+        if version == self._data_version:
+            return 0
+        self._data_version = version
+        applied = 0
+        for seq, calendar_id, start, end in changes:
+            # Overlapping syncs read the same entries; apply each once
+            if seq <= self._change_seq:
+                continue
+            self._change_seq = seq
+            self._invalidate_event({
+                'calendar_id': calendar_id,
+                'start': {'dateTime': start},
+                'end': {'dateTime': end},
+            })
+            applied += 1
+        return applied
+
+    def _start_change_poll(self) -> Tuple[Dict[str, bool], asyncio.Future]:
+        state = {"started": False}
+
+        def read():
+            state["started"] = True
+            return self._read_remote_changes()
+
+        return state, asyncio.ensure_future(asyncio.to_thread(read))
+
+    def _read_remote_changes(self) -> Tuple[int, List[Tuple[int, str, str, str]]]:
+        """(data version, change-feed entries after the last applied one); no entries if unchanged"""
+        version = self.event_store.data_version()
+        if version == self._data_version:
+            return version, []
+        changes = []
+        seq = self._change_seq
+        while True:
+            batch = self.event_store.changes_since(seq, limit=CHANGE_FEED_BATCH)
+            changes.extend(batch)
+            if len(batch) < CHANGE_FEED_BATCH:
+                return version, changes
+            seq = batch[-1][0]
+
+    def _invalidate_event(self, event: Dict[str, Any]):
+        """Drop cached range reads for the days an event covers and notify listeners"""
+        interval = event_interval(event, self._parse_datetime)
+        if interval is not None:
+            calendar_id = event.get('calendar_id', self.calendar_id)
+            self.cache.invalidate(day_buckets([calendar_id], *interval))
+        for listener in self.write_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Calendar write listener failed: {e}")
+
     def _parse_datetime(self, datetime_str: str) -> datetime:
         """Parse datetime string from Google Calendar API"""
         try:
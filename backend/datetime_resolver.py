@@ -0,0 +1,217 @@
+"""
+Resolves date/time phrases in chat messages into concrete datetime ranges.
+
+All recognised expressions live in one precompiled alternation that is
+scanned once per message. What was matched is reduced to a reference-free
+spec (a relative day plus a time of day), memoised per normalised message, so
+repeated utterances skip the parse and only the cheap date arithmetic runs
+against the reference time.
+"""
+
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+
+# (start hour, end hour) for parts of the day
+DAY_PARTS = {"morning": (9, 12), "afternoon": (12, 17), "evening": (17, 21), "tonight": (17, 21)}
+
+_MONTH_NAMES = (
+    r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+)
+
+DATETIME_PATTERN = re.compile(
+    r"\b(?:"
+    r"(?P<rel_day>day after tomorrow|tomorrow|today|tonight)"
+    r"|(?P<week_mod>next|this)\s+week"
+    r"|(?:(?P<weekday_mod>next|this)\s+)?(?P<weekday>" + "|".join(WEEKDAYS) + r")"
+    r"|in\s+(?P<in_count>\d+|an?|one|two|three|four|five)\s+(?P<in_unit>days?|weeks?)"
+    r"|(?P<month>" + _MONTH_NAMES + r")\.?\s+(?P<month_day>\d{1,2})(?:st|nd|rd|th)?"
+    r"|(?P<num_month>\d{1,2})/(?P<num_day>\d{1,2})"
+    r"|(?:at\s+)?(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>[ap])\.?m\b\.?"
+    r"|(?:at\s+)?(?P<hour24>\d{1,2}):(?P<minute24>\d{2})"
+    r"|at\s+(?P<bare_hour>\d{1,2})(?![:\d])"
+    r"|(?P<noon>noon|midday)"
+    r"|(?P<part>morning|afternoon|evening)"
+    r")\b"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Day specs: ("offset", days) | ("weekday", index, skip_today) | ("week", weeks_ahead)
+#            | ("date", month, day)
+# Time specs: ("at", hour, minute) | ("span", start_hour, end_hour)
+Spec = Tuple[Optional[tuple], Optional[tuple]]
+
+
+class ResolvedDateTime(NamedTuple):
+    """A concrete range resolved from a phrase"""
+    start: datetime
+    end: datetime
+    exact_time: bool
+    description: str
+
+
+def _day_label(day: date) -> str:
+    return f"{day:%A, %B} {day.day}"
+
+
+def _hour_from_meridiem(hour: int, meridiem: str) -> int:
+    hour %= 12
+    return hour + 12 if meridiem == "p" else hour
+
+
+def _salon_hour(hour: int) -> int:
+    """Hour for a time given without am/pm: "2" means the afternoon, "10" the morning"""
+    return hour + 12 if 1 <= hour < 8 else hour
+
+
+def _parse_spec(normalized: str) -> Optional[Spec]:
+    day_spec = None
+    time_spec = None
+    for match in DATETIME_PATTERN.finditer(normalized):
+        groups = match.groupdict()
+        if groups["rel_day"]:
+            phrase = groups["rel_day"]
+            offset = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}[phrase]
+            day_spec = day_spec or ("offset", offset)
+            if phrase == "tonight" and time_spec is None:
+                time_spec = ("span",) + DAY_PARTS["tonight"]
+        elif groups["week_mod"]:
+            day_spec = day_spec or ("week", 1 if groups["week_mod"] == "next" else 0)
+        elif groups["weekday"]:
+            day_spec = ("weekday", WEEKDAYS.index(groups["weekday"]), groups["weekday_mod"] == "next")
+        elif groups["in_unit"]:
+            count = groups["in_count"]
+            count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+            day_spec = ("offset", count * (7 if groups["in_unit"].startswith("week") else 1))
+        elif groups["month"]:
+            day_spec = ("date", MONTHS[groups["month"][:3]], int(groups["month_day"]))
+        elif groups["num_month"]:
+            day_spec = ("date", int(groups["num_month"]), int(groups["num_day"]))
+        elif groups["meridiem"]:
+            hour = int(groups["hour"])
+            minute = int(groups["minute"] or 0)
+            if 1 <= hour <= 12 and minute < 60:
+                time_spec = ("at", _hour_from_meridiem(hour, groups["meridiem"]), minute)
+        elif groups["hour24"]:
+            hour, minute = int(groups["hour24"]), int(groups["minute24"])
+            if hour < 24 and minute < 60:
+                # "at 2:30" reads like "at 2", unless written as 14:30 or 02:30
+                time_spec = ("at", hour if groups["hour24"].startswith("0") else _salon_hour(hour), minute)
+        elif groups["bare_hour"]:
+            hour = int(groups["bare_hour"])
+            if 1 <= hour <= 12:
+                time_spec = ("at", _salon_hour(hour), 0)
+        elif groups["noon"]:
+            time_spec = ("at", 12, 0)
+        elif groups["part"] and (time_spec is None or time_spec[0] == "span"):
+            time_spec = ("span",) + DAY_PARTS[groups["part"]]
+
+    if day_spec is None and time_spec is None:
+        return None
+    return day_spec, time_spec
+
+
+class DateTimeResolver:
+    """Turns phrases like "next Tuesday at 2pm" into datetime ranges"""
+
+    def __init__(self, cache_size: int = 4096, default_duration_minutes: int = 60):
+        self.default_duration_minutes = default_duration_minutes
+        self._spec = lru_cache(maxsize=cache_size)(_parse_spec)
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase and collapse whitespace so equivalent phrasings share a memo entry"""
+        return _WHITESPACE.sub(" ", message.lower()).strip()
+
+    def spec(self, message: str) -> Optional[Spec]:
+        """Reference-free interpretation of the message, memoised"""
+        return self._spec(self.normalize(message))
+
+    def cache_info(self):
+        """Hit/miss statistics of the phrase memo"""
+        return self._spec.cache_info()
+
+    def resolve(
+        self,
+        message: str,
+        reference: Optional[datetime] = None,
+        duration_minutes: Optional[int] = None
+    ) -> Optional[ResolvedDateTime]:
+        """Resolve the message against ``reference`` (default: now)"""
+        spec = self.spec(message)
+        if spec is None:
+            return None
+        reference = reference or datetime.now()
+        duration = timedelta(minutes=duration_minutes or self.default_duration_minutes)
+        day_spec, time_spec = spec
+
+        if day_spec is not None and day_spec[0] == "week":
+            today = reference.date()
+            week_start = today - timedelta(days=today.weekday()) + timedelta(weeks=day_spec[1])
+            first_day = max(week_start, today)
+            start = datetime.combine(first_day, time(0), tzinfo=reference.tzinfo)
+            end = datetime.combine(week_start + timedelta(days=7), time(0), tzinfo=reference.tzinfo)
+            label = "next week" if day_spec[1] else "this week"
+            return ResolvedDateTime(start, end, False, label)
+
+        day = self._resolve_day(day_spec, time_spec, reference)
+        if day is None:
+            return None
+        if time_spec is None:
+            start = datetime.combine(day, time(0), tzinfo=reference.tzinfo)
+            return ResolvedDateTime(start, start + timedelta(days=1), False, _day_label(day))
+        if time_spec[0] == "at":
+            start = datetime.combine(day, time(time_spec[1], time_spec[2]), tzinfo=reference.tzinfo)
+            description = f"{_day_label(day)} at {start.strftime('%I:%M %p').lstrip('0')}"
+            return ResolvedDateTime(start, start + duration, True, description)
+
+        _, start_hour, end_hour = time_spec
+        start = datetime.combine(day, time(start_hour), tzinfo=reference.tzinfo)
+        end = datetime.combine(day, time(0), tzinfo=reference.tzinfo) + timedelta(hours=end_hour)
+        part = next(name for name, hours in DAY_PARTS.items() if hours == (start_hour, end_hour))
+        return ResolvedDateTime(start, end, False, f"{_day_label(day)} {part}")
+
+    @staticmethod
+    def _resolve_day(day_spec: Optional[tuple], time_spec: Optional[tuple], reference: datetime) -> Optional[date]:
+        """The day the spec names, or None when it names no real day"""
+        today = reference.date()
+        if day_spec is None:
+            # A bare time means the next time it comes round
+            if time_spec is not None and time_spec[0] == "at" and (time_spec[1], time_spec[2]) <= (
+                reference.hour, reference.minute
+            ):
+                return today + timedelta(days=1)
+            return today
+        kind = day_spec[0]
+        if kind == "offset":
+            try:
+                return today + timedelta(days=day_spec[1])
+            except OverflowError:
+                # "in 99999999 days": past the last representable date
+                return None
+        if kind == "weekday":
+            days_ahead = (day_spec[1] - today.weekday()) % 7
+            if days_ahead == 0 and day_spec[2]:
+                days_ahead = 7
+            return today + timedelta(days=days_ahead)
+        # ("date", month, day): this year, or next year once it has passed
+        _, month, day_of_month = day_spec
+        for year in (today.year, today.year + 1):
+            try:
+                candidate = date(year, month, day_of_month)
+            except ValueError:
+                continue
+            if candidate >= today:
+                return candidate
+        # No such date within a year, e.g. "13/45"
+        return None
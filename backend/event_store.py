@@ -0,0 +1,530 @@
+"""
+Persistent local event store backed by SQLite.
+
+Stands in for Google Calendar during development and load testing. Events are
+indexed on (calendar_id, start_ts, id) so range reads are index scans bounded on
+both sides: an event overlapping [start, end) must start before ``end`` and no
+earlier than ``start - max_span``, where ``max_span`` is the longest event ever
+stored in that calendar.
+
+Every write also appends the interval it touched to a ``changes`` table in the
+same transaction. Processes sharing the database file (uvicorn/gunicorn
+workers) poll ``PRAGMA data_version`` and read that feed to learn about each
+other's writes.
+
+With ``outbox=True`` every insert, update and delete also queues the event in
+an ``outbox`` table in the same transaction, for ``outbox.CalendarSync`` to
+push to the remote calendar. Entries are leased while being pushed, so several
+processes can drain the outbox together.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    calendar_id TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    location TEXT,
+    attendee_email TEXT,
+    status TEXT NOT NULL DEFAULT 'confirmed',
+    start TEXT NOT NULL,
+    "end" TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_calendar_start ON events (calendar_id, start_ts, id);
+CREATE TABLE IF NOT EXISTS calendars (
+    calendar_id TEXT PRIMARY KEY,
+    max_span INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    calendar_id TEXT NOT NULL,
+    start TEXT NOT NULL,
+    "end" TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    event TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    leased_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_event ON outbox (event_id, seq);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, seq);
+"""
+
+EVENT_COLUMNS = "id, calendar_id, summary, description, location, attendee_email, status, start, \"end\""
+
+UPDATABLE_FIELDS = {
+    "title": "summary",
+    "summary": "summary",
+    "description": "description",
+    "location": "location",
+    "attendee_email": "attendee_email",
+    "status": "status",
+}
+
+
+class OutboxEntry(NamedTuple):
+    """A queued calendar write: ``op`` is create, update or delete"""
+    seq: int
+    event_id: str
+    op: str
+    event: Dict[str, Any]
+    attempts: int
+    created: float
+
+
+class EventNotFoundError(LookupError):
+    """Raised when an event id does not exist in the store"""
+
+
+class SlotConflictError(Exception):
+    """Raised when a booking overlaps an existing event"""
+
+    def __init__(self, conflicting_event_id: str):
+        super().__init__(f"Time slot overlaps existing event {conflicting_event_id}")
+        self.conflicting_event_id = conflicting_event_id
+
+
+def to_timestamp(value: datetime) -> int:
+    """Sortable integer key for a datetime (naive values are local time)"""
+    return int(value.timestamp())
+
+
+class EventStore:
+    """SQLite event store in WAL mode, safe to share across threads"""
+
+    def __init__(self, path: str = ":memory:", outbox: bool = False):
+        self.path = path
+        self.outbox = outbox
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Event store ready at {path}")
+
+    def close(self):
+        """Close the underlying connection"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_event(row: sqlite3.Row) -> Dict[str, Any]:
+        event = {
+            'id': row['id'],
+            'calendar_id': row['calendar_id'],
+            'summary': row['summary'],
+            'description': row['description'],
+            'start': {'dateTime': row['start']},
+            'end': {'dateTime': row['end']},
+            'status': row['status'],
+        }
+        if row['location']:
+            event['location'] = row['location']
+        if row['attendee_email']:
+            event['attendees'] = [{'email': row['attendee_email']}]
+        return event
+
+    def _bump_max_span(self, calendar_id: str, span: int):
+        self._conn.execute(
+            "INSERT INTO calendars (calendar_id, max_span) VALUES (?, ?) "
+            "ON CONFLICT(calendar_id) DO UPDATE SET max_span = MAX(max_span, excluded.max_span)",
+            (calendar_id, span)
+        )
+
+    def _record_change(self, calendar_id: str, start: str, end: str):
+        self._conn.execute(
+            "INSERT INTO changes (calendar_id, start, \"end\", created) VALUES (?, ?, ?, ?)",
+            (calendar_id, start, end, time.time())
+        )
+
+    def _enqueue(self, op: str, event_id: str):
+        # Called inside the write transaction, after an insert or update and
+        # before a delete, so the queued event is the one the write produced
+        if not self.outbox:
+            return
+        row = self._conn.execute(f"SELECT {EVENT_COLUMNS} FROM events WHERE id = ?", (event_id,)).fetchone()
+        self._conn.execute(
+            "INSERT INTO outbox (event_id, op, event, created) VALUES (?, ?, ?, ?)",
+            (event_id, op, json.dumps(self._row_to_event(row)), time.time())
+        )
+
+    def _max_span(self, calendar_id: str) -> Optional[int]:
+        row = self._conn.execute(
+            "SELECT max_span FROM calendars WHERE calendar_id = ?", (calendar_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def insert(
+        self,
+        calendar_id: str,
+        summary: str,
+        start_time: datetime,
+        end_time: datetime,
+        description: str = "",
+        attendee_email: Optional[str] = None,
+        location: Optional[str] = None,
+        event_id: Optional[str] = None,
+        if_free: bool = False
+    ) -> Dict[str, Any]:
+        """Insert a single event and return it
+
+        With ``if_free`` the overlap check and the insert run in one write
+        transaction, so concurrent bookers (threads or processes) cannot both
+        claim the same time; the loser gets ``SlotConflictError``.
+        """
+        if end_time <= start_time:
+            raise ValueError("Event end time must be after its start time")
+        event_id = event_id or uuid.uuid4().hex
+        start_ts, end_ts = to_timestamp(start_time), to_timestamp(end_time)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if if_free:
+                    conflict = self._first_overlap(calendar_id, start_ts, end_ts)
+                    if conflict is not None:
+                        raise SlotConflictError(conflict)
+                self._conn.execute(
+                    f"INSERT INTO events ({EVENT_COLUMNS}, start_ts, end_ts) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'confirmed', ?, ?, ?, ?)",
+                    (event_id, calendar_id, summary, description, location, attendee_email,
+                     start_time.isoformat(), end_time.isoformat(), start_ts, end_ts)
+                )
+                self._bump_max_span(calendar_id, end_ts - start_ts)
+                self._record_change(calendar_id, start_time.isoformat(), end_time.isoformat())
+                self._enqueue("create", event_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(event_id)
+
+    def _first_overlap(self, calendar_id: str, start_ts: int, end_ts: int) -> Optional[str]:
+        max_span = self._max_span(calendar_id)
+        if max_span is None:
+            return None
+        row = self._conn.execute(
+            "SELECT id FROM events "
+            "WHERE calendar_id = ? AND start_ts >= ? AND start_ts < ? AND end_ts > ? "
+            "AND status != 'cancelled' LIMIT 1",
+            (calendar_id, start_ts - max_span, end_ts, start_ts)
+        ).fetchone()
+        return row[0] if row else None
+
+    def bulk_insert(self, calendar_id: str, events: Iterable[Dict[str, Any]]) -> int:
+        """Insert many events in one transaction; each needs summary, start and end datetimes"""
+        rows = []
+        max_span = 0
+        first_start = last_end = None
+        for event in events:
+            start_time, end_time = event['start'], event['end']
+            start_ts, end_ts = to_timestamp(start_time), to_timestamp(end_time)
+            max_span = max(max_span, end_ts - start_ts)
+            first_start = start_time if first_start is None else min(first_start, start_time)
+            last_end = end_time if last_end is None else max(last_end, end_time)
+            rows.append((
+                event.get('id') or uuid.uuid4().hex, calendar_id, event.get('summary', ''),
+                event.get('description', ''), event.get('location'), event.get('attendee_email'),
+                start_time.isoformat(), end_time.isoformat(), start_ts, end_ts
+            ))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO events ({EVENT_COLUMNS}, start_ts, end_ts) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'confirmed', ?, ?, ?, ?)",
+                    rows
+                )
+                self._bump_max_span(calendar_id, max_span)
+                if rows:
+                    # One change covering the whole batch keeps the feed small
+                    self._record_change(calendar_id, first_start.isoformat(), last_end.isoformat())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def get(self, event_id: str) -> Dict[str, Any]:
+        """Fetch one event by id"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {EVENT_COLUMNS} FROM events WHERE id = ?", (event_id,)
+            ).fetchone()
+        if row is None:
+            raise EventNotFoundError(f"Event not found: {event_id}")
+        return self._row_to_event(row)
+
+    def range(self, calendar_id: str, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Return events overlapping [start_time, end_time), ordered by start time"""
+        start_ts, end_ts = to_timestamp(start_time), to_timestamp(end_time)
+        with self._lock:
+            max_span = self._max_span(calendar_id)
+            if max_span is None:
+                return []
+            rows = self._conn.execute(
+                f"SELECT {EVENT_COLUMNS} FROM events "
+                "WHERE calendar_id = ? AND start_ts >= ? AND start_ts < ? AND end_ts > ? "
+                "ORDER BY start_ts, id",
+                (calendar_id, start_ts - max_span, end_ts, start_ts)
+            ).fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    def range_page(
+        self,
+        calendar_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        after: Optional[Tuple[int, str]] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Up to ``limit`` events of ``range`` that sort after the ``after`` key
+
+        Keys are ``(start_ts, id)``, the index order, so each page is one
+        index seek however deep into the range it starts.
+        """
+        start_ts, end_ts = to_timestamp(start_time), to_timestamp(end_time)
+        with self._lock:
+            max_span = self._max_span(calendar_id)
+            if max_span is None:
+                return []
+            # Events overlapping the range may start up to max_span before it
+            after_ts, after_id = after if after is not None else (start_ts - max_span - 1, "")
+            rows = self._conn.execute(
+                f"SELECT {EVENT_COLUMNS} FROM events "
+                "WHERE calendar_id = ? AND start_ts >= ? AND start_ts < ? AND end_ts > ? "
+                "AND (start_ts, id) > (?, ?) "
+                "ORDER BY start_ts, id LIMIT ?",
+                (calendar_id, start_ts - max_span, end_ts, start_ts, after_ts, after_id, limit)
+            ).fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    @staticmethod
+    def sort_key(event: Dict[str, Any]) -> Tuple[int, str]:
+        """The ``(start_ts, id)`` key ``range_page`` orders and resumes by"""
+        return to_timestamp(datetime.fromisoformat(event['start']['dateTime'])), event['id']
+
+    def explain_range(self, calendar_id: str, start_time: datetime, end_time: datetime) -> List[str]:
+        """Query plan for a range read, to confirm it uses the index"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT {EVENT_COLUMNS} FROM events "
+                "WHERE calendar_id = ? AND start_ts >= ? AND start_ts < ? AND end_ts > ? "
+                "ORDER BY start_ts, id",
+                (calendar_id, 0, to_timestamp(end_time), to_timestamp(start_time))
+            ).fetchall()
+        return [row['detail'] for row in rows]
+
+    def update(self, event_id: str, **fields) -> Dict[str, Any]:
+        """Update an event's fields; ``start_time``/``end_time`` move the event"""
+        assignments = []
+        params: List[Any] = []
+        for name, value in fields.items():
+            column = UPDATABLE_FIELDS.get(name)
+            if column is not None:
+                assignments.append(f"{column} = ?")
+                params.append(value)
+            elif name not in ("start_time", "end_time"):
+                raise ValueError(f"Unsupported event field: {name}")
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT calendar_id, start, \"end\" FROM events WHERE id = ?", (event_id,)
+                ).fetchone()
+                if row is None:
+                    raise EventNotFoundError(f"Event not found: {event_id}")
+
+                if "start_time" in fields or "end_time" in fields:
+                    start_time = fields.get("start_time") or datetime.fromisoformat(row['start'])
+                    end_time = fields.get("end_time") or datetime.fromisoformat(row['end'])
+                    if end_time <= start_time:
+                        raise ValueError("Event end time must be after its start time")
+                    start_ts, end_ts = to_timestamp(start_time), to_timestamp(end_time)
+                    assignments += ["start = ?", "\"end\" = ?", "start_ts = ?", "end_ts = ?"]
+                    params += [start_time.isoformat(), end_time.isoformat(), start_ts, end_ts]
+                    self._bump_max_span(row['calendar_id'], end_ts - start_ts)
+                    self._record_change(row['calendar_id'], start_time.isoformat(), end_time.isoformat())
+
+                if assignments:
+                    self._conn.execute(
+                        f"UPDATE events SET {', '.join(assignments)} WHERE id = ?",
+                        (*params, event_id)
+                    )
+                    self._record_change(row['calendar_id'], row['start'], row['end'])
+                    self._enqueue("update", event_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(event_id)
+
+    def delete(self, event_id: str) -> bool:
+        """Delete an event; returns False if it did not exist"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT calendar_id, start, \"end\" FROM events WHERE id = ?", (event_id,)
+                ).fetchone()
+                if row is not None:
+                    self._enqueue("delete", event_id)
+                    self._conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+                    self._record_change(row['calendar_id'], row['start'], row['end'])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def data_version(self) -> int:
+        """Changes whenever another connection (e.g. another worker) commits to the database"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def last_change_seq(self) -> int:
+        """Sequence number of the newest entry in the change feed"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq: int, limit: int = 1000) -> List[Tuple[int, str, str, str]]:
+        """(seq, calendar_id, start, end) of writes after ``seq``, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, calendar_id, start, \"end\" FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def prune_changes(self, max_age_seconds: float = 3600) -> int:
+        """Drop change-feed entries older than ``max_age_seconds``; returns how many"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM changes WHERE created < ?", (time.time() - max_age_seconds,)
+            )
+        return max(cursor.rowcount, 0)
+
+    def claim_outbox(self, limit: int, lease_seconds: float) -> List[OutboxEntry]:
+        """Lease up to ``limit`` due entries, each the oldest pending one for its event
+
+        An event's next write is not handed out while an earlier one is
+        pending, leased or backing off, so writes reach the calendar in the
+        order they were made. An entry whose lease runs out (its worker died)
+        is handed out again.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT seq, event_id, op, event, attempts, created FROM outbox AS o "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? AND leased_until <= ? "
+                    "AND NOT EXISTS (SELECT 1 FROM outbox AS p WHERE p.event_id = o.event_id "
+                    "AND p.seq < o.seq AND p.status = 'pending') "
+                    "ORDER BY seq LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET leased_until = ? WHERE seq = ?",
+                    [(now + lease_seconds, row['seq']) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [
+            OutboxEntry(row['seq'], row['event_id'], row['op'], json.loads(row['event']), row['attempts'], row['created'])
+            for row in rows
+        ]
+
+    def settle_outbox(
+        self,
+        delivered: Iterable[int] = (),
+        retries: Iterable[Tuple[int, float, str]] = (),
+        failures: Iterable[Tuple[int, str]] = ()
+    ):
+        """Record a pushed batch in one transaction
+
+        ``delivered`` entries are removed; ``retries`` are ``(seq, delay
+        seconds, error)`` and become due again after the delay; ``failures``
+        are ``(seq, error)`` and stay in the outbox with status 'failed'.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in delivered])
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, leased_until = 0, "
+                    "last_error = ? WHERE seq = ?",
+                    [(now + delay, error, seq) for seq, delay, error in retries]
+                )
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, status = 'failed', leased_until = 0, "
+                    "last_error = ? WHERE seq = ?",
+                    [(error, seq) for seq, error in failures]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def release_outbox(self, seqs: Iterable[int]):
+        """Hand leased entries back without counting an attempt"""
+        with self._lock:
+            self._conn.executemany("UPDATE outbox SET leased_until = 0 WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def next_outbox_attempt(self) -> Optional[float]:
+        """Earliest time ``claim_outbox`` may hand out another entry, or None if none are pending"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(MAX(next_attempt_at, leased_until)) FROM outbox AS o WHERE status = 'pending' "
+                "AND NOT EXISTS (SELECT 1 FROM outbox AS p WHERE p.event_id = o.event_id "
+                "AND p.seq < o.seq AND p.status = 'pending')"
+            ).fetchone()[0]
+
+    def outbox_counts(self) -> Dict[str, Any]:
+        """Pending and failed entries and the age of the oldest pending one"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*), MIN(created) FROM outbox GROUP BY status"
+            ).fetchall()
+        counts = {row[0]: (row[1], row[2]) for row in rows}
+        pending, oldest = counts.get("pending", (0, None))
+        return {
+            "pending": pending,
+            "failed": counts.get("failed", (0, None))[0],
+            "oldest_pending_seconds": time.time() - oldest if oldest is not None else 0.0,
+        }
+
+    def count(self, calendar_id: Optional[str] = None) -> int:
+        """Number of stored events, optionally for one calendar"""
+        with self._lock:
+            if calendar_id is None:
+                return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM events WHERE calendar_id = ?", (calendar_id,)
+            ).fetchone()[0]
@@ -0,0 +1,260 @@
+"""
+Idempotency key store for replaying write responses.
+
+Clients retrying a request send the same ``Idempotency-Key``. The first call
+runs and its response is stored with a fingerprint of the request body; later
+calls with the key get the stored response back without touching the
+calendar. Concurrent duplicates wait for the call already in flight.
+
+``SharedIdempotencyStore`` keeps the keys in a SQLite file, so a retry that
+lands on a different worker process still replays instead of running again.
+Its SQLite calls run in a thread: a write lock held by another worker can
+keep them waiting, and the event loop must not wait with them.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+StoredResponse = Tuple[int, Dict[str, Any]]
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """Raised when a key is reused with a different request body"""
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable hash of a JSON-serialisable request body"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Bounded, expiring map of idempotency key -> (fingerprint, stored response)"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, StoredResponse, float]]" = OrderedDict()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.replays = 0
+        self.executions = 0
+
+    def lookup(self, key: str, request_fingerprint: str) -> Optional[StoredResponse]:
+        """Return the stored response for a key, or None if unknown or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_fingerprint, response, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        if stored_fingerprint != request_fingerprint:
+            raise IdempotencyKeyMismatchError(f"Idempotency key {key!r} was used with a different request")
+        return response
+
+    def store(self, key: str, request_fingerprint: str, response: StoredResponse):
+        """Remember a response, evicting the oldest keys beyond ``max_entries``"""
+        self._entries[key] = (request_fingerprint, response, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def run(
+        self,
+        key: str,
+        request_fingerprint: str,
+        call: Callable[[], Awaitable[StoredResponse]],
+        should_store: Callable[[StoredResponse], bool] = lambda response: True
+    ) -> Tuple[StoredResponse, bool]:
+        """Run ``call`` once per key; returns (response, replayed)"""
+        stored = self.lookup(key, request_fingerprint)
+        if stored is not None:
+            self.replays += 1
+            return stored, True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            flight_fingerprint, future = in_flight
+            if flight_fingerprint != request_fingerprint:
+                raise IdempotencyKeyMismatchError(f"Idempotency key {key!r} was used with a different request")
+            self.replays += 1
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (request_fingerprint, future)
+        try:
+            self.executions += 1
+            response = await call()
+            if should_store(response):
+                self.store(key, request_fingerprint, response)
+            future.set_result(response)
+            return response, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters see the exception; nobody else is required to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Replay and execution counters"""
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "replays": self.replays,
+            "executions": self.executions,
+        }
+
+
+class SharedIdempotencyStore:
+    """Idempotency keys in a SQLite file shared by all worker processes
+
+    Same ``run`` contract as ``IdempotencyStore``. The first caller claims a key
+    by writing a pending row in a write transaction; duplicates on any worker
+    poll until the owner stores its response. The owner renews its claim every
+    ``renew_seconds`` while the call runs; a claim not renewed for
+    ``lease_seconds`` is treated as abandoned (its worker died) and taken over.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 24 * 3600,
+        lease_seconds: float = 30.0,
+        poll_seconds: float = 0.02,
+        renew_seconds: Optional[float] = None
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        # Several renewals fit in one lease, so one slow renewal does not lose it
+        self.renew_seconds = renew_seconds or lease_seconds / 3
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        # status_code is NULL while the owner is still running the call
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status_code INTEGER, "
+            "body TEXT, expires_at REAL NOT NULL)"
+        )
+        self.replays = 0
+        self.executions = 0
+
+    def _claim(self, key: str, request_fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        """("replay", response), ("wait", None) or ("owner", None)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT fingerprint, status_code, body, expires_at FROM idempotency_keys WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None and row[3] > now:
+                    if row[0] != request_fingerprint:
+                        raise IdempotencyKeyMismatchError(
+                            f"Idempotency key {key!r} was used with a different request"
+                        )
+                    self._conn.execute("COMMIT")
+                    if row[1] is None:
+                        return "wait", None
+                    return "replay", (row[1], json.loads(row[2]))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status_code, body, expires_at) "
+                    "VALUES (?, ?, NULL, NULL, ?)",
+                    (key, request_fingerprint, now + self.lease_seconds)
+                )
+                self._conn.execute("COMMIT")
+                return "owner", None
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _finish(self, key: str, response: StoredResponse):
+        status_code, body = response
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency_keys SET status_code = ?, body = ?, expires_at = ? WHERE key = ?",
+                (status_code, json.dumps(body, default=str), time.time() + self.ttl_seconds, key)
+            )
+
+    def _renew(self, key: str, request_fingerprint: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency_keys SET expires_at = ? "
+                "WHERE key = ? AND fingerprint = ? AND status_code IS NULL",
+                (time.time() + self.lease_seconds, key, request_fingerprint)
+            )
+
+    async def _keep_claim(self, key: str, request_fingerprint: str):
+        """Renew the claim on ``key`` until cancelled"""
+        while True:
+            await asyncio.sleep(self.renew_seconds)
+            try:
+                await asyncio.to_thread(self._renew, key, request_fingerprint)
+            except sqlite3.Error:
+                # Try again next round; the lease outlasts a few missed renewals
+                continue
+
+    def _release(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND status_code IS NULL", (key,))
+
+    async def run(
+        self,
+        key: str,
+        request_fingerprint: str,
+        call: Callable[[], Awaitable[StoredResponse]],
+        should_store: Callable[[StoredResponse], bool] = lambda response: True
+    ) -> Tuple[StoredResponse, bool]:
+        """Run ``call`` once per key across all workers; returns (response, replayed)"""
+        while True:
+            state, stored = await asyncio.to_thread(self._claim, key, request_fingerprint)
+            if state == "replay":
+                self.replays += 1
+                return stored, True
+            if state == "owner":
+                break
+            await asyncio.sleep(self.poll_seconds)
+
+        self.executions += 1
+        renewal = asyncio.create_task(self._keep_claim(key, request_fingerprint))
+        try:
+            response = await call()
+        except BaseException:
+            renewal.cancel()
+            # Failures are not stored, so a waiting duplicate may run the call itself
+            await asyncio.to_thread(self._release, key)
+            raise
+        renewal.cancel()
+        if should_store(response):
+            await asyncio.to_thread(self._finish, key, response)
+        else:
+            await asyncio.to_thread(self._release, key)
+        return response, False
+
+    def purge_expired(self) -> int:
+        """Drop expired keys and abandoned claims; returns how many"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (time.time(),))
+        return max(cursor.rowcount, 0)
+
+    def stats(self) -> Dict[str, int]:
+        """Replay and execution counters (this worker) and stored keys (all workers)"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0]
+        return {"entries": entries, "replays": self.replays, "executions": self.executions}
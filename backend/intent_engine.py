@@ -0,0 +1,110 @@
+"""
+Single-pass keyword intent classifier for the booking agent.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Keyword tables, listed in the priority order the agent resolves them in.
+BOOKING_KEYWORDS = [
+    "book", "schedule", "appointment", "reserve", "make an appointment",
+    "i want to book", "can i book", "schedule me", "i need"
+]
+AVAILABILITY_KEYWORDS = [
+    "available", "free", "open", "when can", "what times",
+    "availability", "slots", "schedule"
+]
+SERVICE_KEYWORDS = [
+    "service", "what do you offer", "price", "cost", "how much",
+    "services", "haircut", "styling", "coloring"
+]
+GREETING_KEYWORDS = ["hello", "hi", "hey", "good morning", "good afternoon"]
+
+DEFAULT_INTENT_TABLE: List[Tuple[str, List[str]]] = [
+    ("booking", BOOKING_KEYWORDS),
+    ("availability", AVAILABILITY_KEYWORDS),
+    ("service", SERVICE_KEYWORDS),
+    ("greeting", GREETING_KEYWORDS),
+]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Build a regex that matches the longest keyword at a position via a factored trie"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A keyword ends here, so the longer continuations are optional
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def _prefix_bits(keyword: str, masks: Dict[str, int]) -> int:
+    """OR of the masks of every shorter keyword that ``keyword`` starts with"""
+    bits = 0
+    for end in range(1, len(keyword)):
+        bits |= masks.get(keyword[:end], 0)
+    return bits
+
+
+class IntentClassifier:
+    """Scores every intent in one scan of the message using a precompiled keyword pattern"""
+
+    def __init__(self, intent_table: Optional[List[Tuple[str, List[str]]]] = None, default_intent: str = "general"):
+        table = intent_table if intent_table is not None else DEFAULT_INTENT_TABLE
+        self.intents = [name for name, _ in table]
+        self.default_intent = default_intent
+
+        # Each keyword maps to a bitmask of the intents it signals (bit 0 = highest priority)
+        masks: Dict[str, int] = {}
+        for bit, (_, keywords) in enumerate(table):
+            for keyword in keywords:
+                masks[keyword.lower()] = masks.get(keyword.lower(), 0) | (1 << bit)
+        # The pattern reports only the longest keyword at a position, so each
+        # keyword also carries the intents of the keywords it starts with
+        # ("schedule me" signals availability through "schedule")
+        self._masks = {
+            keyword: mask | _prefix_bits(keyword, masks) for keyword, mask in masks.items()
+        }
+        self._pattern = re.compile(_trie_pattern(self._masks))
+
+        # Precomputed winner for every combination of matched intents
+        self._winner = []
+        for bits in range(1 << len(self.intents)):
+            winner = self.default_intent
+            for bit, name in enumerate(self.intents):
+                if bits >> bit & 1:
+                    winner = name
+                    break
+            self._winner.append(winner)
+
+    def scan(self, message: str) -> int:
+        """Return the bitmask of all intents whose keywords appear in the message"""
+        text = message.lower()
+        search = self._pattern.search
+        masks = self._masks
+        bits = 0
+        match = search(text)
+        while match is not None:
+            bits |= masks[match.group()]
+            # Restart one character later so overlapping keywords are not skipped
+            match = search(text, match.start() + 1)
+        return bits
+
+    def matches(self, message: str) -> Dict[str, bool]:
+        """Return which intents matched the message"""
+        bits = self.scan(message)
+        return {name: bool(bits >> bit & 1) for bit, name in enumerate(self.intents)}
+
+    def classify(self, message: str) -> str:
+        """Return the highest priority intent that matched the message"""
+        return self._winner[self.scan(message)]
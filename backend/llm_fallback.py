@@ -0,0 +1,255 @@
+"""
+LLM fallback for messages the keyword classifier cannot place.
+
+When the rules classify a message as "general", the agent asks a model for the
+intent plus the service and date/time phrase it mentions. Model calls are the
+most expensive thing a chat turn can do, so every lookup goes through:
+
+1. a response cache keyed by the normalized message (LRU with a TTL);
+2. in-flight deduplication: a message already being asked about waits for
+   that call instead of starting another;
+3. micro-batching: misses arriving within ``batch_window_seconds`` of each
+   other (up to ``max_batch``) go to the model as one numbered prompt;
+4. a latency budget: a caller waits at most ``timeout_seconds`` and then
+   carries on with the rule-based reply. The call keeps running and its
+   answer still lands in the cache for the next asker.
+
+The model is reached through an OpenAI-compatible ``/chat/completions``
+endpoint, so a local stub server (``benchmarks/llm_stub.py``) can stand in
+for it offline.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from metrics import LLM_BATCH_SIZE, LLM_CALL_SECONDS, LLM_LOOKUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("booking", "availability", "service", "greeting", "general")
+SERVICES = ("haircut", "styling", "coloring", "consultation")
+
+SYSTEM_PROMPT = (
+    "You classify messages sent to a hair salon's booking assistant. The user "
+    "sends numbered messages, each a JSON string. Reply with a JSON object "
+    "{\"results\": [...]} holding one object per message with keys: index (the "
+    f"message number), intent (one of {', '.join(INTENTS)}), service (one of "
+    f"{', '.join(SERVICES)}, or null) and when (the date/time phrase the "
+    "message mentions, copied verbatim, or null)."
+)
+
+
+class Extraction(NamedTuple):
+    """Intent and slots the model found in a message"""
+    intent: str
+    service: Optional[str] = None
+    when: Optional[str] = None
+
+
+def normalize_message(message: str) -> str:
+    """Cache key for a message: lowercase words, punctuation and spacing dropped"""
+    return " ".join(re.findall(r"[a-z0-9']+", message.lower()))
+
+
+def parse_extraction(item: Dict[str, Any]) -> Optional[Extraction]:
+    """Validate one result object from the model"""
+    intent = item.get("intent")
+    if intent not in INTENTS:
+        return None
+    service = item.get("service")
+    when = item.get("when")
+    return Extraction(
+        intent=intent,
+        service=service if service in SERVICES else None,
+        when=when if isinstance(when, str) and when.strip() else None
+    )
+
+
+class LLMFallback:
+    """Cached, coalesced and micro-batched intent/slot extraction through a model"""
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str = "gpt-4o-mini",
+        api_key: Optional[str] = None,
+        timeout_seconds: float = 1.5,
+        call_timeout_seconds: float = 10.0,
+        batch_window_seconds: float = 0.01,
+        max_batch: int = 16,
+        cache_size: int = 10000,
+        cache_ttl_seconds: float = 3600.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self.call_timeout_seconds = call_timeout_seconds
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: "OrderedDict[str, Tuple[float, Extraction]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._pending: List[Tuple[str, str]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._client = None
+        self._counts = {
+            "lookups": 0, "cache_hit": 0, "coalesced": 0, "miss": 0, "timeout": 0, "unavailable": 0,
+            "calls": 0, "call_errors": 0, "batched_messages": 0,
+        }
+
+    async def extract(self, message: str) -> Optional[Extraction]:
+        """The model's reading of a message, or None if it is not available in time"""
+        key = normalize_message(message)
+        if not key:
+            return None
+        started = time.perf_counter()
+        result = self._cache_get(key)
+        if result is not None:
+            outcome = "cache_hit"
+        else:
+            future = self._in_flight.get(key)
+            if future is not None:
+                outcome = "coalesced"
+            else:
+                outcome = "miss"
+                future = self._submit(key, message)
+            try:
+                # Shielded: giving up on the budget must not cancel a call
+                # other callers (and the cache) are waiting on
+                result = await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            if result is None and outcome != "timeout":
+                outcome = "unavailable"
+
+        self._counts["lookups"] += 1
+        self._counts[outcome] += 1
+        LLM_LOOKUP_SECONDS.observe(time.perf_counter() - started, outcome)
+        return result
+
+    def _cache_get(self, key: str) -> Optional[Extraction]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return result
+
+    def _cache_put(self, key: str, result: Extraction):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _submit(self, key: str, message: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._in_flight[key] = future
+        self._pending.append((key, message))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window_seconds, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, str]]):
+        started = time.perf_counter()
+        try:
+            results = await self._complete([message for _, message in batch])
+            status = "ok"
+        except Exception as e:
+            logger.error(f"LLM fallback call failed: {e}")
+            results = [None] * len(batch)
+            status = "error"
+            self._counts["call_errors"] += 1
+        self._counts["calls"] += 1
+        self._counts["batched_messages"] += len(batch)
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, status)
+        LLM_BATCH_SIZE.observe(len(batch))
+
+        for (key, _), result in zip(batch, results):
+            if result is not None:
+                self._cache_put(key, result)
+            future = self._in_flight.pop(key)
+            if not future.done():
+                future.set_result(result)
+
+    def _http_client(self):
+        if self._client is None:
+            # Imported on first use to keep it off the startup path
+            import httpx
+
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, timeout=self.call_timeout_seconds
+            )
+        return self._client
+
+    async def _complete(self, messages: List[str]) -> List[Optional[Extraction]]:
+        """Ask the model about a batch of messages in one call"""
+        numbered = "\n".join(f"{index}. {json.dumps(message)}" for index, message in enumerate(messages, 1))
+        response = await self._http_client().post("/chat/completions", json={
+            "model": self.model,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": numbered},
+            ],
+        })
+        response.raise_for_status()
+        content = response.json()["choices"][0]["message"]["content"]
+        results: List[Optional[Extraction]] = [None] * len(messages)
+        for item in json.loads(content).get("results", []):
+            index = item.get("index") if isinstance(item, dict) else None
+            if isinstance(index, int) and 1 <= index <= len(messages):
+                results[index - 1] = parse_extraction(item)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup outcomes, cache hit rate and model call counts"""
+        lookups = self._counts["lookups"]
+        calls = self._counts["calls"]
+        return {
+            **self._counts,
+            "hit_rate": self._counts["cache_hit"] / lookups if lookups else 0.0,
+            "mean_batch_size": self._counts["batched_messages"] / calls if calls else 0.0,
+            "cache_entries": len(self._cache),
+            "in_flight": len(self._in_flight),
+        }
+
+    async def close(self):
+        """Cancel outstanding model calls and close the HTTP client"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,298 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Counters, gauges and histograms keep one small mutable record per label set.
+Recording is a dict lookup plus a few additions, with no lock: every update
+happens on the event loop thread. Histograms store per-bucket counts and are
+made cumulative only when ``/metrics`` is scraped.
+"""
+
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; tuned for an API whose calls take microseconds to a few seconds
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down per label set"""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set(self, *labels: str, value: float):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution per label set"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count in bucket 0, ..., count above the last bound, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, series):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "tailortalk_http_request_duration_seconds",
+    "HTTP request latency by route, method and status",
+    ("route", "method", "status")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "tailortalk_http_requests_in_flight",
+    "HTTP requests currently being handled, by route",
+    ("route",)
+))
+WEBSOCKETS_OPEN = REGISTRY.register(Gauge(
+    "tailortalk_websocket_connections",
+    "Open WebSocket connections, by route",
+    ("route",)
+))
+CHAT_INTENTS = REGISTRY.register(Counter(
+    "tailortalk_chat_intents_total",
+    "Chat replies by the intent branch that produced them",
+    ("intent",)
+))
+CALENDAR_CALL_SECONDS = REGISTRY.register(Histogram(
+    "tailortalk_calendar_call_duration_seconds",
+    "Calendar service call latency by method",
+    ("method",)
+))
+CALENDAR_CALL_ERRORS = REGISTRY.register(Counter(
+    "tailortalk_calendar_call_errors_total",
+    "Calendar service calls that raised, by method and exception type",
+    ("method", "error")
+))
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    "tailortalk_log_records_dropped_total",
+    "Log records dropped because the log queue was full, by level",
+    ("level",)
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "tailortalk_admission_rejected_total",
+    "Requests refused by admission control, by priority class and reason (session_rate, client_rate, overloaded)",
+    ("priority", "reason")
+))
+OUTBOX_PUSH_SECONDS = REGISTRY.register(Histogram(
+    "tailortalk_calendar_outbox_push_duration_seconds",
+    "Latency of pushes from the calendar outbox to the remote calendar, by operation and result",
+    ("op", "result")
+))
+OUTBOX_DELIVERY_SECONDS = REGISTRY.register(Histogram(
+    "tailortalk_calendar_outbox_delivery_lag_seconds",
+    "Time from a local calendar write to its delivery to the remote calendar, by operation",
+    ("op",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+))
+
+COALESCED_CALLS = REGISTRY.register(Counter(
+    "tailortalk_calendar_singleflight_calls_total",
+    "Calendar reads by method that ran (executed) or joined an identical call in flight (coalesced)",
+    ("method", "result")
+))
+LLM_LOOKUP_SECONDS = REGISTRY.register(Histogram(
+    "tailortalk_llm_fallback_lookup_duration_seconds",
+    "Time chat turns waited on the LLM fallback, by outcome (cache_hit, coalesced, miss, timeout, unavailable)",
+    ("outcome",)
+))
+LLM_CALL_SECONDS = REGISTRY.register(Histogram(
+    "tailortalk_llm_call_duration_seconds",
+    "Latency of batched calls to the model, by status",
+    ("status",)
+))
+LLM_BATCH_SIZE = REGISTRY.register(Histogram(
+    "tailortalk_llm_batch_size",
+    "Messages sent per model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def timed_calendar_call(method: Callable) -> Callable:
+    """Record latency and errors of an async calendar service method"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        except Exception as e:
+            CALENDAR_CALL_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            CALENDAR_CALL_SECONDS.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request under its route template"""
+
+    def __init__(self, app, unmatched_route: str = "unmatched"):
+        self.app = app
+        self.unmatched_route = unmatched_route
+        self._static_paths: Optional[frozenset] = None
+
+    def _in_flight_key(self, scope) -> str:
+        # The matched route is known only after routing; until then, label the
+        # request by its path if that is a route path, keeping cardinality bounded
+        if self._static_paths is None:
+            self._static_paths = frozenset(getattr(route, "path", None) for route in scope["app"].routes)
+        path = scope["path"]
+        return path if path in self._static_paths else self.unmatched_route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            path = self._in_flight_key(scope)
+            WEBSOCKETS_OPEN.inc(path)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                WEBSOCKETS_OPEN.dec(path)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status: List[Optional[int]] = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        path = self._in_flight_key(scope)
+        HTTP_IN_FLIGHT.inc(path)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status[0] = status[0] or 500
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec(path)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                getattr(route, "path", self.unmatched_route),
+                scope["method"],
+                str(status[0] or 500)
+            )
@@ -6,13 +6,27 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 
+# Upper bound on items accepted by the batch endpoints
+MAX_BATCH_ITEMS = 100
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
     message: str = Field(..., description="User's message")
-    session_id: str = Field(default="default", description="Session identifier")
+    session_id: str = Field(
+        default="default",
+        description="Session identifier; any id other than 'default' keeps history on the server"
+    )
     conversation_history: List[Dict[str, str]] = Field(
         default=[], 
-        description="Previous conversation exchanges"
+        description="Previous conversation exchanges; optional when the server keeps the session"
+    )
+
+class ChatBatchRequest(BaseModel):
+    """Request model for the batch chat endpoint"""
+    requests: List[ChatRequest] = Field(
+        ...,
+        max_length=MAX_BATCH_ITEMS,
+        description="Chat requests to process; answered in the same order"
     )
 
 class ChatResponse(BaseModel):
@@ -31,6 +45,21 @@ class ChatResponse(BaseModel):
         description="Whether the booking requires user confirmation"
     )
 
+class AvailabilitySlot(BaseModel):
+    """Model for available time slots"""
+    start: datetime = Field(..., description="Start time of the slot")
+    end: datetime = Field(..., description="End time of the slot")
+
+class ChatBatchItem(BaseModel):
+    """One result of a batch chat request"""
+    success: bool = Field(..., description="Whether this message was processed")
+    response: Optional[ChatResponse] = Field(default=None, description="Agent response")
+    error: Optional[str] = Field(default=None, description="Error detail when processing failed")
+
+class ChatBatchResponse(BaseModel):
+    """Response model for the batch chat endpoint"""
+    responses: List[ChatBatchItem] = Field(..., description="Results in request order")
+
 class BookingRequest(BaseModel):
     """Request model for booking endpoint"""
     title: str = Field(..., description="Appointment title")
@@ -54,11 +83,29 @@ class BookingResponse(BaseModel):
         default=None, 
         description="Full event details from Google Calendar"
     )
+    conflict: bool = Field(
+        default=False,
+        description="Whether the requested time overlaps an existing booking"
+    )
+    alternative_slots: List[AvailabilitySlot] = Field(
+        default=[],
+        description="Nearest free slots of the same length when the booking conflicts"
+    )
 
-class AvailabilitySlot(BaseModel):
-    """Model for available time slots"""
-    start: datetime = Field(..., description="Start time of the slot")
-    end: datetime = Field(..., description="End time of the slot")
+class AvailabilityQuery(BaseModel):
+    """One availability query in a batch"""
+    start_date: str = Field(..., description="Range start as an ISO date or datetime")
+    end_date: str = Field(..., description="Range end as an ISO date or datetime")
+    duration_minutes: int = Field(default=60, gt=0, description="Slot length in minutes")
+    calendar_id: Optional[str] = Field(default=None, description="Calendar to check; defaults to the primary calendar")
+
+class AvailabilityBatchRequest(BaseModel):
+    """Request model for the batch availability endpoint"""
+    queries: List[AvailabilityQuery] = Field(
+        ...,
+        max_length=MAX_BATCH_ITEMS,
+        description="Availability queries; answered in the same order"
+    )
 
 class ConversationEntry(BaseModel):
     """Model for conversation history entries"""
@@ -0,0 +1,241 @@
+"""
+Write-behind sync of calendar writes to a remote calendar.
+
+With an outbox-enabled ``EventStore``, a booking commits the event and an
+outbox entry in one local SQLite transaction and returns at once. A pool of
+``CalendarSync`` workers then pushes the entries to the remote calendar:
+
+- each worker leases a batch of due entries in one transaction, pushes them
+  concurrently over a pooled HTTP client and records the outcome of the whole
+  batch in one transaction;
+- writes to one event reach the calendar in the order they were made: an
+  event's next entry is not leased while an earlier one is pending;
+- failed pushes are retried with exponential backoff and jitter; entries the
+  calendar rejects outright, or that run out of attempts, stay in the outbox
+  as 'failed' instead of being dropped.
+
+Pushes are idempotent, so an entry pushed twice (a lost reply, a worker that
+died holding a lease) does no harm: events are created with their local id
+and a create that finds the id taken counts as delivered, updates send the
+whole event, and deleting an event that is already gone counts as delivered.
+
+``HttpCalendarBackend`` speaks the Google Calendar v3 REST API, so a local
+stub (``benchmarks/calendar_stub.py``) can stand in for it offline. Local
+events hold naive local times; they are sent with this server's UTC offset.
+
+The outbox lives in SQLite, so workers run its queries in a worker thread:
+a shared store may wait on another process's write lock.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from event_store import EventStore, OutboxEntry
+from metrics import OUTBOX_DELIVERY_SECONDS, OUTBOX_PUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Event fields sent to the calendar; the rest are local bookkeeping
+EVENT_FIELDS = ("summary", "description", "location", "start", "end", "attendees", "status")
+
+
+class PermanentPushError(Exception):
+    """Raised when the calendar rejects a write that retrying cannot fix"""
+
+
+class HttpCalendarBackend:
+    """Pushes outbox entries to a Google Calendar v3 compatible API"""
+
+    def __init__(
+        self,
+        base_url: str,
+        token: Optional[str] = None,
+        time_zone: Optional[str] = None,
+        timeout_seconds: float = 10.0,
+        max_connections: int = 64
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.time_zone = time_zone
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self._client = None
+
+    def _http_client(self):
+        if self._client is None:
+            # Imported on first use to keep it off the startup path
+            import httpx
+
+            headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    def _resource(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        resource = {"id": event["id"], **{field: event[field] for field in EVENT_FIELDS if field in event}}
+        for edge in ("start", "end"):
+            when = dict(resource[edge])
+            if "dateTime" in when:
+                # Naive times are this server's local time: pin them to its offset
+                when["dateTime"] = datetime.fromisoformat(when["dateTime"]).astimezone().isoformat()
+            if self.time_zone:
+                when["timeZone"] = self.time_zone
+            resource[edge] = when
+        return resource
+
+    async def push(self, entry: OutboxEntry):
+        """Apply one entry; raises PermanentPushError, or anything else to retry"""
+        event = entry.event
+        path = f"/calendars/{event['calendar_id']}/events"
+        client = self._http_client()
+        if entry.op == "create":
+            response = await client.post(path, json=self._resource(event))
+            done = response.status_code == 409
+        elif entry.op == "update":
+            response = await client.put(f"{path}/{entry.event_id}", json=self._resource(event))
+            done = False
+        else:
+            response = await client.delete(f"{path}/{entry.event_id}")
+            done = response.status_code in (404, 410)
+        if done or response.is_success:
+            return
+        if response.status_code in (408, 429) or response.status_code >= 500:
+            response.raise_for_status()
+        raise PermanentPushError(f"{entry.op} {entry.event_id}: HTTP {response.status_code} {response.text[:200]}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class CalendarSync:
+    """Pool of workers draining an event store's outbox into a calendar backend"""
+
+    def __init__(
+        self,
+        event_store: EventStore,
+        backend: HttpCalendarBackend,
+        workers: int = 4,
+        batch_size: int = 16,
+        poll_seconds: float = 1.0,
+        lease_seconds: float = 60.0,
+        base_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 300.0,
+        max_attempts: int = 20
+    ):
+        self.event_store = event_store
+        self.backend = backend
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_attempts = max_attempts
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._counts = {"batches": 0, "delivered": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        for _ in range(self.workers):
+            self._tasks.add(asyncio.create_task(self._run_worker()))
+
+    def on_calendar_write(self, event: Dict[str, Any]):
+        """Write listener: wake idle workers, there is a new entry to push"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds before retry number ``attempts + 1``: doubling, capped, with jitter"""
+        delay = min(self.max_backoff_seconds, self.base_backoff_seconds * 2 ** attempts)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run_worker(self):
+        while True:
+            self._wake.clear()
+            try:
+                batch = await asyncio.to_thread(self.event_store.claim_outbox, self.batch_size, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Calendar outbox claim failed: {e}")
+                batch = []
+            if not batch:
+                await self._idle()
+                continue
+            try:
+                await self._push_batch(batch)
+            except asyncio.CancelledError:
+                # Shutting down mid-batch: let the next start push these at once.
+                # Called inline on purpose: an awaited release would be
+                # cancelled with us, leaving the entries leased until expiry
+                self.event_store.release_outbox(entry.seq for entry in batch)
+                raise
+
+    async def _idle(self):
+        """Sleep until woken, the next entry is due, or the poll interval passes"""
+        timeout = self.poll_seconds
+        try:
+            due = await asyncio.to_thread(self.event_store.next_outbox_attempt)
+        except Exception:
+            due = None
+        if due is not None:
+            timeout = min(timeout, max(due - time.time(), 0.01))
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _push_one(self, entry: OutboxEntry) -> Optional[Exception]:
+        started = time.perf_counter()
+        try:
+            await self.backend.push(entry)
+            error = None
+        except Exception as e:
+            error = e
+        OUTBOX_PUSH_SECONDS.observe(time.perf_counter() - started, entry.op, "ok" if error is None else "error")
+        return error
+
+    async def _push_batch(self, batch: List[OutboxEntry]):
+        errors = await asyncio.gather(*(self._push_one(entry) for entry in batch))
+        delivered, retries, failures = [], [], []
+        now = time.time()
+        for entry, error in zip(batch, errors):
+            if error is None:
+                delivered.append(entry.seq)
+                OUTBOX_DELIVERY_SECONDS.observe(now - entry.created, entry.op)
+            elif isinstance(error, PermanentPushError) or entry.attempts + 1 >= self.max_attempts:
+                logger.error(f"Calendar sync gave up on {entry.op} {entry.event_id}: {error}")
+                failures.append((entry.seq, str(error)))
+            else:
+                logger.warning(f"Calendar sync will retry {entry.op} {entry.event_id}: {error!r}")
+                retries.append((entry.seq, self.backoff(entry.attempts), repr(error)))
+        await asyncio.to_thread(self.event_store.settle_outbox, delivered, retries, failures)
+        self._counts["batches"] += 1
+        self._counts["delivered"] += len(delivered)
+        self._counts["retried"] += len(retries)
+        self._counts["failed"] += len(failures)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pushes by outcome in this process, and the outbox backlog shared by all"""
+        return {**self._counts, "workers": len(self._tasks), **self.event_store.outbox_counts()}
+
+    async def close(self):
+        """Stop the workers and close the backend's HTTP client"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.backend.close()
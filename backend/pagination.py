@@ -0,0 +1,77 @@
+"""
+Opaque cursors and NDJSON streaming for long listings.
+
+A cursor is the sort key of the last item a client has seen (slot start time,
+or event start and id), packed as URL-safe base64 so clients treat it as a
+token. Resuming from it is a keyed seek, so pages stay stable while other
+items are added or removed before the cursor.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from serialization import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor was not produced by ``encode_cursor``"""
+
+
+def encode_cursor(*key: Any) -> str:
+    """Pack a sort key into an opaque cursor"""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Unpack a cursor back into its sort key"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key, list):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return key
+
+
+async def take(items: AsyncIterator[Any], limit: int) -> Tuple[List[Any], bool]:
+    """First ``limit`` items and whether more were left"""
+    page = []
+    try:
+        async for item in items:
+            if len(page) == limit:
+                return page, True
+            page.append(item)
+        return page, False
+    finally:
+        await items.aclose()
+
+
+async def ndjson_lines(
+    items: AsyncIterator[Any],
+    serialize: Callable[[Any], Any],
+    limit: Optional[int] = None,
+    cursor_of: Optional[Callable[[Any], str]] = None
+) -> AsyncIterator[bytes]:
+    """One JSON document per line, sent as each item is produced
+
+    With ``limit``, a final ``{"next_cursor": ...}`` line follows the page when
+    more items were left.
+    """
+    count = 0
+    last = None
+    try:
+        async for item in items:
+            if limit is not None and count == limit:
+                yield dumps({"next_cursor": cursor_of(last)}) + b"\n"
+                return
+            yield dumps(serialize(item)) + b"\n"
+            last = item
+            count += 1
+    finally:
+        await items.aclose()
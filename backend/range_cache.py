@@ -0,0 +1,176 @@
+"""
+Read-through cache for calendar range queries.
+
+Entries are keyed by calendar and time range, expire after a TTL and are
+evicted least-recently-used first once the estimated memory footprint exceeds
+its budget. Every entry is indexed under the (calendar_id, day) buckets it
+covers so a write only drops the entries whose days it touches.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+Bucket = Tuple[str, date]
+
+
+def day_buckets(calendar_ids: Iterable[str], start_time: datetime, end_time: datetime) -> List[Bucket]:
+    """(calendar_id, day) pairs covered by [start_time, end_time)"""
+    first = start_time.date()
+    last = (end_time - timedelta(microseconds=1)).date() if end_time > start_time else first
+    days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    return [(calendar_id, day) for calendar_id in calendar_ids for day in days]
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    size = sys.getsizeof(value)
+    if _depth > 6:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _depth + 1) + estimate_size(item, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "buckets")
+
+    def __init__(self, value: Any, expires_at: float, size: int, buckets: List[Bucket]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.buckets = buckets
+
+
+class RangeCache:
+    """TTL + LRU cache bounded by memory, with per-day write invalidation"""
+
+    def __init__(self, ttl_seconds: float = 60.0, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bucket_keys: Dict[Bucket, Set[Hashable]] = {}
+        # Bucket -> (write clock, monotonic time) of its last invalidation,
+        # oldest first; records older than the TTL are pruned and folded into
+        # _pruned_clock, so tokens taken before it can no longer be checked
+        self._bucket_invalidated: "OrderedDict[Bucket, Tuple[int, float]]" = OrderedDict()
+        self._pruned_clock = 0
+        self._write_clock = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) and refresh the entry's LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry.value
+
+    def token(self) -> int:
+        """Write clock to capture before computing a value for ``put``"""
+        return self._write_clock
+
+    def put(self, key: Hashable, value: Any, buckets: List[Bucket], token: Optional[int] = None) -> bool:
+        """Store a value unless one of its buckets was written since ``token`` was taken"""
+        size = estimate_size(value)
+        with self._lock:
+            if token is not None and (token < self._pruned_clock or any(
+                self._bucket_invalidated.get(bucket, (-1, 0.0))[0] > token for bucket in buckets
+            )):
+                return False
+            if size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, time.monotonic() + self.ttl_seconds, size, buckets)
+            self._bytes += size
+            for bucket in buckets:
+                self._bucket_keys.setdefault(bucket, set()).add(key)
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, buckets: Iterable[Bucket]) -> int:
+        """Drop every entry covering any of the given buckets; returns the number dropped"""
+        dropped = 0
+        now = time.monotonic()
+        with self._lock:
+            self._write_clock += 1
+            for bucket in buckets:
+                self._bucket_invalidated[bucket] = (self._write_clock, now)
+                self._bucket_invalidated.move_to_end(bucket)
+                for key in self._bucket_keys.pop(bucket, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        dropped += 1
+            self.invalidations += dropped
+            self._prune_invalidated(now)
+        return dropped
+
+    def _prune_invalidated(self, now: float):
+        # Computations take far less than the TTL, so refusing tokens from
+        # before the pruned records only skips caching a rare slow result
+        horizon = now - self.ttl_seconds
+        invalidated = self._bucket_invalidated
+        while invalidated:
+            bucket, (clock, at) = next(iter(invalidated.items()))
+            if at > horizon:
+                break
+            del invalidated[bucket]
+            self._pruned_clock = max(self._pruned_clock, clock)
+
+    def clear(self):
+        """Drop all entries, keeping the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bucket_keys.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for bucket in entry.buckets:
+            keys = self._bucket_keys.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bucket_keys[bucket]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for judging whether the cache earns its memory"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "invalidated_buckets": len(self._bucket_invalidated),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,177 @@
+"""
+Resource-aware slot finder for stylists and stations.
+
+A service needs one resource per role: a haircut needs a stylist qualified
+for haircuts and a chair, coloring needs a colorist and a color station. Every
+resource has its own calendar. Its free minutes over the whole query range are
+packed into one integer, working day after working day, with a zero bit
+between days so no free run crosses into the next day. A few shift-and-AND
+steps turn that into the minutes where a long-enough free run starts. OR-ing
+those over the qualified resources of a role, then AND-ing the roles, gives
+every bookable start in the range, with each operation covering all the days
+at once. Only the surviving starts are assigned concrete resources.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from availability import WEEKDAYS, AvailabilityEngine, Interval, run_starts
+
+
+class Resource(NamedTuple):
+    """A bookable stylist or station; its calendar id is ``resource_id``"""
+    resource_id: str
+    kind: str
+    name: str
+    skills: FrozenSet[str] = frozenset()
+
+
+# Service key -> roles it needs, as (resource kind, required skill or None)
+SERVICE_ROLES: Dict[str, Tuple[Tuple[str, Optional[str]], ...]] = {
+    "haircut": (("stylist", "haircut"), ("chair", None)),
+    "styling": (("stylist", "styling"), ("chair", None)),
+    "coloring": (("stylist", "coloring"), ("color_station", None)),
+    "consultation": (("stylist", None),),
+}
+
+DEFAULT_RESOURCES = (
+    Resource("stylist-ana", "stylist", "Ana", frozenset({"haircut", "styling", "coloring"})),
+    Resource("stylist-ben", "stylist", "Ben", frozenset({"haircut", "styling"})),
+    Resource("stylist-chloe", "stylist", "Chloe", frozenset({"coloring", "styling"})),
+    Resource("stylist-dev", "stylist", "Dev", frozenset({"haircut"})),
+    Resource("chair-1", "chair", "Chair 1"),
+    Resource("chair-2", "chair", "Chair 2"),
+    Resource("chair-3", "chair", "Chair 3"),
+    Resource("color-station-1", "color_station", "Color station 1"),
+    Resource("color-station-2", "color_station", "Color station 2"),
+)
+
+Role = Tuple[str, List[Resource]]
+
+
+class ResourceScheduler:
+    """Finds slots where one qualified resource per role is free, and assigns them"""
+
+    def __init__(
+        self,
+        resources: Iterable[Resource] = DEFAULT_RESOURCES,
+        service_roles: Optional[Dict[str, Sequence[Tuple[str, Optional[str]]]]] = None,
+        working_hours_start: int = 9,
+        working_hours_end: int = 17,
+        working_days: Iterable[int] = WEEKDAYS
+    ):
+        self.resources = {resource.resource_id: resource for resource in resources}
+        self.service_roles = service_roles or SERVICE_ROLES
+        self.engine = AvailabilityEngine(working_hours_start, working_hours_end, working_days)
+        # One spacer bit after each day keeps runs from spanning two days
+        self.stride = self.engine.width + 1
+
+    def roles(self, service: str) -> List[Role]:
+        """(role kind, qualified resources in roster order) for each role of a service"""
+        requirements = self.service_roles.get(service)
+        if requirements is None:
+            raise ValueError(f"Unknown service: {service}")
+        return [
+            (kind, [
+                resource for resource in self.resources.values()
+                if resource.kind == kind and (skill is None or skill in resource.skills)
+            ])
+            for kind, skill in requirements
+        ]
+
+    def resources_for(self, service: str) -> List[str]:
+        """Ids of every resource that could be assigned to the service"""
+        ids = []
+        for _, candidates in self.roles(service):
+            ids.extend(resource.resource_id for resource in candidates if resource.resource_id not in ids)
+        return ids
+
+    def _step_mask(self, num_days: int, step_minutes: int) -> int:
+        """Allowed starts: every ``step_minutes`` from the start of working hours, each day"""
+        day = 0
+        for minute in range(0, self.engine.width, step_minutes):
+            day |= 1 << minute
+        mask = 0
+        for index in range(num_days):
+            mask |= day << (index * self.stride)
+        return mask
+
+    def find_slots(
+        self,
+        service: str,
+        duration_minutes: int,
+        busy_by_resource: Dict[str, Iterable[Interval]],
+        start_time: datetime,
+        end_time: datetime,
+        step_minutes: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Bookable slots in the range, each with the resource assigned to every role
+
+        ``busy_by_resource`` maps resource ids to their busy intervals; a
+        resource missing from it is treated as free.
+        """
+        if duration_minutes <= 0:
+            raise ValueError("duration_minutes must be positive")
+        roles = self.roles(service)
+
+        days = None
+        starts: Dict[str, int] = {}
+        for _, candidates in roles:
+            for resource in candidates:
+                if resource.resource_id in starts:
+                    continue
+                bitmaps = self.engine.free_bitmaps(
+                    busy_by_resource.get(resource.resource_id, ()), start_time, end_time
+                )
+                if days is None:
+                    days = [day for day, _ in bitmaps]
+                packed = 0
+                for index, (_, free) in enumerate(bitmaps):
+                    packed |= free << (index * self.stride)
+                starts[resource.resource_id] = run_starts(packed, duration_minutes)
+        if not days:
+            return []
+
+        feasible = self._step_mask(len(days), step_minutes or duration_minutes)
+        for _, candidates in roles:
+            any_free = 0
+            for resource in candidates:
+                any_free |= starts[resource.resource_id]
+            feasible &= any_free
+
+        tzinfo = start_time.tzinfo
+        slots = []
+        while feasible and (limit is None or len(slots) < limit):
+            bit = feasible & -feasible
+            feasible ^= bit
+            assignment = self._assign(roles, starts, bit)
+            if assignment is None:
+                continue
+            index, minute = divmod(bit.bit_length() - 1, self.stride)
+            slot_start = self.engine.day_origin(days[index], tzinfo) + timedelta(minutes=minute)
+            slots.append({
+                'start': slot_start,
+                'end': slot_start + timedelta(minutes=duration_minutes),
+                'resources': assignment
+            })
+        return slots
+
+    @staticmethod
+    def _assign(roles: List[Role], starts: Dict[str, int], bit: int) -> Optional[Dict[str, str]]:
+        """Distinct resources, one per role, each free for the slot starting at ``bit``"""
+        chosen: Dict[str, str] = {}
+
+        def pick(role_index: int) -> bool:
+            if role_index == len(roles):
+                return True
+            kind, candidates = roles[role_index]
+            for resource in candidates:
+                if starts[resource.resource_id] & bit and resource.resource_id not in chosen.values():
+                    chosen[kind] = resource.resource_id
+                    if pick(role_index + 1):
+                        return True
+                    del chosen[kind]
+            return False
+
+        return chosen if pick(0) else None
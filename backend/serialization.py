@@ -0,0 +1,40 @@
+"""
+Fast JSON serialization for HTTP responses.
+
+Uses orjson when it is installed and falls back to the standard library with
+the same compact output otherwise. ``FastJSONResponse`` is the app's default
+response class, so every route renders through ``dumps``.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Matches orjson for the non-JSON types the app returns
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with ``dumps``"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
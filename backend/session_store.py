@@ -0,0 +1,272 @@
+"""
+Server-side chat session store.
+
+Keeps each session's conversation history in a bounded LRU map so clients can
+send just the new message and a session id. Sessions idle for longer than the
+expiry are dropped. With a spill path configured, sessions pushed out of
+memory by the LRU bound are written to SQLite and loaded back on their next
+turn instead of being lost.
+
+``SharedSessionStore`` keeps every session in SQLite instead, so several
+worker processes pointed at the same file see the same conversations.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_SESSION_ID = "default"
+
+
+class ChatSession:
+    """Conversation state for one session"""
+
+    __slots__ = ("session_id", "history", "context", "last_seen")
+
+    def __init__(
+        self,
+        session_id: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        last_seen: Optional[float] = None
+    ):
+        self.session_id = session_id
+        self.history = history or []
+        self.context = context or {}
+        self.last_seen = last_seen if last_seen is not None else time.time()
+
+    def to_json(self) -> str:
+        return json.dumps({"history": self.history, "context": self.context}, default=str)
+
+    @classmethod
+    def from_json(cls, session_id: str, data: str, last_seen: float) -> "ChatSession":
+        payload = json.loads(data)
+        return cls(session_id, payload.get("history"), payload.get("context"), last_seen)
+
+
+class SessionStore:
+    """Bounded LRU of chat sessions with idle expiry and optional SQLite spill"""
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        idle_seconds: float = 30 * 60,
+        max_history: int = 20,
+        spill_path: Optional[str] = None
+    ):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_history = max_history
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._spill: Optional[sqlite3.Connection] = None
+        self._spill_lock = threading.Lock()
+        if spill_path:
+            self._spill = sqlite3.connect(spill_path, check_same_thread=False, isolation_level=None)
+            self._spill.execute("PRAGMA journal_mode=WAL")
+            self._spill.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)"
+            )
+        self.spilled = 0
+        self.restored = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return a live session, restoring it from the spill if needed"""
+        now = time.time()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._restore(session_id, now)
+            if session is None:
+                return None
+            self._insert(session)
+        elif now - session.last_seen > self.idle_seconds:
+            del self._sessions[session_id]
+            self.expired += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: str) -> ChatSession:
+        """Return the session, creating an empty one if it does not exist"""
+        session = self.get(session_id)
+        if session is None:
+            session = ChatSession(session_id)
+            self._insert(session)
+        return session
+
+    def append_exchange(self, session_id: str, user_message: str, assistant_message: str) -> ChatSession:
+        """Record one turn and trim the history to ``max_history`` exchanges"""
+        session = self.get_or_create(session_id)
+        session.history.append({"user": user_message, "assistant": assistant_message})
+        if len(session.history) > self.max_history:
+            del session.history[:-self.max_history]
+        session.last_seen = time.time()
+        return session
+
+    def delete(self, session_id: str):
+        """Forget a session everywhere"""
+        self._sessions.pop(session_id, None)
+        if self._spill is not None:
+            with self._spill_lock:
+                self._spill.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _insert(self, session: ChatSession):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            self._spill_session(evicted)
+
+    def _spill_session(self, session: ChatSession):
+        if self._spill is None or time.time() - session.last_seen > self.idle_seconds:
+            return
+        with self._spill_lock:
+            self._spill.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, last_seen) VALUES (?, ?, ?)",
+                (session.session_id, session.to_json(), session.last_seen)
+            )
+        self.spilled += 1
+
+    def _restore(self, session_id: str, now: float) -> Optional[ChatSession]:
+        if self._spill is None:
+            return None
+        with self._spill_lock:
+            row = self._spill.execute(
+                "SELECT data, last_seen FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._spill.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        data, last_seen = row
+        if now - last_seen > self.idle_seconds:
+            self.expired += 1
+            return None
+        self.restored += 1
+        return ChatSession.from_json(session_id, data, last_seen)
+
+    def purge_expired(self) -> int:
+        """Drop idle sessions from memory and the spill; returns how many were dropped"""
+        cutoff = time.time() - self.idle_seconds
+        stale = [sid for sid, session in self._sessions.items() if session.last_seen < cutoff]
+        for session_id in stale:
+            del self._sessions[session_id]
+        if self._spill is not None:
+            with self._spill_lock:
+                cursor = self._spill.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+            stale_spilled = max(cursor.rowcount, 0)
+        else:
+            stale_spilled = 0
+        self.expired += len(stale) + stale_spilled
+        return len(stale) + stale_spilled
+
+    def stats(self) -> Dict[str, int]:
+        """Session counters"""
+        return {
+            "sessions": len(self._sessions),
+            "spilled": self.spilled,
+            "restored": self.restored,
+            "expired": self.expired,
+        }
+
+
+class SharedSessionStore:
+    """Chat sessions in a SQLite file shared by all worker processes
+
+    Same interface as ``SessionStore``. Each turn is a read-modify-write in one
+    write transaction, so turns of the same session landing on different
+    workers are not lost.
+    """
+
+    def __init__(self, path: str, idle_seconds: float = 30 * 60, max_history: int = 20):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self.expired = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _load(self, session_id: str, now: float) -> Optional[ChatSession]:
+        row = self._conn.execute(
+            "SELECT data, last_seen FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or now - row[1] > self.idle_seconds:
+            return None
+        return ChatSession.from_json(session_id, row[0], row[1])
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return a snapshot of a live session"""
+        with self._lock:
+            return self._load(session_id, time.time())
+
+    def get_or_create(self, session_id: str) -> ChatSession:
+        """Return the session, creating an empty one if it does not exist"""
+        session = self.get(session_id)
+        if session is None:
+            session = ChatSession(session_id)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO sessions (session_id, data, last_seen) VALUES (?, ?, ?)",
+                    (session_id, session.to_json(), session.last_seen)
+                )
+        return session
+
+    def append_exchange(self, session_id: str, user_message: str, assistant_message: str) -> ChatSession:
+        """Record one turn and trim the history to ``max_history`` exchanges"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                session = self._load(session_id, now) or ChatSession(session_id)
+                session.history.append({"user": user_message, "assistant": assistant_message})
+                if len(session.history) > self.max_history:
+                    del session.history[:-self.max_history]
+                session.last_seen = now
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, last_seen) VALUES (?, ?, ?)",
+                    (session_id, session.to_json(), now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return session
+
+    def delete(self, session_id: str):
+        """Forget a session"""
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        """Drop idle sessions; returns how many were dropped"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.idle_seconds,)
+            )
+        purged = max(cursor.rowcount, 0)
+        self.expired += purged
+        return purged
+
+    def stats(self) -> Dict[str, int]:
+        """Session counters"""
+        return {"sessions": len(self), "expired": self.expired}
@@ -0,0 +1,53 @@
+"""
+Request coalescing for identical concurrent calls.
+
+The first caller for a key starts the call as its own task; callers arriving
+while it runs await the same task instead of starting another, and all of them
+get its result or its exception. The task is shielded from each caller, so a
+client that disconnects does not cancel the work the others are waiting on.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import COALESCED_CALLS
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares it with every concurrent caller"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.executed: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+
+    async def do(self, name: str, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``call()`` or, if a call for ``(name, key)`` is already running, its result"""
+        flight_key = (name, key)
+        task = self._flights.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._flights[flight_key] = task
+            task.add_done_callback(lambda done: self._land(flight_key, done))
+            self.executed[name] = self.executed.get(name, 0) + 1
+            COALESCED_CALLS.inc(name, "executed")
+        else:
+            self.coalesced[name] = self.coalesced.get(name, 0) + 1
+            COALESCED_CALLS.inc(name, "coalesced")
+        return await asyncio.shield(task)
+
+    def _land(self, flight_key: Hashable, task: asyncio.Future):
+        if self._flights.get(flight_key) is task:
+            del self._flights[flight_key]
+        if not task.cancelled():
+            # Callers re-raise it themselves; this only stops asyncio logging
+            # it as never retrieved when every caller has gone away
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Executed vs. coalesced calls per name, and calls in flight now"""
+        return {
+            "executed": dict(self.executed),
+            "coalesced": dict(self.coalesced),
+            "in_flight": len(self._flights),
+        }
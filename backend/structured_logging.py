@@ -0,0 +1,154 @@
+"""
+Queue-backed, sampled logging for the API.
+
+Request handlers only build a ``LogRecord`` and put it on a queue; a listener
+thread formats and writes it. Messages use ``%`` arguments and JSON fields may
+be callables, so the string work happens on the writer thread and only for
+records that are emitted. Each request is sampled once on entry at its
+route's rate: a sampled-out request drops its INFO/DEBUG records, while
+warnings and errors are always kept. The queue is bounded: when the writer
+falls behind, new records are dropped and counted instead of piling up.
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional, TextIO
+
+from metrics import LOG_RECORDS_DROPPED
+
+# Path of the request being handled and whether its INFO records are kept
+current_route: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_route", default=None)
+request_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("request_sampled", default=True)
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# Records waiting for the writer thread; past this, new records are dropped
+DEFAULT_QUEUE_SIZE = 10000
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "/chat=0.1,/book=1" into {"/chat": 0.1, "/book": 1.0}"""
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        route, _, rate = item.partition("=")
+        rates[route.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; callable field values are evaluated here"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route is not None:
+            entry["route"] = route
+        fields = getattr(record, "fields", None)
+        if fields:
+            for key, value in fields.items():
+                entry[key] = value() if callable(value) else value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Drop INFO/DEBUG records of sampled-out requests and tag records with the route"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.route = current_route.get()
+        return record.levelno >= logging.WARNING or request_sampled.get()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that formats on the listener thread and drops records when the queue is full"""
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler renders msg % args here, on the request path
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # Called under the handler lock, so the counts need no lock of their own
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc(record.levelname)
+
+
+class LogListener(logging.handlers.QueueListener):
+    """QueueListener whose ``stop`` may be called more than once"""
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class RequestLogContextMiddleware:
+    """ASGI middleware that records the route and makes the per-request sampling decision"""
+
+    def __init__(self, app, sample_rates: Optional[Dict[str, float]] = None, default_rate: float = 1.0):
+        self.app = app
+        self.sample_rates = sample_rates or {}
+        self.default_rate = default_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        rate = self.sample_rates.get(path, self.default_rate)
+        route_token = current_route.set(path)
+        sampled_token = request_sampled.set(rate >= 1.0 or random.random() < rate)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_sampled.reset(sampled_token)
+            current_route.reset(route_token)
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    json_format: bool = False,
+    stream: Optional[TextIO] = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    replace_handlers: bool = False
+) -> LogListener:
+    """Route root logging through a queue to a background writer; returns the started listener
+
+    A queue handler installed by an earlier call is replaced; other root
+    handlers are kept unless ``replace_handlers`` is set.
+    """
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    handler = DeferredQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if replace_handlers or isinstance(existing, DeferredQueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = LogListener(handler.queue, writer, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,141 @@
+"""
+Precomputed table of the next free slots for each service duration.
+
+A background task keeps, for every duration, the next few real free slots
+from the calendar with their display labels already formatted. Chat replies
+read the table with a dictionary lookup instead of querying the calendar.
+Calendar writes remove any suggestion they overlap and mark the affected
+durations for an early refresh.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from availability import align, event_interval, next_boundary
+
+logger = logging.getLogger(__name__)
+
+Suggestion = Tuple[datetime, datetime, str]
+
+
+def format_slot(start_time: datetime) -> str:
+    """Human-readable slot label, e.g. 'Monday, October 19 at 9:00 AM'"""
+    return f"{start_time.strftime('%A, %B %d')} at {start_time.strftime('%I:%M %p').lstrip('0')}"
+
+
+class SuggestionTable:
+    """Rolling per-duration table of upcoming free slots"""
+
+    def __init__(
+        self,
+        calendar_service,
+        durations: Iterable[int],
+        count: int = 6,
+        horizon_days: int = 14,
+        refresh_seconds: float = 300.0
+    ):
+        self.calendar_service = calendar_service
+        self.durations = sorted(set(durations))
+        self.count = count
+        self.horizon_days = horizon_days
+        self.refresh_seconds = refresh_seconds
+        self._slots: Dict[int, List[Suggestion]] = {}
+        self._labels: Dict[int, List[str]] = {}
+        self._stale: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._slots)
+
+    def get(self, duration_minutes: int) -> Optional[List[str]]:
+        """Labels of the next free slots for a duration, or None if not tracked yet"""
+        slots = self._slots.get(duration_minutes)
+        if slots is None:
+            return None
+        if slots and slots[0][0] < datetime.now(slots[0][0].tzinfo):
+            # Slots roll off the front as time passes
+            now = datetime.now(slots[0][0].tzinfo)
+            slots = [slot for slot in slots if slot[0] >= now]
+            self._set(duration_minutes, slots)
+            if len(slots) < self.count:
+                self._mark_stale(duration_minutes)
+        return self._labels[duration_minutes]
+
+    def _set(self, duration_minutes: int, slots: List[Suggestion]):
+        self._slots[duration_minutes] = slots
+        self._labels[duration_minutes] = [label for _, _, label in slots]
+
+    def _mark_stale(self, duration_minutes: int):
+        self._stale.add(duration_minutes)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def refresh(self, durations: Optional[Iterable[int]] = None):
+        """Rebuild the table for the given durations (default: all)"""
+        start = next_boundary(datetime.now())
+        end = start + timedelta(days=self.horizon_days)
+        for duration in durations if durations is not None else self.durations:
+            # Cleared first so a write landing mid-refresh marks it stale again
+            self._stale.discard(duration)
+            slots = await self.calendar_service.get_available_slots(
+                start_time=start,
+                end_time=end,
+                duration_minutes=duration
+            )
+            self._set(duration, [
+                (slot['start'], slot['end'], format_slot(slot['start']))
+                for slot in slots[:self.count]
+            ])
+        self.refreshes += 1
+
+    def on_calendar_write(self, event: Dict[str, Any]):
+        """Drop suggestions overlapping a written event and schedule a top-up"""
+        interval = event_interval(event, self.calendar_service._parse_datetime)
+        if interval is None:
+            return
+        for duration, slots in list(self._slots.items()):
+            # Events may carry an offset while slots are naive local times
+            tzinfo = slots[0][0].tzinfo if slots else None
+            event_start, event_end = (align(bound, tzinfo) for bound in interval)
+            window_end = slots[-1][1] if len(slots) >= self.count else None
+            if window_end is not None and event_start >= window_end:
+                # Beyond the last suggestion: cannot change what we show
+                continue
+            kept = [slot for slot in slots if slot[1] <= event_start or slot[0] >= event_end]
+            self._set(duration, kept)
+            # A cancellation can open an earlier slot, so always recompute this duration
+            self._mark_stale(duration)
+
+    async def run(self):
+        """Refresh loop: full rebuild every ``refresh_seconds``, early top-ups after writes"""
+        self._wakeup = asyncio.Event()
+        durations = None
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.refresh(durations)
+            except Exception as e:
+                logger.error(f"Error refreshing suggested times: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_seconds)
+                durations = sorted(self._stale)
+            except asyncio.TimeoutError:
+                durations = None
+
+    def start(self) -> asyncio.Task:
+        """Start the background refresh task on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Cancel the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,190 @@
+"""
+Load test for admission control: /book latency while /chat is overloaded.
+
+Starts ``uvicorn app:create_app --factory`` and sends a steady trickle of
+/book calls (one every ``--book-interval-ms``) while, from a separate process,
+a chatty integration floods /chat from a handful of sessions at high
+concurrency. The flood waits out ``Retry-After`` when refused, as a client
+library would; ``--ignore-retry-after`` makes it retry at once instead. Runs
+three times:
+
+- idle: bookings only, as the reference;
+- flood: no admission control;
+- flood + admission: ADMISSION_MAX_IN_FLIGHT, a reserve for /book and a
+  per-session rate limit.
+
+Reports /book p50/p99 and the /chat status mix (200, 429, 503).
+
+Usage: python benchmarks/bench_admission.py [--seconds S] [--chat-concurrency N] [--sessions N] [--max-in-flight N]
+                                          [--ignore-retry-after]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+CHAT_MESSAGES = ["Hi there", "What services do you offer?", "Are you available on Friday morning?", "Thanks"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port: int, extra_env: dict) -> subprocess.Popen:
+    env = dict(os.environ, EVENT_STORE_PATH=os.path.join(tempfile.mkdtemp(), "events.db"), LOG_LEVEL="WARNING",
+               **extra_env)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:create_app", "--factory", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=BACKEND, env=env
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise SystemExit("uvicorn did not listen within 60s")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))]
+
+
+def chat_request(port: int, message: str, session_id: str) -> bytes:
+    body = json.dumps({"message": message, "session_id": session_id}).encode()
+    return (f"POST /chat HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+async def flood(port: int, seconds: float, concurrency: int, sessions: int, obey_retry_after: bool) -> Counter:
+    """Chat as fast as possible over keep-alive connections"""
+    # Raw HTTP/1.1 with prebuilt requests: a full client library would spend more
+    # CPU generating the load than the server spends handling it
+    statuses = Counter()
+    deadline = time.monotonic() + seconds
+
+    async def worker(index: int):
+        payloads = [chat_request(port, message, f"integration-{index % sessions}") for message in CHAT_MESSAGES]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        turn = 0
+        try:
+            while time.monotonic() < deadline:
+                writer.write(payloads[turn % len(payloads)])
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+                await reader.readexactly(length)
+                status = int(head.split(b" ", 2)[1])
+                statuses[status] += 1
+                turn += 1
+                if obey_retry_after and status in (429, 503):
+                    await asyncio.sleep(int(head.lower().split(b"retry-after:")[1].split(b"\r\n")[0]))
+        except (OSError, asyncio.IncompleteReadError):
+            statuses["error"] += 1
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return statuses
+
+
+async def book_trickle(base_url: str, seconds: float, interval: float):
+    """One booking at a time on a fixed schedule; returns latencies in ms and statuses"""
+    latencies, statuses = [], Counter()
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        deadline = time.monotonic() + seconds
+        index = 0
+        while time.monotonic() < deadline:
+            slot = start + timedelta(days=index // 16, minutes=30 * (index % 16))
+            began = time.perf_counter()
+            response = await client.post("/book", json={
+                "title": f"Admission bench {index}",
+                "description": "bench",
+                "start_time": slot.isoformat(),
+                "end_time": (slot + timedelta(minutes=30)).isoformat(),
+            })
+            elapsed = time.perf_counter() - began
+            latencies.append(elapsed * 1000)
+            statuses[response.status_code] += 1
+            index += 1
+            await asyncio.sleep(max(0.0, interval - elapsed))
+    return sorted(latencies), statuses
+
+
+def run_scenario(label: str, args, admission_env: dict, with_flood: bool):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_backend(port, admission_env)
+    flooder = None
+    try:
+        if with_flood:
+            # Its own process, so the flood's client work does not delay the bookings we time
+            flooder = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--flood-port", str(port),
+                 "--seconds", str(args.seconds + 1), "--chat-concurrency", str(args.chat_concurrency),
+                 "--sessions", str(args.sessions)] + (["--ignore-retry-after"] if args.ignore_retry_after else []),
+                stdout=subprocess.PIPE, text=True
+            )
+            time.sleep(1)
+        latencies, book_statuses = asyncio.run(book_trickle(base_url, args.seconds, args.book_interval_ms / 1000))
+        chat_statuses = json.loads(flooder.communicate()[0]) if flooder else {}
+    finally:
+        if flooder and flooder.poll() is None:
+            flooder.kill()
+        server.terminate()
+        server.wait()
+
+    chat = "   ".join(f"{status}: {count}" for status, count in sorted(chat_statuses.items())) or "-"
+    print(f"{label:>17}: /book p50 {percentile(latencies, 50):7.1f} ms  p99 {percentile(latencies, 99):7.1f} ms  "
+          f"({sum(book_statuses.values())} calls, {book_statuses.get(200, 0)} booked)   /chat {chat}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--chat-concurrency", type=int, default=128)
+    parser.add_argument("--sessions", type=int, default=8, help="sessions the chat flood spreads over")
+    parser.add_argument("--book-interval-ms", type=float, default=50.0)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--session-rate", type=float, default=5.0, help="chat requests per second per session")
+    parser.add_argument("--ignore-retry-after", action="store_true", help="the chat flood retries at once when refused")
+    parser.add_argument("--flood-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.flood_port:
+        statuses = asyncio.run(flood(args.flood_port, args.seconds, args.chat_concurrency, args.sessions,
+                                     not args.ignore_retry_after))
+        print(json.dumps({str(status): count for status, count in statuses.items()}))
+        return
+
+    admission = {
+        "ADMISSION_MAX_IN_FLIGHT": str(args.max_in_flight),
+        "ADMISSION_PRIORITY_RESERVE": str(max(1, args.max_in_flight // 4)),
+        "ADMISSION_SESSION_RATE": str(args.session_rate),
+    }
+    print(f"/book every {args.book_interval_ms:.0f} ms for {args.seconds:.0f}s; /chat flood at concurrency "
+          f"{args.chat_concurrency} over {args.sessions} sessions")
+    run_scenario("idle", args, {}, with_flood=False)
+    run_scenario("flood", args, {}, with_flood=True)
+    run_scenario("flood + admission", args, admission, with_flood=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark for the bitmap availability engine.
+
+Builds a multi-month range across several calendars with thousands of booked
+events and times how long it takes to find every free slot.
+
+Usage: python benchmarks/bench_availability.py [--months N] [--calendars N] [--events N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from availability import AvailabilityEngine  # noqa: E402
+
+
+def synthetic_events(start: datetime, days: int, count: int, seed: int):
+    """Random 30-120 minute appointments inside working hours"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        event_start = day.replace(hour=9) + timedelta(minutes=15 * rng.randrange(28))
+        events.append((event_start, event_start + timedelta(minutes=rng.choice([30, 60, 90, 120]))))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--calendars", type=int, default=20)
+    parser.add_argument("--events", type=int, default=2000, help="events per calendar")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2025, 1, 1)
+    days = args.months * 30
+    end = start + timedelta(days=days)
+    engine = AvailabilityEngine(9, 17)
+    calendars = [synthetic_events(start, days, args.events, seed) for seed in range(args.calendars)]
+
+    for duration in (30, 60, 120):
+        best = float("inf")
+        slots = 0
+        for _ in range(args.repeat):
+            began = time.perf_counter()
+            slots = sum(len(engine.find_slots(events, start, end, duration)) for events in calendars)
+            best = min(best, time.perf_counter() - began)
+        per_calendar = best / args.calendars * 1000
+        print(
+            f"{duration:>4} min: {args.calendars} calendars x {days} days x {args.events} events "
+            f"-> {slots} slots in {best * 1000:.1f} ms ({per_calendar:.2f} ms/calendar)"
+        )
+
+    merged = [interval for events in calendars for interval in events]
+    began = time.perf_counter()
+    shared = engine.find_slots(merged, start, end, 60)
+    print(f"shared 60 min across all calendars: {len(shared)} slots in {(time.perf_counter() - began) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Concurrency stress test for /book.
+
+Fires hundreds of simultaneous bookings at the FastAPI app through an
+in-process ASGI client, many of them competing for the same slots, then
+asserts that no two stored events overlap and reports throughput. Then
+books a suggested slot with a UTC-offset time and checks that the slot
+leaves the suggested-times table.
+
+Usage: python benchmarks/bench_booking_concurrency.py [--requests N] [--slots N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("EVENT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "events.db"))
+
+import httpx  # noqa: E402
+import logging  # noqa: E402
+
+import app as backend_app  # noqa: E402
+
+logging.disable(logging.INFO)
+
+
+def next_weekday(days_ahead: int) -> datetime:
+    day = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+async def run(requests: int, slots: int):
+    base = next_weekday(7)
+    payloads = []
+    for index in range(requests):
+        start = base + timedelta(hours=index % slots % 8, days=index % slots // 8)
+        payloads.append({
+            "title": f"Stress booking {index}",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=60)).isoformat(),
+        })
+
+    transport = httpx.ASGITransport(app=backend_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        began = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/book", json=payload) for payload in payloads))
+        elapsed = time.perf_counter() - began
+
+    statuses = [response.status_code for response in responses]
+    booked = statuses.count(200)
+    conflicts = statuses.count(409)
+    with_alternatives = sum(
+        1 for response in responses if response.status_code == 409 and response.json()["alternative_slots"]
+    )
+
+    events = await backend_app.app.state.calendar_service.get_events(base - timedelta(days=1), base + timedelta(days=60))
+    intervals = sorted(
+        (datetime.fromisoformat(event["start"]["dateTime"]), datetime.fromisoformat(event["end"]["dateTime"]))
+        for event in events
+    )
+    overlaps = sum(1 for (_, prev_end), (start, _) in zip(intervals, intervals[1:]) if start < prev_end)
+
+    print(f"{requests} concurrent bookings for {slots} distinct slots in {elapsed * 1000:.0f} ms "
+          f"({requests / elapsed:,.0f} req/s)")
+    print(f"  booked={booked} conflicts={conflicts} (with alternatives: {with_alternatives}) "
+          f"other={requests - booked - conflicts}")
+    print(f"  stored events={len(events)} overlapping pairs={overlaps}")
+
+    assert overlaps == 0, "double booking detected"
+    assert booked == min(slots, requests), f"expected {min(slots, requests)} bookings, got {booked}"
+    assert booked + conflicts == requests
+
+
+async def check_aware_booking():
+    """A booking sent with an offset removes the suggestion it takes"""
+    application = backend_app.app
+    table = application.state.suggestion_table
+    await table.refresh([60])
+    start, end, label = table._slots[60][0]
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/book", json={
+            "title": "Aware booking",
+            "start_time": start.astimezone(timezone.utc).isoformat(),
+            "end_time": end.astimezone(timezone.utc).isoformat(),
+        })
+    assert response.status_code == 200, response.text
+    assert label not in table.get(60), f"booked slot {label} is still suggested"
+    print(f"  booked suggested slot {label} with a UTC time: no longer suggested")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--slots", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.slots))
+    asyncio.run(check_aware_booking())
+
+
+if __name__ == "__main__":
+    main()
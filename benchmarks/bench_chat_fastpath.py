@@ -0,0 +1,92 @@
+"""
+Benchmark for the /chat fast response path.
+
+Sends greeting and service-inquiry messages straight to the ASGI app (no HTTP
+client in the way) and compares:
+
+- legacy: the reply is validated into a ChatResponse and serialized by
+  FastAPI's stock JSONResponse (mounted here as /chat-legacy);
+- fast: /chat, which sends the reply's cached serialized bytes.
+
+Both run through the same middleware stack and agent.
+
+Usage: python benchmarks/bench_chat_fastpath.py [--requests N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+os.environ.setdefault("EVENT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "events.db"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi import Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import app as backend_app  # noqa: E402
+from models import ChatRequest, ChatResponse  # noqa: E402
+
+MESSAGES = {"greeting": "Hi there", "service": "What services do you offer?"}
+
+
+async def legacy_chat(http_request: Request, request: ChatRequest):
+    response = await backend_app.run_chat_turn(http_request.app.state, request)
+    return ChatResponse(**backend_app.chat_response_content(response))
+
+
+async def call(application, path: str, body: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await application(scope, receive, send)
+    return status
+
+
+async def run(args):
+    application = backend_app.app
+    application.add_api_route(
+        "/chat-legacy", legacy_chat, methods=["POST"], response_model=ChatResponse, response_class=JSONResponse
+    )
+    for label, message in MESSAGES.items():
+        body = json.dumps({"message": message}).encode()
+        rates = {}
+        for path in ("/chat-legacy", "/chat"):
+            for _ in range(200):
+                assert await call(application, path, body) == 200
+            began = time.perf_counter()
+            for _ in range(args.requests):
+                await call(application, path, body)
+            rates[path] = args.requests / (time.perf_counter() - began)
+        legacy, fast = rates["/chat-legacy"], rates["/chat"]
+        print(f"{label:>9}: legacy {legacy:8.0f} req/s ({1e6 / legacy:6.1f} us)   "
+              f"fast {fast:8.0f} req/s ({1e6 / fast:6.1f} us)   x{fast / legacy:4.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
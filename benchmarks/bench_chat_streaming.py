@@ -0,0 +1,139 @@
+"""
+Time-to-first-token benchmark for streaming chat.
+
+Starts the app under uvicorn on localhost and compares how long a client
+waits before it can show the agent's message text: the full /chat response,
+the first /chat/stream Server-Sent Event, and the first /ws/chat frame over
+one persistent WebSocket. ``--lookup-ms`` adds simulated calendar latency to
+the suggested-times lookup, which is what streaming hides.
+
+Usage: python benchmarks/bench_chat_streaming.py [--requests N] [--lookup-ms MS]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("EVENT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "events.db"))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+
+import app as backend_app  # noqa: E402
+
+MESSAGE = "I want to book a haircut"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(backend_app.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def add_lookup_latency(milliseconds: float):
+    agent = backend_app.app.state.booking_agent
+    resolve = agent._resolve_suggested_times
+
+    async def slow_resolve(response):
+        await asyncio.sleep(milliseconds / 1000)
+        return await resolve(response)
+
+    agent._resolve_suggested_times = slow_resolve
+
+
+def summarize(label: str, first: list, total: list):
+    print(f"  {label:<12} first token p50 {statistics.median(first):7.2f} ms   "
+          f"complete p50 {statistics.median(total):7.2f} ms")
+
+
+async def bench_chat(base_url: str, requests: int):
+    first, total = [], []
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for index in range(requests):
+            began = time.perf_counter()
+            response = await client.post("/chat", json={"message": MESSAGE, "session_id": f"chat-{index}"})
+            response.raise_for_status()
+            elapsed = (time.perf_counter() - began) * 1000
+            first.append(elapsed)
+            total.append(elapsed)
+    summarize("/chat", first, total)
+
+
+async def bench_sse(base_url: str, requests: int):
+    first, total = [], []
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for index in range(requests):
+            began = time.perf_counter()
+            async with client.stream(
+                "POST", "/chat/stream", json={"message": MESSAGE, "session_id": f"sse-{index}"}
+            ) as response:
+                async for line in response.aiter_lines():
+                    if line == "event: message":
+                        first.append((time.perf_counter() - began) * 1000)
+                    elif line == "event: done":
+                        break
+            total.append((time.perf_counter() - began) * 1000)
+    summarize("/chat/stream", first, total)
+
+
+async def bench_websocket(port: int, requests: int):
+    first, total = [], []
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/chat?session_id=ws-bench") as ws:
+        for _ in range(requests):
+            began = time.perf_counter()
+            await ws.send(json.dumps({"message": MESSAGE}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["event"] == "message":
+                    first.append((time.perf_counter() - began) * 1000)
+                elif frame["event"] == "done":
+                    break
+            total.append((time.perf_counter() - began) * 1000)
+    summarize("/ws/chat", first, total)
+
+
+async def main_async(args):
+    port = free_port()
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        print(f"{args.requests} sequential turns, simulated lookup latency {args.lookup_ms} ms")
+        await bench_chat(base_url, args.requests)
+        await bench_sse(base_url, args.requests)
+        await bench_websocket(port, args.requests)
+    finally:
+        server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--lookup-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    if args.lookup_ms:
+        add_lookup_latency(args.lookup_ms)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark for singleflight coalescing of identical concurrent calendar reads.
+
+Seeds the event store, then fires 1,000 concurrent identical /availability
+requests (the same "this week" view) at the in-process ASGI app with a cold
+cache, with and without coalescing. Reports store reads, slot computations,
+wall time and p50/p99 latency.
+
+Usage: python benchmarks/bench_coalescing.py [--requests N] [--events N] [--days N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+os.environ.setdefault("EVENT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "events.db"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+import app as backend_app  # noqa: E402
+from singleflight import SingleFlight  # noqa: E402
+
+
+class NoCoalescing(SingleFlight):
+    """Every caller runs its own call"""
+
+    async def do(self, name, key, call):
+        self.executed[name] = self.executed.get(name, 0) + 1
+        return await call()
+
+
+def seed(service, start: datetime, days: int, count: int):
+    rng = random.Random(3)
+    events = []
+    for _ in range(count):
+        event_start = (start + timedelta(days=rng.randrange(days))).replace(hour=9) + timedelta(minutes=15 * rng.randrange(28))
+        events.append({"summary": "Appointment", "start": event_start, "end": event_start + timedelta(minutes=30)})
+    service.event_store.bulk_insert(service.calendar_id, events)
+
+
+def percentile(sorted_values, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))]
+
+
+async def burst(client: httpx.AsyncClient, params, requests: int):
+    latencies = []
+
+    async def one():
+        began = time.perf_counter()
+        response = await client.get("/availability", params=params)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - began) * 1000)
+        return response.content
+
+    began = time.perf_counter()
+    bodies = await asyncio.gather(*(one() for _ in range(requests)))
+    assert len(set(bodies)) == 1, "identical requests got different answers"
+    return time.perf_counter() - began, sorted(latencies)
+
+
+async def run(args):
+    service = backend_app.app.state.calendar_service
+    start = datetime(2030, 1, 7)
+    seed(service, start, args.days, args.events)
+    params = {"start_date": start.isoformat(), "end_date": (start + timedelta(days=args.range_days)).isoformat()}
+
+    store_reads = 0
+    range_read = service.event_store.range
+
+    def counted_range(*call_args):
+        nonlocal store_reads
+        store_reads += 1
+        return range_read(*call_args)
+
+    service.event_store.range = counted_range
+    transport = httpx.ASGITransport(app=backend_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{args.requests} concurrent identical /availability requests over {args.range_days} days "
+              f"({args.events} events in the store)")
+        for label, flights in (("without coalescing", NoCoalescing()), ("with coalescing", SingleFlight())):
+            service.flights = flights
+            service.cache.clear()
+            store_reads = 0
+            elapsed, latencies = await burst(client, params, args.requests)
+            computations = flights.executed.get("get_available_slots", 0)
+            coalesced = sum(flights.coalesced.values())
+            print(f"{label:>19}: {store_reads:>5} store reads, {computations:>5} slot computations, "
+                  f"{coalesced:>5} coalesced   {elapsed * 1000:8.1f} ms wall   "
+                  f"p50 {percentile(latencies, 50):8.1f} ms   p99 {percentile(latencies, 99):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=365, help="days the seeded events span")
+    parser.add_argument("--range-days", type=int, default=7, help="days covered by the requested view")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Throughput benchmark for date/time resolution in chat messages.
+
+Runs a corpus of real booking utterances through the legacy six-pattern
+detector (which only reports that *some* time was mentioned) and through
+DateTimeResolver with its phrase memo disabled (cold) and enabled (warm).
+A few edge cases are checked first (times without am/pm, impossible dates).
+
+Usage: python benchmarks/bench_datetime.py [--rounds N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from datetime_resolver import DateTimeResolver  # noqa: E402
+
+UTTERANCES = [
+    "Hi! I'd like to book a haircut next Tuesday at 2pm.",
+    "Can I come in tomorrow afternoon for coloring?",
+    "Is 14:30 free?",
+    "What time slots are available on Friday?",
+    "Schedule a call with client for next Monday at 2 PM",
+    "I want to book a 30-minute consultation this week",
+    "Can you book a 1-hour meeting with the team tomorrow afternoon?",
+    "I need to schedule a doctor's appointment next week",
+    "I'd like to book the appointment for Monday, October 19 at 9:00 AM",
+    "Do you have anything the day after tomorrow at 10:30am?",
+    "Book me in at 3 on Thursday please",
+    "any openings tonight?",
+    "What about 11/14 in the morning",
+    "can i get a styling appointment in 3 days at noon",
+    "What services do you offer?",
+    "How much is a haircut?",
+    "Thanks, see you then!",
+    "My sister recommended you, she said the team was lovely and the salon is easy to find.",
+    "hello",
+    "Do you have availability on Saturday morning around 10am for two people?",
+]
+
+# (message, expected start as "%m-%d %H:%M" against the reference, or None for unresolved)
+CHECKS = [
+    ("at 2", "10-15 14:00"),
+    ("at 2:30", "10-15 14:30"),
+    ("14:30", "10-15 14:30"),
+    ("at 10:15", "10-16 10:15"),
+    ("13/45", None),
+    ("in 99999999 days", None),
+]
+
+LEGACY_PATTERNS = [
+    r'tomorrow',
+    r'today',
+    r'next week',
+    r'monday|tuesday|wednesday|thursday|friday|saturday|sunday',
+    r'\d{1,2}[:/]\d{1,2}',
+    r'\d{1,2}(am|pm)',
+]
+
+
+def legacy_extract(message: str):
+    """The detector that predates DateTimeResolver"""
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, message.lower()):
+            return "the requested time"
+    return None
+
+
+def run(label: str, func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in UTTERANCES:
+            func(message)
+    rate = len(UTTERANCES) * rounds / (time.perf_counter() - start)
+    print(f"  {label:<28} {rate:>12,.0f} msg/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5000)
+    args = parser.parse_args()
+
+    reference = datetime(2025, 10, 15, 11, 0)
+    cold = DateTimeResolver(cache_size=0)
+    warm = DateTimeResolver()
+
+    for message, expected in CHECKS:
+        resolved = warm.resolve(message, reference)
+        got = resolved.start.strftime("%m-%d %H:%M") if resolved else None
+        assert got == expected, f"{message!r} resolved to {got}, expected {expected}"
+
+    print("resolved sample:")
+    for message in UTTERANCES[:6]:
+        resolved = warm.resolve(message, reference)
+        print(f"  {message[:48]:<48} -> {resolved.description if resolved else None}")
+
+    print(f"{len(UTTERANCES)} utterances x {args.rounds} rounds")
+    run("legacy detect only", legacy_extract, args.rounds)
+    run("resolver, memo off", lambda message: cold.resolve(message, reference), args.rounds)
+    run("resolver, memo on", lambda message: warm.resolve(message, reference), args.rounds)
+    print(f"  memo: {warm.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
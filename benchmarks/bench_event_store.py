@@ -0,0 +1,96 @@
+"""
+Load test for the SQLite event store.
+
+Seeds a store with a large number of events (one million by default) and
+times range reads of the sizes served by /events and /availability, with no
+network involved.
+
+Usage: python benchmarks/bench_event_store.py [--events N] [--db PATH]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from calendar_service import GoogleCalendarService  # noqa: E402
+from event_store import EventStore  # noqa: E402
+
+
+def seed(store: EventStore, calendars: int, events: int, start: datetime, days: int):
+    rng = random.Random(7)
+    per_calendar = events // calendars
+    batch = 50000
+    for index in range(calendars):
+        calendar_id = f"stylist_{index}"
+        remaining = per_calendar
+        while remaining:
+            size = min(batch, remaining)
+            rows = []
+            for _ in range(size):
+                day = start + timedelta(days=rng.randrange(days))
+                event_start = day.replace(hour=9) + timedelta(minutes=15 * rng.randrange(28))
+                rows.append({
+                    'summary': 'Appointment',
+                    'start': event_start,
+                    'end': event_start + timedelta(minutes=rng.choice([30, 60, 90, 120])),
+                })
+            store.bulk_insert(calendar_id, rows)
+            remaining -= size
+
+
+def timed(label: str, func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - began)
+    print(f"  {label:<34} {best * 1000:>9.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--calendars", type=int, default=10)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", help="reuse an existing store instead of a temporary one")
+    args = parser.parse_args()
+
+    start = datetime(2025, 1, 1)
+    path = args.db or os.path.join(tempfile.mkdtemp(), "events.db")
+    store = EventStore(path)
+    if store.count() == 0:
+        began = time.perf_counter()
+        seed(store, args.calendars, args.events, start, args.days)
+        print(f"seeded {store.count():,} events in {time.perf_counter() - began:.1f} s ({path})")
+    else:
+        print(f"using {store.count():,} existing events ({path})")
+
+    service = GoogleCalendarService(event_store=store)
+    middle = start + timedelta(days=args.days // 2)
+    print("plan:", "; ".join(store.explain_range("stylist_0", middle, middle + timedelta(days=7))))
+
+    for label, span in (("1 day", 1), ("7 days", 7), ("90 days", 90)):
+        end = middle + timedelta(days=span)
+        events = timed(f"range {label}", lambda: store.range("stylist_0", middle, end), args.repeat)
+        print(f"  {'':<34} {len(events)} events")
+
+    end = middle + timedelta(days=7)
+    timed(
+        "availability 7 days, 60 min",
+        lambda: asyncio.run(service.get_available_slots(middle, end, 60, calendar_ids=["stylist_0"])),
+        args.repeat
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark for the frontend's HTTP client: per-turn latency against a local backend.
+
+Starts ``uvicorn app:create_app --factory`` and replays what the Streamlit app
+sends: a chat session (one small request per turn, the server keeps the
+history) and sidebar availability checks. Compares:
+
+- per call: ``requests.post``/``requests.get``, a new TCP connection each time;
+- pooled: one ``requests.Session`` with a connection pool, as the app now holds
+  in its Streamlit resource cache.
+
+Reports p50/p99 per chat turn and per availability check.
+
+Usage: python benchmarks/bench_frontend_client.py [--turns N] [--checks N]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+import requests
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+MESSAGES = [
+    "Hi",
+    "What services do you offer?",
+    "Do you have anything free tomorrow?",
+    "I'd like a haircut tomorrow at 2pm",
+    "Thanks",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port: int) -> subprocess.Popen:
+    env = dict(os.environ, EVENT_STORE_PATH=os.path.join(tempfile.mkdtemp(), "events.db"), LOG_LEVEL="WARNING")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:create_app", "--factory", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise SystemExit("uvicorn did not listen within 60s")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))]
+
+
+def timed(calls) -> list:
+    latencies = []
+    for call in calls:
+        began = time.perf_counter()
+        call().raise_for_status()
+        latencies.append((time.perf_counter() - began) * 1000)
+    return sorted(latencies)
+
+
+def chat_turns(http, base_url: str, turns: int):
+    session_id = str(uuid.uuid4())
+    return [
+        lambda message=MESSAGES[turn % len(MESSAGES)]: http.post(
+            f"{base_url}/chat", json={"message": message, "session_id": session_id}, timeout=30
+        )
+        for turn in range(turns)
+    ]
+
+
+def availability_checks(http, base_url: str, checks: int):
+    today = date.today()
+    return [
+        lambda offset=check % 7: http.get(f"{base_url}/availability", params={
+            "start_date": (today + timedelta(days=offset)).isoformat(),
+            "end_date": (today + timedelta(days=offset + 7)).isoformat(),
+            "duration_minutes": 60,
+            "limit": 10,
+        }, timeout=30)
+        for check in range(checks)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--checks", type=int, default=200)
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_backend(port)
+    try:
+        # Warm the server up so neither mode pays for first-request work
+        timed(chat_turns(requests, base_url, 20) + availability_checks(requests, base_url, 7))
+        pooled = requests.Session()
+        pooled.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=10))
+        print(f"{args.turns} chat turns and {args.checks} availability checks, one client")
+        for label, http in (("per call", requests), ("pooled", pooled)):
+            turns = timed(chat_turns(http, base_url, args.turns))
+            checks = timed(availability_checks(http, base_url, args.checks))
+            print(f"{label:>8}: chat turn p50 {percentile(turns, 50):6.2f} ms  p99 {percentile(turns, 99):6.2f} ms   "
+                  f"availability p50 {percentile(checks, 50):6.2f} ms  p99 {percentile(checks, 99):6.2f} ms")
+        pooled.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Availability grid vs. slot list: payload size and compute time.
+
+Seeds an in-memory event store with random appointments, then for week,
+month and year ranges compares the /availability/grid payload (bitset and
+run-length encoded) with the /availability slot list, and times building the
+grid cold and from the range cache.
+
+Usage: python benchmarks/bench_grid.py [--events-per-day N] [--cell-minutes N]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from availability import pack_rows, run_lengths  # noqa: E402
+from calendar_service import GoogleCalendarService  # noqa: E402
+from event_store import EventStore  # noqa: E402
+
+RANGES = {"week": 7, "month": 31, "year": 365}
+
+
+def seed(store: EventStore, start: datetime, days: int, per_day: int):
+    rng = random.Random(7)
+    events = []
+    for index in range(days):
+        day = (start + timedelta(days=index)).replace(hour=9)
+        for _ in range(per_day):
+            event_start = day + timedelta(minutes=15 * rng.randrange(28))
+            events.append({
+                "summary": "Appointment",
+                "start": event_start,
+                "end": event_start + timedelta(minutes=rng.choice([30, 60, 90])),
+            })
+    store.bulk_insert("primary", events)
+
+
+async def run(args):
+    service = GoogleCalendarService(event_store=EventStore())
+    start = datetime(2025, 1, 1)
+    seed(service.event_store, start, max(RANGES.values()), args.events_per_day)
+    cells = -(-8 * 60 // args.cell_minutes)
+
+    for label, days in RANGES.items():
+        end = start + timedelta(days=days)
+        slots = await service.get_available_slots(start, end, duration_minutes=args.cell_minutes)
+        slot_bytes = len(json.dumps({"available_slots": [
+            {"start": slot["start"].isoformat(), "end": slot["end"].isoformat()} for slot in slots
+        ]}))
+
+        service.cache.clear()
+        began = time.perf_counter()
+        grid = await service.get_availability_grid(start, end, cell_minutes=args.cell_minutes)
+        cold_ms = (time.perf_counter() - began) * 1000
+        began = time.perf_counter()
+        await service.get_availability_grid(start, end, cell_minutes=args.cell_minutes)
+        cached_us = (time.perf_counter() - began) * 1e6
+
+        packed = pack_rows((row for _, row in grid), cells)
+        bitset_bytes = len(base64.b64encode(packed))
+        rle_bytes = len(json.dumps([run_lengths(row, cells) for _, row in grid]))
+        print(f"{label:>5}: slot list {slot_bytes:>8} B ({len(slots)} slots)   grid bitset {bitset_bytes:>6} B "
+              f"(x{slot_bytes / bitset_bytes:5.0f} smaller), rle {rle_bytes:>6} B, raw {len(packed):>5} B   "
+              f"built in {cold_ms:6.2f} ms, cached {cached_us:5.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events-per-day", type=int, default=4)
+    parser.add_argument("--cell-minutes", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
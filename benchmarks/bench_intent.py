@@ -0,0 +1,118 @@
+"""
+Micro-benchmark for BookingAgent intent classification.
+
+Compares the legacy sequential keyword scans against the single-pass
+IntentClassifier on a mix of short and long chat messages, after checking
+that both agree on the winning intent and on every per-intent match.
+
+Usage: python benchmarks/bench_intent.py [--rounds N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from intent_engine import (  # noqa: E402
+    AVAILABILITY_KEYWORDS,
+    BOOKING_KEYWORDS,
+    GREETING_KEYWORDS,
+    SERVICE_KEYWORDS,
+    IntentClassifier,
+)
+
+SHORT_MESSAGES = [
+    "hi",
+    "Hello there!",
+    "thanks",
+    "ok",
+    "What services do you offer?",
+    "How much is a haircut?",
+    "Is Friday open?",
+    "I want to book a haircut tomorrow at 2pm",
+    "Can I book a consultation next week?",
+    "See you then",
+]
+
+LONG_MESSAGES = [
+    " ".join(["I was telling my friend about the trip we took to the mountains last summer"] * 6),
+    "My sister recommended you and said the team was lovely. " * 5 + "Do you have anything on Saturday?",
+    "Sorry for the long message, I just wanted to explain my situation in detail. " * 8,
+    "We are planning a wedding and need hair styling for four people on the morning of the ceremony, " * 3,
+]
+
+
+def legacy_classify(message: str) -> str:
+    """Sequential keyword scans as performed before the intent engine existed"""
+    message_lower = message.lower().strip()
+    if any(keyword in message_lower for keyword in BOOKING_KEYWORDS):
+        return "booking"
+    if any(keyword in message_lower for keyword in AVAILABILITY_KEYWORDS):
+        return "availability"
+    if any(keyword in message_lower for keyword in SERVICE_KEYWORDS):
+        return "service"
+    if any(greeting in message.lower() for greeting in GREETING_KEYWORDS):
+        return "greeting"
+    return "general"
+
+
+# Keywords that start longer keywords of another intent ("schedule" / "schedule me")
+OVERLAP_MESSAGES = [
+    "schedule me",
+    "Please schedule me for Friday",
+    "i want to book",
+    "what services are free?",
+    "Any availability this week?",
+    "hi, can i book a haircut?",
+]
+
+
+def legacy_matches(message: str) -> dict:
+    """Per-intent substring checks as BookingAgent made them before the intent engine"""
+    message_lower = message.lower()
+    return {
+        "booking": any(keyword in message_lower for keyword in BOOKING_KEYWORDS),
+        "availability": any(keyword in message_lower for keyword in AVAILABILITY_KEYWORDS),
+        "service": any(keyword in message_lower for keyword in SERVICE_KEYWORDS),
+        "greeting": any(greeting in message_lower for greeting in GREETING_KEYWORDS),
+    }
+
+
+def run(label: str, classify, messages, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            classify(message)
+    elapsed = time.perf_counter() - start
+    rate = len(messages) * rounds / elapsed
+    print(f"  {label:<10} {rate:>12,.0f} msg/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    classifier = IntentClassifier()
+    corpora = {
+        "short": SHORT_MESSAGES,
+        "long": LONG_MESSAGES,
+        "mixed": SHORT_MESSAGES * 3 + LONG_MESSAGES,
+    }
+
+    for message in SHORT_MESSAGES + LONG_MESSAGES + OVERLAP_MESSAGES:
+        assert classifier.classify(message) == legacy_classify(message), message
+        assert classifier.matches(message) == legacy_matches(message), message
+
+    for name, messages in corpora.items():
+        print(f"{name} ({len(messages)} messages x {args.rounds} rounds)")
+        before = run("before", legacy_classify, messages, args.rounds)
+        after = run("after", classifier.classify, messages, args.rounds)
+        print(f"  speedup    {after / before:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
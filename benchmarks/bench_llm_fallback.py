@@ -0,0 +1,160 @@
+"""
+Benchmark for the LLM fallback: model calls, cache hit rate and latency.
+
+Starts benchmarks/llm_stub.py as a local model server with a fixed delay per
+call, then sends a skewed stream of messages the keyword rules classify as
+"general" (popular phrasings repeat, as they do in real traffic) through the
+fallback with several lookups in flight at once. Compares:
+
+- naive: no cache and one model call per message (identical in-flight
+  messages are still shared);
+- full: response cache, in-flight dedup and micro-batching.
+
+Reports model calls, cache hit rate, coalesced lookups, timeouts and p50/p99
+lookup latency, then checks one message end to end through BookingAgent.
+
+Usage: python benchmarks/bench_llm_fallback.py [--messages N] [--concurrency N] [--latency-ms MS]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "backend"))
+
+import httpx  # noqa: E402
+
+from agent import BookingAgent  # noqa: E402
+from intent_engine import IntentClassifier  # noqa: E402
+from llm_fallback import LLMFallback  # noqa: E402
+
+TEMPLATES = [
+    "could you squeeze me in for a {service} {when}",
+    "any openings {when} for a {service}",
+    "i'd like a {service} {when} please",
+    "can i pop in {when} to get a {service}",
+    "is there room {when}",
+    "what's on the menu",
+    "yo",
+    "my {service} is a mess, fix me up {when}",
+]
+SERVICES = ["trim", "fade", "blowout", "updo", "balayage", "highlights", "roots touch-up", "bob"]
+WHENS = ["tomorrow", "friday at 3pm", "next monday", "today at 11am", "thursday 4pm", "next week"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def corpus():
+    classifier = IntentClassifier()
+    messages = sorted({
+        template.format(service=service, when=when)
+        for template in TEMPLATES for service in SERVICES for when in WHENS
+    })
+    return [message for message in messages if classifier.classify(message) == "general"]
+
+
+def workload(messages, count: int, seed: int):
+    """Zipf-like draw: the k-th most popular phrasing is picked with weight 1/k"""
+    rng = random.Random(seed)
+    ranked = messages[:]
+    rng.shuffle(ranked)
+    weights = [1 / rank for rank in range(1, len(ranked) + 1)]
+    return rng.choices(ranked, weights=weights, k=count)
+
+
+def start_stub(port: int, latency_ms: float) -> subprocess.Popen:
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BENCHMARKS, "llm_stub.py"), "--port", str(port),
+        "--latency-ms", str(latency_ms), "--jitter-ms", str(latency_ms / 5),
+    ])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1).raise_for_status()
+            return stub
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    stub.terminate()
+    raise SystemExit("LLM stub did not start")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def drive(fallback: LLMFallback, messages, concurrency: int):
+    latencies = []
+    queue = list(reversed(messages))
+
+    async def worker():
+        while queue:
+            message = queue.pop()
+            began = time.perf_counter()
+            await fallback.extract(message)
+            latencies.append((time.perf_counter() - began) * 1000)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - began, sorted(latencies)
+
+
+async def run(args, base_url: str):
+    messages = workload(corpus(), args.messages, args.seed)
+    print(f"{len(messages)} lookups over {len(set(messages))} distinct messages, concurrency {args.concurrency}, "
+          f"model latency {args.latency_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+    modes = {
+        "naive": dict(cache_size=0, max_batch=1),
+        "full": dict(),
+    }
+    for label, options in modes.items():
+        fallback = LLMFallback(base_url, timeout_seconds=args.budget_ms / 1000, **options)
+        elapsed, latencies = await drive(fallback, messages, args.concurrency)
+        # Let calls that outlived the budget finish before reading the counters
+        while fallback.stats()["in_flight"]:
+            await asyncio.sleep(0.05)
+        stats = fallback.stats()
+        await fallback.close()
+        print(f"{label:>6}: {stats['calls']:>5} model calls (mean batch {stats['mean_batch_size']:4.1f})   "
+              f"hit rate {stats['hit_rate']:6.1%}   coalesced {stats['coalesced']:>4}   timeouts {stats['timeout']:>4}   "
+              f"p50 {percentile(latencies, 50):7.1f} ms   p99 {percentile(latencies, 99):7.1f} ms   "
+              f"{len(messages) / elapsed:8.1f} lookups/s")
+
+    fallback = LLMFallback(base_url, timeout_seconds=args.budget_ms / 1000)
+    agent = BookingAgent(llm_fallback=fallback)
+    sample = "could you squeeze me in for a trim friday at 3pm"
+    response = await agent.process_message(sample)
+    await fallback.close()
+    print(f"end to end: {sample!r} -> intent {response['intent']}, booking_data {response['booking_data']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stub model delay per call")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="fallback latency budget per lookup")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = start_stub(port, args.latency_ms)
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{port}/v1"))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Request throughput with logging off, synchronous, and queued/sampled.
+
+Each mode runs in a fresh interpreter against the FastAPI app through an
+in-process ASGI client, writing logs to a temporary file:
+
+- off:      INFO disabled
+- sync:     the old setup, a plain StreamHandler formatting and writing on the request path
+- async:    JSON records queued to a background writer
+- sampled:  as async, with /chat INFO records kept for 10% of requests
+
+``--write-delay-us`` makes every write block for that long, like a log file
+on a slow disk or a pipe to a busy collector; that wait is what the
+background writer takes off the request path.
+
+Usage: python benchmarks/bench_logging.py [--requests N] [--concurrency N] [--write-delay-us US]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+MODES = ("off", "sync", "async", "sampled")
+MESSAGES = [
+    "Hi there",
+    "I want to book a haircut tomorrow at 2pm",
+    "What services do you offer?",
+    "Are you free next Tuesday afternoon?",
+]
+
+
+class SlowFile:
+    """File wrapper whose writes block for a fixed time"""
+
+    def __init__(self, path: str, delay_seconds: float):
+        self._file = open(path, "a")
+        self.delay_seconds = delay_seconds
+
+    def write(self, text: str):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return self._file.write(text)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+async def drive(requests: int, concurrency: int) -> float:
+    import httpx
+    import app as backend_app
+
+    transport = httpx.ASGITransport(app=backend_app.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(index: int):
+            async with semaphore:
+                response = await client.post("/chat", json={
+                    "message": MESSAGES[index % len(MESSAGES)],
+                    "session_id": f"bench-{index % 500}",
+                })
+                response.raise_for_status()
+
+        await asyncio.gather(*(one(index) for index in range(min(requests, 200))))  # warm up
+        began = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        return requests / (time.perf_counter() - began)
+
+
+def run_mode(mode: str, requests: int, concurrency: int, log_path: str, write_delay_us: float):
+    """Child process: configure logging for ``mode`` and print requests/second"""
+    sys.path.insert(0, BACKEND)
+    os.environ.setdefault("EVENT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "events.db"))
+    if mode == "sampled":
+        os.environ["LOG_SAMPLE_RATES"] = "/chat=0.1"
+
+    import structured_logging
+
+    log_file = SlowFile(log_path, write_delay_us / 1e6)
+    listener = None
+    if mode == "sync":
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        writer = logging.StreamHandler(log_file)
+        writer.setFormatter(logging.Formatter(structured_logging.TEXT_FORMAT))
+        root.addHandler(writer)
+        root.setLevel(logging.INFO)
+    else:
+        listener = structured_logging.configure_logging(json_format=True, stream=log_file)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if mode == "off":
+        logging.disable(logging.INFO)
+
+    rate = asyncio.run(drive(requests, concurrency))
+    if listener is not None:
+        listener.stop()
+    log_file.close()
+    dropped = sum(
+        handler.dropped for handler in logging.getLogger().handlers
+        if isinstance(handler, structured_logging.DeferredQueueHandler)
+    )
+    print(f"{rate:.1f} {dropped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-delay-us", type=float, default=0.0)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--log-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.requests, args.concurrency, args.log_path, args.write_delay_us)
+        return
+
+    print(f"{args.requests} /chat requests, concurrency {args.concurrency}, write delay {args.write_delay_us} us")
+    baseline = None
+    for mode in MODES:
+        log_path = os.path.join(tempfile.mkdtemp(), "bench.log")
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", __file__, "--mode", mode, "--log-path", log_path,
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+             "--write-delay-us", str(args.write_delay_us)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        rate, dropped = output.strip().splitlines()[-1].split()
+        rate = float(rate)
+        baseline = baseline or rate
+        log_bytes = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        print(f"  {mode:<8} {rate:9.1f} req/s  ({rate / baseline:5.1%} of off)  log {log_bytes / 1024:8.1f} KiB"
+              f"  dropped {dropped}")
+
+
+if __name__ == "__main__":
+    main()
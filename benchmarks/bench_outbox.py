@@ -0,0 +1,234 @@
+"""
+Benchmark for the calendar outbox: /book latency and no lost writes.
+
+Starts benchmarks/calendar_stub.py as the remote calendar, with a delay per
+call, a share of calls failing with 503 and a share applied but answered 503
+(lost replies). Then books ``--bookings`` distinct slots through the
+in-process ASGI app at ``--concurrency``:
+
+- inline: /book waits for the remote create, retrying with backoff, before
+  it answers;
+- outbox: /book answers once the booking and its outbox entry are committed
+  locally; CalendarSync workers push in the background. A share of the
+  bookings is then moved and a share cancelled right away, so creates,
+  updates and deletes of one event queue up behind each other.
+
+Reports /book p50/p99, then waits for the outbox to drain and checks that the
+remote calendar holds exactly the local events, field for field.
+
+Usage: python benchmarks/bench_outbox.py [--bookings N] [--concurrency N] [--latency-ms MS] [--error-rate R] [--lost-reply-rate R]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "backend"))
+
+import httpx  # noqa: E402
+
+import app as backend_app  # noqa: E402
+from event_store import OutboxEntry  # noqa: E402
+from outbox import CalendarSync, HttpCalendarBackend, PermanentPushError  # noqa: E402
+
+# The apps run without their lifespan, so keep retry warnings off the console here
+logging.disable(logging.WARNING)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port: int, args) -> subprocess.Popen:
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BENCHMARKS, "calendar_stub.py"), "--port", str(port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.latency_ms / 3),
+        "--error-rate", str(args.error_rate), "--lost-reply-rate", str(args.lost_reply_rate),
+    ])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1).raise_for_status()
+            return stub
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    stub.terminate()
+    raise SystemExit("calendar stub did not start")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))]
+
+
+def instant(when) -> datetime:
+    """An event boundary as an aware datetime; naive values are local time"""
+    return datetime.fromisoformat(when["dateTime"]).astimezone()
+
+
+def slots(count: int):
+    base = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return [base + timedelta(days=index // 16, minutes=30 * (index % 16)) for index in range(count)]
+
+
+def build_app(sync_url=None):
+    """A fresh app on its own event store, syncing to ``sync_url`` if given"""
+    os.environ["EVENT_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "events.db")
+    if sync_url:
+        os.environ["CALENDAR_SYNC_URL"] = sync_url
+    else:
+        os.environ.pop("CALENDAR_SYNC_URL", None)
+    return backend_app.create_app()
+
+
+async def book_all(application, starts, concurrency: int):
+    latencies, event_ids = [], []
+    queue = list(reversed(starts))
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker():
+            while queue:
+                start = queue.pop()
+                began = time.perf_counter()
+                response = await client.post("/book", json={
+                    "title": "Outbox bench",
+                    "description": "bench",
+                    "start_time": start.isoformat(),
+                    "end_time": (start + timedelta(minutes=30)).isoformat(),
+                })
+                latencies.append((time.perf_counter() - began) * 1000)
+                body = response.json()
+                assert body["success"], body
+                event_ids.append(body["event_id"])
+
+        began = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - began, sorted(latencies), event_ids
+
+
+def report(label: str, elapsed: float, latencies, extra: str = ""):
+    print(f"{label:>7}: /book p50 {percentile(latencies, 50):7.1f} ms  p99 {percentile(latencies, 99):7.1f} ms  "
+          f"{len(latencies) / elapsed:7.1f} bookings/s{extra}")
+
+
+async def run_inline(args, sync_url: str):
+    application = build_app()
+    service = application.state.calendar_service
+    backend = HttpCalendarBackend(sync_url)
+    retry = CalendarSync(service.event_store, backend)
+    book_event = service.book_event
+
+    async def book_and_push(**kwargs):
+        event = await book_event(**kwargs)
+        entry = OutboxEntry(0, event["id"], "create", event, 0, time.time())
+        for attempt in range(retry.max_attempts):
+            try:
+                await backend.push(entry)
+                return event
+            except PermanentPushError:
+                raise
+            except Exception:
+                await asyncio.sleep(retry.backoff(attempt))
+        raise RuntimeError("calendar push kept failing")
+
+    service.book_event = book_and_push
+    elapsed, latencies, _ = await book_all(application, slots(args.bookings), args.concurrency)
+    await backend.close()
+    report("inline", elapsed, latencies)
+
+
+async def run_outbox(args, sync_url: str, stub_url: str):
+    application = build_app(sync_url)
+    service = application.state.calendar_service
+    sync = application.state.calendar_sync
+    sync.start()
+
+    elapsed, latencies, event_ids = await book_all(application, slots(args.bookings), args.concurrency)
+    report("outbox", elapsed, latencies)
+
+    rng = random.Random(5)
+    moved = cancelled = 0
+    for event_id in event_ids:
+        roll = rng.random()
+        if roll < args.move_share:
+            event = service.event_store.get(event_id)
+            start = datetime.fromisoformat(event["start"]["dateTime"]) + timedelta(days=90)
+            await service.update_event(event_id, title="Outbox bench (moved)", start_time=start,
+                                       end_time=start + timedelta(minutes=30))
+            moved += 1
+        elif roll < args.move_share + args.cancel_share:
+            await service.delete_event(event_id)
+            cancelled += 1
+
+    began = time.perf_counter()
+    while True:
+        stats = sync.stats()
+        if not stats["pending"]:
+            break
+        await asyncio.sleep(0.05)
+    drained = time.perf_counter() - began
+    await sync.close()
+
+    remote = {
+        event["id"]: event
+        for event in httpx.get(f"{stub_url}/calendar/v3/calendars/primary/events", timeout=10).json()["items"]
+    }
+    local = {event["id"]: event for event in service.event_store.range(
+        "primary", datetime.now() - timedelta(days=1), datetime.now() + timedelta(days=400)
+    )}
+    missing = [event_id for event_id in local if event_id not in remote]
+    extra = [event_id for event_id in remote if event_id not in local]
+    stale = [
+        event_id for event_id, event in local.items() if event_id in remote and (
+            remote[event_id]["summary"], instant(remote[event_id]["start"]), instant(remote[event_id]["end"])
+        ) != (event["summary"], instant(event["start"]), instant(event["end"]))
+    ]
+    stub_stats = httpx.get(f"{stub_url}/stats", timeout=10).json()
+    print(f"         then moved {moved} and cancelled {cancelled}; outbox drained {drained:.1f}s after the last write "
+          f"({stats['delivered']} delivered, {stats['retried']} retries, {stats['failed']} failed)")
+    print(f"         remote calendar: {stub_stats['calls']} calls, {stub_stats['errors']} errors, "
+          f"{stub_stats['lost_replies']} lost replies")
+    print(f"         local events {len(local)}, remote events {len(remote)}: missing {len(missing)}, "
+          f"extra {len(extra)}, stale {len(stale)}")
+    assert not (missing or extra or stale or stats["failed"]), "remote calendar does not match the local store"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="remote calendar delay per call")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of calls failing before they apply")
+    parser.add_argument("--lost-reply-rate", type=float, default=0.05, help="share of calls failing after they apply")
+    parser.add_argument("--move-share", type=float, default=0.2, help="share of bookings moved afterwards")
+    parser.add_argument("--cancel-share", type=float, default=0.1, help="share of bookings cancelled afterwards")
+    args = parser.parse_args()
+
+    print(f"{args.bookings} bookings at concurrency {args.concurrency}; remote calendar latency {args.latency_ms:.0f} ms, "
+          f"{args.error_rate:.0%} errors, {args.lost_reply_rate:.0%} lost replies")
+    for label in ("inline", "outbox"):
+        port = free_port()
+        stub_url = f"http://127.0.0.1:{port}"
+        stub = start_stub(port, args)
+        try:
+            if label == "inline":
+                asyncio.run(run_inline(args, f"{stub_url}/calendar/v3"))
+            else:
+                asyncio.run(run_outbox(args, f"{stub_url}/calendar/v3", stub_url))
+        finally:
+            stub.terminate()
+            stub.wait()
+
+
+if __name__ == "__main__":
+    main()
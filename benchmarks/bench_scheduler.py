@@ -0,0 +1,119 @@
+"""
+Benchmark for the multi-resource scheduler.
+
+Builds a salon roster of stylists, chairs and color stations, books random
+appointments on every resource's calendar over a month, and times how long
+it takes to find every slot (with assigned resources) for each service. A
+brute-force scan over the same grid checks the set of slot starts.
+
+Usage: python benchmarks/bench_scheduler.py [--days N] [--stylists N] [--chairs N] [--stations N] [--events N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from scheduler import SERVICE_ROLES, Resource, ResourceScheduler  # noqa: E402
+
+DURATIONS = {"haircut": 60, "styling": 90, "coloring": 120, "consultation": 30}
+SKILLS = ("haircut", "styling", "coloring")
+
+
+def roster(stylists: int, chairs: int, stations: int, seed: int):
+    rng = random.Random(seed)
+    resources = [
+        Resource(f"stylist-{index}", "stylist", f"Stylist {index}",
+                 frozenset(rng.sample(SKILLS, rng.randint(1, len(SKILLS)))))
+        for index in range(stylists)
+    ]
+    resources += [Resource(f"chair-{index}", "chair", f"Chair {index}") for index in range(chairs)]
+    resources += [Resource(f"station-{index}", "color_station", f"Station {index}") for index in range(stations)]
+    return resources
+
+
+def synthetic_events(start: datetime, days: int, count: int, seed: int):
+    """Random 30-120 minute appointments inside working hours"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        event_start = day.replace(hour=9) + timedelta(minutes=15 * rng.randrange(28))
+        events.append((event_start, event_start + timedelta(minutes=rng.choice([30, 60, 90, 120]))))
+    return events
+
+
+def brute_force_starts(scheduler, service, duration, busy, start, end, step):
+    """Slot starts found by checking every resource at every grid point"""
+    roles = scheduler.roles(service)
+    found = set()
+    day = start
+    while day < end:
+        if day.weekday() in scheduler.engine.working_days:
+            origin = scheduler.engine.day_origin(day.date())
+            for minute in range(0, scheduler.engine.width - duration + 1, step):
+                slot_start = origin + timedelta(minutes=minute)
+                slot_end = slot_start + timedelta(minutes=duration)
+                if slot_start < start or slot_end > end:
+                    continue
+                free = {
+                    resource.resource_id
+                    for _, candidates in roles for resource in candidates
+                    if not any(s < slot_end and e > slot_start for s, e in busy[resource.resource_id])
+                }
+                # Roles never share a kind, so any free candidate per role is distinct
+                if all(any(r.resource_id in free for r in candidates) for _, candidates in roles):
+                    found.add(slot_start)
+        day += timedelta(days=1)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--stylists", type=int, default=12)
+    parser.add_argument("--chairs", type=int, default=8)
+    parser.add_argument("--stations", type=int, default=4)
+    parser.add_argument("--events", type=int, default=60, help="events per resource over the range")
+    parser.add_argument("--step", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-check", action="store_true", help="skip the brute-force comparison")
+    args = parser.parse_args()
+
+    start = datetime(2025, 3, 1)
+    end = start + timedelta(days=args.days)
+    resources = roster(args.stylists, args.chairs, args.stations, seed=1)
+    scheduler = ResourceScheduler(resources)
+    busy = {resource.resource_id: synthetic_events(start, args.days, args.events, seed)
+            for seed, resource in enumerate(resources)}
+    print(f"{len(resources)} resources, {args.days} days, {args.events} events per resource, {args.step} min grid")
+
+    for service in SERVICE_ROLES:
+        duration = DURATIONS[service]
+        best = float("inf")
+        slots = []
+        for _ in range(args.repeat):
+            began = time.perf_counter()
+            slots = scheduler.find_slots(service, duration, busy, start, end, step_minutes=args.step)
+            best = min(best, time.perf_counter() - began)
+        line = (f"{service:>13} ({duration:>3} min, {len(scheduler.resources_for(service)):>2} candidate resources): "
+                f"{len(slots):>5} slots in {best * 1000:6.2f} ms")
+
+        if not args.skip_check:
+            began = time.perf_counter()
+            expected = brute_force_starts(scheduler, service, duration, busy, start, end, args.step)
+            brute_ms = (time.perf_counter() - began) * 1000
+            assert {slot["start"] for slot in slots} == expected, f"{service}: slot starts differ from brute force"
+            for slot in slots:
+                for resource_id in slot["resources"].values():
+                    assert not any(s < slot["end"] and e > slot["start"] for s, e in busy[resource_id])
+            line += f"   (brute force {brute_ms:8.1f} ms, results match)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
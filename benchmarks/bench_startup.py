@@ -0,0 +1,151 @@
+"""
+Cold-start report: import cost and time to first request.
+
+1. Runs ``python -X importtime`` on ``import app; app.create_app()`` and
+   reports the total, the heaviest top-level packages by self time, and any
+   heavy SDK (langchain, openai, google-genai, the Google API client, ...)
+   that got imported at startup instead of on first use.
+2. Starts ``uvicorn app:create_app --factory`` several times and measures
+   process start -> first successful /chat response.
+
+Exits non-zero if a heavy SDK is imported at startup or the median time to
+first request exceeds ``--budget-ms``.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--budget-ms MS] [--top N] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+# Dependencies that must only be imported lazily, on first use
+HEAVY_MODULES = (
+    "langchain", "langchain_community", "langchain_core", "openai", "google.genai",
+    "googleapiclient", "google_auth_oauthlib", "google.oauth2", "streamlit",
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def state_env() -> dict:
+    state_dir = tempfile.mkdtemp()
+    return dict(os.environ, EVENT_STORE_PATH=os.path.join(state_dir, "events.db"), LOG_LEVEL="WARNING")
+
+
+def import_report(top: int) -> dict:
+    began = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app; app.create_app()"],
+        cwd=BACKEND, env=state_env(), capture_output=True, text=True, check=True
+    ).stderr
+    wall_ms = (time.perf_counter() - began) * 1000
+
+    self_us = defaultdict(int)
+    modules = []
+    for line in output.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:"):
+            continue
+        self_part, _, name = line[len("import time:"):].split("|")
+        if not self_part.strip().isdigit():
+            continue
+        name = name.strip()
+        modules.append(name)
+        self_us[name.split(".")[0]] += int(self_part)
+
+    heavy = sorted({name for name in modules for heavy in HEAVY_MODULES
+                    if name == heavy or name.startswith(heavy + ".")})
+    ranked = sorted(self_us.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "interpreter_wall_ms": wall_ms,
+        "imports_ms": sum(self_us.values()) / 1000,
+        "modules": len(modules),
+        "top_packages_ms": {name: us / 1000 for name, us in ranked[:top]},
+        "heavy_imported": heavy,
+    }
+
+
+def time_to_first_request() -> float:
+    port = free_port()
+    began = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:create_app", "--factory", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=state_env()
+    )
+    try:
+        # Poll with bare connects: building an HTTP client per attempt would
+        # steal CPU from the server that is starting up
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.005)
+        else:
+            raise SystemExit("uvicorn did not listen within 60s")
+        response = httpx.post(f"http://127.0.0.1:{port}/chat", json={"message": "Hi"}, timeout=10)
+        response.raise_for_status()
+        return (time.perf_counter() - began) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="median time to first /chat response")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = import_report(args.top)
+    print(f"import app + create_app(): {report['imports_ms']:.0f} ms in imports across {report['modules']} modules "
+          f"({report['interpreter_wall_ms']:.0f} ms interpreter wall time)")
+    for name, ms in report["top_packages_ms"].items():
+        print(f"  {name:<28}{ms:8.1f} ms")
+    if report["heavy_imported"]:
+        print("Heavy SDKs imported at startup: " + ", ".join(report["heavy_imported"]))
+    else:
+        print("No heavy SDKs imported at startup")
+
+    samples = [time_to_first_request() for _ in range(args.runs)]
+    report["time_to_first_request_ms"] = samples
+    median = statistics.median(samples)
+    print(f"time to first /chat response: median {median:.0f} ms, min {min(samples):.0f} ms, "
+          f"max {max(samples):.0f} ms over {args.runs} cold starts (budget {args.budget_ms:.0f} ms)")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Report written to {args.output}")
+
+    failures = []
+    if report["heavy_imported"]:
+        failures.append("heavy SDK imported at startup")
+    if median > args.budget_ms:
+        failures.append(f"time to first request {median:.0f} ms over budget")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
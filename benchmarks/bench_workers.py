@@ -0,0 +1,192 @@
+"""
+Throughput and booking correctness across uvicorn worker processes.
+
+For each worker count, starts ``uvicorn app:app --workers N`` on localhost
+with a fresh event store and SHARED_STATE_PATH, then:
+
+1. drives a /chat + /availability mix from several client processes and
+   reports requests per second (and the speed-up over one worker);
+2. fires concurrent /book calls for a handful of contested slots and checks
+   that exactly one booking per slot succeeded and no stored events overlap;
+3. sends a multi-turn conversation under one session id and checks that every
+   turn was recorded, whichever worker served it.
+
+Scaling needs free cores: with C cores, expect gains up to about C workers
+(the client processes need cores too).
+
+Usage: python benchmarks/bench_workers.py [--workers 1,2,4] [--seconds S] [--clients N]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+
+import httpx  # noqa: E402
+
+MESSAGES = [
+    "Hi there",
+    "What services do you offer?",
+    "I want to book a haircut tomorrow at 2pm",
+    "Are you free next Tuesday afternoon?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, state_dir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        EVENT_STORE_PATH=os.path.join(state_dir, "events.db"),
+        SHARED_STATE_PATH=os.path.join(state_dir, "shared.db"),
+        LOG_LEVEL="WARNING",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND, env=env
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+            # Give the remaining workers time to come up too
+            time.sleep(0.5 * workers)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("uvicorn did not start")
+
+
+async def client_load(base_url: str, seconds: float, concurrency: int, client_index: int) -> int:
+    completed = 0
+    deadline = time.perf_counter() + seconds
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker(worker_index: int):
+            nonlocal completed
+            index = worker_index
+            while time.perf_counter() < deadline:
+                if index % 4 == 3:
+                    start = day + timedelta(days=index % 14)
+                    response = await client.get("/availability", params={
+                        "start_date": start.isoformat(),
+                        "end_date": (start + timedelta(days=1)).isoformat(),
+                    })
+                else:
+                    response = await client.post("/chat", json={
+                        "message": MESSAGES[index % len(MESSAGES)],
+                        "session_id": f"load-{client_index}-{worker_index}",
+                    })
+                response.raise_for_status()
+                completed += 1
+                index += concurrency
+
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return completed
+
+
+def run_client(args):
+    base_url, seconds, concurrency, client_index = args
+    return asyncio.run(client_load(base_url, seconds, concurrency, client_index))
+
+
+async def contested_bookings(base_url: str, requests: int, slots: int):
+    base = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=30)
+    payloads = []
+    for index in range(requests):
+        start = base + timedelta(hours=index % slots % 8, days=index % slots // 8)
+        payloads.append({
+            "title": f"Contested booking {index}",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+        })
+    limits = httpx.Limits(max_connections=requests)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        responses = await asyncio.gather(*(client.post("/book", json=payload) for payload in payloads))
+        events = (await client.get("/events", params={
+            "start_date": (base - timedelta(days=1)).isoformat(),
+            "end_date": (base + timedelta(days=30)).isoformat(),
+        })).json()["events"]
+    statuses = [response.status_code for response in responses]
+    intervals = sorted(
+        (datetime.fromisoformat(event["start"]["dateTime"]), datetime.fromisoformat(event["end"]["dateTime"]))
+        for event in events
+    )
+    overlaps = sum(1 for (_, prev_end), (start, _) in zip(intervals, intervals[1:]) if start < prev_end)
+    return statuses.count(200), statuses.count(409), len(events), overlaps
+
+
+async def conversation(base_url: str, turns: int, state_dir: str) -> int:
+    from session_store import SharedSessionStore
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for turn in range(turns):
+            response = await client.post("/chat", json={"message": f"Hi, turn {turn}", "session_id": "shared-session"})
+            response.raise_for_status()
+    session = SharedSessionStore(os.path.join(state_dir, "shared.db"), max_history=turns).get("shared-session")
+    return len(session.history) if session else 0
+
+
+def run(workers: int, args, baseline):
+    port = free_port()
+    state_dir = tempfile.mkdtemp()
+    server = start_server(workers, port, state_dir)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        with multiprocessing.Pool(args.clients) as pool:
+            counts = pool.map(run_client, [(base_url, args.seconds, args.concurrency, index)
+                                           for index in range(args.clients)])
+        rate = sum(counts) / args.seconds
+        booked, conflicts, stored, overlaps = asyncio.run(contested_bookings(base_url, args.bookings, args.slots))
+        recorded = asyncio.run(conversation(base_url, args.turns, state_dir))
+    finally:
+        server.terminate()
+        server.wait()
+
+    speedup = rate / baseline if baseline else 1.0
+    print(f"  workers={workers}  {rate:8.1f} req/s  x{speedup:4.2f}   "
+          f"bookings: {booked} booked / {conflicts} conflicts / {stored} stored / {overlaps} overlaps   "
+          f"session turns recorded {recorded}/{args.turns}")
+    assert overlaps == 0, "double booking across workers"
+    assert booked == args.slots and booked + conflicts == args.bookings, "unexpected booking outcome"
+    assert recorded == args.turns, "session turns lost across workers"
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=4, help="client processes generating load")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent requests per client process")
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes x {args.concurrency} concurrent requests, "
+          f"{args.seconds:.0f}s per run")
+    baseline = None
+    for workers in (int(value) for value in args.workers.split(",")):
+        rate = run(workers, args, baseline)
+        baseline = baseline or rate
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Offline stand-in for the Google Calendar v3 events API.
+
+Serves insert (POST), update (PUT) and delete (DELETE) on
+``/calendar/v3/calendars/{calendarId}/events`` with the status codes the
+outbox relies on: 409 for an id that already exists, 404 for an unknown
+event and 410 for one already deleted. Events live in memory.
+
+Every call waits an injectable delay. A fraction of calls (``--error-rate``)
+fail with 503 before doing anything, and a fraction (``--lost-reply-rate``)
+apply the write and then answer 503 anyway, as when a reply is lost on the
+way back. ``GET /stats`` counts calls, errors and rejected duplicate creates;
+``GET /calendar/v3/calendars/{calendarId}/events`` lists what is stored.
+
+Usage: python benchmarks/calendar_stub.py [--port 8200] [--latency-ms 150] [--jitter-ms 50] [--error-rate 0.0] [--lost-reply-rate 0.0]
+Then run the backend with CALENDAR_SYNC_URL=http://127.0.0.1:8200/calendar/v3
+"""
+
+import argparse
+import asyncio
+import random
+from typing import Any, Dict
+
+from fastapi import FastAPI, HTTPException, Response
+
+PREFIX = "/calendar/v3/calendars/{calendar_id}/events"
+
+
+def create_stub(latency_ms: float, jitter_ms: float, error_rate: float, lost_reply_rate: float, seed: int = 0) -> FastAPI:
+    stub = FastAPI(title="Calendar stub")
+    rng = random.Random(seed)
+    events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    deleted = set()
+    counts = {"calls": 0, "errors": 0, "lost_replies": 0, "inserts": 0, "updates": 0, "deletes": 0, "conflicts": 0}
+
+    async def call(apply):
+        counts["calls"] += 1
+        await asyncio.sleep((latency_ms + rng.uniform(0, jitter_ms)) / 1000)
+        if rng.random() < error_rate:
+            counts["errors"] += 1
+            raise HTTPException(status_code=503, detail="Backend Error")
+        result = apply()
+        if rng.random() < lost_reply_rate:
+            counts["lost_replies"] += 1
+            raise HTTPException(status_code=503, detail="Backend Error")
+        return result
+
+    @stub.post(PREFIX)
+    async def insert(calendar_id: str, body: Dict[str, Any]):
+        def apply():
+            calendar = events.setdefault(calendar_id, {})
+            if body["id"] in calendar or (calendar_id, body["id"]) in deleted:
+                counts["conflicts"] += 1
+                raise HTTPException(status_code=409, detail="The requested identifier already exists.")
+            calendar[body["id"]] = body
+            counts["inserts"] += 1
+            return body
+        return await call(apply)
+
+    @stub.put(PREFIX + "/{event_id}")
+    async def update(calendar_id: str, event_id: str, body: Dict[str, Any]):
+        def apply():
+            calendar = events.get(calendar_id, {})
+            if event_id not in calendar:
+                raise HTTPException(status_code=410 if (calendar_id, event_id) in deleted else 404, detail="Not Found")
+            calendar[event_id] = {**body, "id": event_id}
+            counts["updates"] += 1
+            return calendar[event_id]
+        return await call(apply)
+
+    @stub.delete(PREFIX + "/{event_id}")
+    async def delete(calendar_id: str, event_id: str):
+        def apply():
+            calendar = events.get(calendar_id, {})
+            if event_id not in calendar:
+                raise HTTPException(status_code=410 if (calendar_id, event_id) in deleted else 404, detail="Not Found")
+            del calendar[event_id]
+            deleted.add((calendar_id, event_id))
+            counts["deletes"] += 1
+            return Response(status_code=204)
+        return await call(apply)
+
+    @stub.get(PREFIX)
+    async def list_events(calendar_id: str):
+        return {"kind": "calendar#events", "items": list(events.get(calendar_id, {}).values())}
+
+    @stub.get("/stats")
+    async def stats():
+        return counts
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="fixed delay per call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered 503 without applying")
+    parser.add_argument("--lost-reply-rate", type=float, default=0.0, help="fraction of calls applied, then answered 503")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = create_stub(args.latency_ms, args.jitter_ms, args.error_rate, args.lost_reply_rate)
+    uvicorn.run(stub, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
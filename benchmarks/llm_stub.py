@@ -0,0 +1,107 @@
+"""
+Offline stand-in for an OpenAI-compatible chat model.
+
+Serves ``POST /v1/chat/completions`` for the LLM fallback's batched prompt:
+it reads the numbered messages and answers {"results": [...]} using a small
+synonym table, after an injectable delay and with an injectable error rate.
+It also counts the calls and messages it received at ``GET /stats``.
+
+Usage: python benchmarks/llm_stub.py [--port 8100] [--latency-ms 300] [--per-message-ms 5] [--jitter-ms 50] [--error-rate 0.0]
+Then run the backend with LLM_FALLBACK_URL=http://127.0.0.1:8100/v1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, HTTPException
+
+SERVICE_WORDS = {
+    "haircut": ("haircut", "trim", "cut", "fade", "bob", "chop"),
+    "styling": ("styling", "blowout", "blow dry", "updo", "style", "curls"),
+    "coloring": ("coloring", "colour", "color", "dye", "highlights", "balayage", "bleach", "roots"),
+    "consultation": ("consultation", "consult", "advice"),
+}
+INTENT_WORDS = [
+    ("booking", ("squeeze me in", "fit me in", "come in", "get a", "need a", "want a", "like a", "sort out", "pop in")),
+    ("availability", ("opening", "openings", "space", "gap", "room", "when are you", "any time")),
+    ("service", ("menu", "what can you do", "treatments", "offer")),
+    ("greeting", ("yo", "hiya", "howdy", "greetings", "morning", "evening")),
+]
+WHEN_PATTERN = re.compile(
+    r"\b(?:today|tonight|tomorrow|(?:next |this )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|week)"
+    r"|(?:at )?\d{1,2}(?::\d{2})?\s*(?:am|pm))\b"
+)
+
+
+def has_word(text: str, phrase: str) -> bool:
+    return re.search(rf"\b{re.escape(phrase)}\b", text) is not None
+
+
+def classify(message: str) -> Dict[str, Optional[str]]:
+    text = message.lower()
+    service = next((name for name, words in SERVICE_WORDS.items() if any(has_word(text, w) for w in words)), None)
+    when = " ".join(WHEN_PATTERN.findall(text)) or None
+    intent = next((name for name, words in INTENT_WORDS if any(has_word(text, w) for w in words)), None)
+    if intent is None:
+        intent = "booking" if service and when else "general"
+    return {"intent": intent, "service": service, "when": when}
+
+
+def create_stub(latency_ms: float, per_message_ms: float, jitter_ms: float, error_rate: float, seed: int = 0) -> FastAPI:
+    stub = FastAPI(title="LLM stub")
+    rng = random.Random(seed)
+    counts = {"calls": 0, "messages": 0, "errors": 0}
+
+    @stub.post("/v1/chat/completions")
+    async def completions(body: Dict[str, Any]):
+        prompt = body["messages"][-1]["content"]
+        messages = []
+        for line in prompt.splitlines():
+            number, _, text = line.partition(". ")
+            messages.append((int(number), json.loads(text)))
+        counts["calls"] += 1
+        counts["messages"] += len(messages)
+        await asyncio.sleep((latency_ms + per_message_ms * len(messages) + rng.uniform(0, jitter_ms)) / 1000)
+        if rng.random() < error_rate:
+            counts["errors"] += 1
+            raise HTTPException(status_code=503, detail="stub overloaded")
+        results = [{"index": index, **classify(text)} for index, text in messages]
+        return {
+            "object": "chat.completion",
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps({"results": results})},
+            }],
+        }
+
+    @stub.get("/stats")
+    async def stats():
+        return counts
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fixed delay per call")
+    parser.add_argument("--per-message-ms", type=float, default=5.0, help="extra delay per message in a batch")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = create_stub(args.latency_ms, args.per_message_ms, args.jitter_ms, args.error_rate)
+    uvicorn.run(stub, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
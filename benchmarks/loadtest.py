@@ -0,0 +1,320 @@
+"""
+Load test for the FastAPI app.
+
+Replays a weighted mix of /chat messages, /availability range queries and
+/book calls at a fixed concurrency, either in-process through an ASGI
+transport (no network) or against uvicorn on localhost. After a warmup the
+load is replayed in several trials, each with fresh requests; the report shows
+the median of the trials for throughput and p50/p95/p99 latency per endpoint.
+Results can be saved as JSON and compared against a saved baseline, exiting
+non-zero on a regression: a metric only counts as regressed when its median
+and every single trial are past the threshold, so one noisy trial cannot fail
+the run.
+
+Usage:
+  python benchmarks/loadtest.py [--target asgi|http] [--requests N] [--concurrency N]
+                                [--repeats N] [--mix chat=70,availability=20,book=10] [--seed N]
+                                [--output run.json] [--baseline base.json]
+                                [--max-latency-regression PCT] [--max-throughput-regression PCT]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("EVENT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "events.db"))
+
+import httpx  # noqa: E402
+
+import app as backend_app  # noqa: E402
+
+CHAT_MESSAGES = [
+    "Hi there",
+    "Hello, what services do you offer?",
+    "I want to book a haircut",
+    "Can I book a haircut tomorrow at 2pm?",
+    "I'd like hair coloring next Tuesday afternoon",
+    "Are you available on Friday morning?",
+    "What times are free tomorrow?",
+    "How much is a consultation?",
+    "Book me a styling appointment at 10:30am on Thursday",
+    "Thanks, that's all",
+]
+DURATIONS = [30, 60, 90, 120]
+# Allowed statuses per endpoint: a booking conflict (409) is an expected outcome
+EXPECTED_STATUS = {"chat": {200}, "availability": {200}, "book": {200, 409}}
+PERCENTILES = (50, 95, 99)
+
+Request = Tuple[str, str, str, Dict[str, Any]]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in EXPECTED_STATUS:
+            raise SystemExit(f"unknown endpoint in mix: {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+def build_requests(count: int, mix: Dict[str, float], seed: int) -> List[Request]:
+    """Deterministic list of (kind, method, path, kwargs) for the run"""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    requests = []
+    for index, kind in enumerate(kinds):
+        if kind == "chat":
+            requests.append((kind, "POST", "/chat", {"json": {
+                "message": rng.choice(CHAT_MESSAGES),
+                "session_id": f"load-{rng.randrange(1000)}",
+            }}))
+        elif kind == "availability":
+            start = today + timedelta(days=rng.randrange(1, 30))
+            requests.append((kind, "GET", "/availability", {"params": {
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=rng.choice([1, 1, 3, 7]))).isoformat(),
+                "duration_minutes": rng.choice(DURATIONS),
+            }}))
+        else:
+            start = today + timedelta(days=rng.randrange(1, 60), hours=rng.randrange(9, 17),
+                                      minutes=rng.choice([0, 30]))
+            requests.append((kind, "POST", "/book", {"json": {
+                "title": f"Load test booking {index}",
+                "description": "loadtest",
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=rng.choice(DURATIONS))).isoformat(),
+            }}))
+    return requests
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(ordered, pct) * 1000
+    return summary
+
+
+async def run_load(client: httpx.AsyncClient, requests: List[Request], concurrency: int) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {kind: [] for kind in EXPECTED_STATUS}
+    errors: Dict[str, int] = {kind: 0 for kind in EXPECTED_STATUS}
+    queue = iter(requests)
+
+    async def worker():
+        for kind, method, path, kwargs in queue:
+            began = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code in EXPECTED_STATUS[kind]
+            except httpx.HTTPError:
+                ok = False
+            latencies[kind].append(time.perf_counter() - began)
+            if not ok:
+                errors[kind] += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+
+    endpoints = {
+        kind: summarize(values, errors[kind], elapsed) for kind, values in latencies.items() if values
+    }
+    overall = summarize([v for values in latencies.values() for v in values], sum(errors.values()), elapsed)
+    return {"elapsed_s": elapsed, "overall": overall, "endpoints": endpoints}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """uvicorn in its own process, so client and server do not share a GIL"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND, env=dict(os.environ, LOG_LEVEL="WARNING")
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("uvicorn did not start")
+
+
+def median_result(trials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-metric median across trials (each trial's summaries share the same keys)"""
+    def median_of(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {key: statistics.median(summary[key] for summary in summaries) for key in summaries[0]}
+
+    endpoints = {
+        kind: median_of([trial["endpoints"][kind] for trial in trials if kind in trial["endpoints"]])
+        for kind in EXPECTED_STATUS if any(kind in trial["endpoints"] for trial in trials)
+    }
+    return {
+        "elapsed_s": statistics.median(trial["elapsed_s"] for trial in trials),
+        "overall": median_of([trial["overall"] for trial in trials]),
+        "endpoints": endpoints,
+        "trials": trials,
+    }
+
+
+async def execute(args, warmup: List[Request], trials: List[List[Request]]) -> Dict[str, Any]:
+    if args.target == "http":
+        port = free_port()
+        server = start_server(port)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30)
+    else:
+        server = None
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=backend_app.app), base_url="http://loadtest")
+    try:
+        async with client:
+            if warmup:
+                await run_load(client, warmup, args.concurrency)
+            results = [await run_load(client, requests, args.concurrency) for requests in trials]
+            return median_result(results)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def print_report(result: Dict[str, Any]):
+    config = result["config"]
+    print(f"{config['requests']} requests x {config['repeats']} trials via {config['target']}, "
+          f"concurrency {config['concurrency']}, mix {config['mix']} (median of trials)")
+    print(f"  {'endpoint':<13}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        print(f"  {name:<13}{stats['requests']:>9}{stats['errors']:>8}{stats['throughput_rps']:>10.1f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+
+def percent_change(value: float, before: float) -> float:
+    return (value / before - 1) * 100 if before else 0.0
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], max_latency: float, max_throughput: float) -> List[str]:
+    """Regressions beyond the thresholds (percent) against the baseline's medians
+
+    A metric is flagged only when the median and every trial are past the
+    threshold; a single slow trial shows up as noise, not as a regression.
+    """
+    failures = []
+    current = dict(result["endpoints"], overall=result["overall"])
+    previous = dict(baseline["endpoints"], overall=baseline["overall"])
+    trials = [dict(trial["endpoints"], overall=trial["overall"]) for trial in result.get("trials", [])]
+    print(f"Compared with baseline from {baseline.get('timestamp', 'unknown')}:")
+    for name, stats in current.items():
+        if name not in previous:
+            continue
+        before = previous[name]
+        runs = [trial[name] for trial in trials if name in trial] or [stats]
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            change = percent_change(stats[metric], before[metric])
+            flag = change > max_latency and all(
+                percent_change(run[metric], before[metric]) > max_latency for run in runs
+            )
+            print(f"  {name:<13}{metric:<16}{before[metric]:>9.2f} -> {stats[metric]:>9.2f}  {change:+6.1f}%"
+                  f"{'  REGRESSION' if flag else ''}")
+            if flag:
+                failures.append(f"{name} {metric} +{change:.1f}%")
+        change = percent_change(stats["throughput_rps"], before["throughput_rps"])
+        flag = -change > max_throughput and all(
+            -percent_change(run["throughput_rps"], before["throughput_rps"]) > max_throughput for run in runs
+        )
+        print(f"  {name:<13}{'throughput_rps':<16}{before['throughput_rps']:>9.1f} -> "
+              f"{stats['throughput_rps']:>9.1f}  {change:+6.1f}%{'  REGRESSION' if flag else ''}")
+        if flag:
+            failures.append(f"{name} throughput {change:.1f}%")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=200, help="requests replayed before measuring")
+    parser.add_argument("--repeats", type=int, default=5, help="measured trials; the report uses their median")
+    parser.add_argument("--mix", default="chat=70,availability=20,book=10")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    # Single trials of the default run swing by up to ~30% in latency and ~15% in
+    # throughput on a quiet machine; the medians move less
+    parser.add_argument("--max-latency-regression", type=float, default=25.0, help="percent")
+    parser.add_argument("--max-throughput-regression", type=float, default=15.0, help="percent")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    mix = parse_mix(args.mix)
+    requests = build_requests(args.warmup + args.repeats * args.requests, mix, args.seed)
+    trials = [
+        requests[args.warmup + trial * args.requests:args.warmup + (trial + 1) * args.requests]
+        for trial in range(args.repeats)
+    ]
+    result = asyncio.run(execute(args, requests[:args.warmup], trials))
+    result["config"] = {
+        "target": args.target,
+        "requests": args.requests,
+        "repeats": args.repeats,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "seed": args.seed,
+    }
+    result["timestamp"] = datetime.now().isoformat(timespec="seconds")
+    result["python"] = platform.python_version()
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        failures = compare(result, baseline, args.max_latency_regression, args.max_throughput_regression)
+        if failures:
+            print("Regressions: " + "; ".join(failures))
+            sys.exit(1)
+        print("No regressions beyond thresholds")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,11 @@ Streamlit frontend for TailorTalk AI booking agent.
 
 import streamlit as st
 import requests
+import base64
 import json
+import uuid
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Configure Streamlit page
 st.set_page_config(
@@ -19,6 +21,58 @@ st.set_page_config(
 # Backend API base URL
 API_BASE_URL = "http://localhost:8000"
 
+# Slots fetched per page in the sidebar availability check
+SIDEBAR_SLOT_PAGE_SIZE = 10
+
+# Minutes per cell in the sidebar occupancy grid
+OVERVIEW_CELL_MINUTES = 60
+
+# Connections to the backend kept open and reused across chat turns and reruns
+HTTP_POOL_SIZE = 10
+
+# Seconds a sidebar availability check is reused for the same date range
+AVAILABILITY_CACHE_SECONDS = 30
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """HTTP session with a connection pool, shared by every rerun and browser session"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=AVAILABILITY_CACHE_SECONDS, show_spinner=False)
+def fetch_availability(start_date: str, end_date: str) -> Dict[str, Any]:
+    """First page of hour-long free slots in a date range (errors raise, so they are not cached)"""
+    response = get_http_session().get(
+        f"{API_BASE_URL}/availability",
+        params={
+            "start_date": start_date,
+            "end_date": end_date,
+            "duration_minutes": 60,
+            "limit": SIDEBAR_SLOT_PAGE_SIZE
+        },
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=AVAILABILITY_CACHE_SECONDS, show_spinner=False)
+def fetch_availability_grid(start_date: str, end_date: str) -> Dict[str, Any]:
+    """Packed occupancy grid for a date range (errors raise, so they are not cached)"""
+    response = get_http_session().get(
+        f"{API_BASE_URL}/availability/grid",
+        params={
+            "start_date": start_date,
+            "end_date": end_date,
+            "cell_minutes": OVERVIEW_CELL_MINUTES
+        },
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()
+
 def init_session_state():
     """Initialize session state variables"""
     if "messages" not in st.session_state:
@@ -29,29 +83,22 @@ def init_session_state():
             }
         ]
     if "session_id" not in st.session_state:
-        st.session_state.session_id = "default"
+        st.session_state.session_id = str(uuid.uuid4())
     if "booking_in_progress" not in st.session_state:
         st.session_state.booking_in_progress = None
+    if "booking_idempotency_key" not in st.session_state:
+        st.session_state.booking_idempotency_key = None
 
 def send_chat_message(message: str) -> Dict[str, Any]:
     """Send a chat message to the backend"""
     try:
-        # Prepare conversation history
-        conversation_history = []
-        for i in range(0, len(st.session_state.messages) - 1, 2):
-            if i + 1 < len(st.session_state.messages):
-                conversation_history.append({
-                    "user": st.session_state.messages[i].get("content", ""),
-                    "assistant": st.session_state.messages[i + 1].get("content", "")
-                })
-        
+        # The backend keeps the conversation for this session id
         payload = {
             "message": message,
-            "session_id": st.session_state.session_id,
-            "conversation_history": conversation_history[-5:]  # Last 5 exchanges
+            "session_id": st.session_state.session_id
         }
         
-        response = requests.post(
+        response = get_http_session().post(
             f"{API_BASE_URL}/chat",
             json=payload,
             timeout=30
@@ -77,16 +124,20 @@ def send_chat_message(message: str) -> Dict[str, Any]:
             "requires_confirmation": False
         }
 
-def book_appointment(booking_data: Dict[str, Any]) -> Dict[str, Any]:
+def book_appointment(booking_data: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
     """Book an appointment using the backend API"""
     try:
-        response = requests.post(
+        # Retries with the same key replay the first result instead of booking twice
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        response = get_http_session().post(
             f"{API_BASE_URL}/book",
             json=booking_data,
+            headers=headers,
             timeout=30
         )
         
-        if response.status_code == 200:
+        # 409 carries a structured conflict with alternative slots
+        if response.status_code in (200, 409):
             return response.json()
         else:
             return {
@@ -125,6 +176,21 @@ def display_suggested_times(suggested_times: List[str]):
                     
                     st.rerun()
 
+def display_availability_grid(start_date, end_date):
+    """Show one row of free/busy cells per working day"""
+    try:
+        grid = fetch_availability_grid(start_date.isoformat(), end_date.isoformat())
+    except requests.exceptions.RequestException:
+        return
+    cells = grid["cells_per_day"]
+    row_bytes = (cells + 7) // 8
+    packed = base64.b64decode(grid["grid"])
+    st.caption(f"From {grid['day_start']}, {grid['cell_minutes']} min per cell (🟩 free, ⬜ booked)")
+    for index, day in enumerate(grid["days"]):
+        row = int.from_bytes(packed[index * row_bytes:(index + 1) * row_bytes], "little")
+        cells_text = "".join("🟩" if row >> cell & 1 else "⬜" for cell in range(cells))
+        st.text(f"{datetime.fromisoformat(day).strftime('%a %d')} {cells_text}")
+
 def display_chat_message(message: Dict[str, str]):
     """Display a chat message with proper styling"""
     with st.chat_message(message["role"]):
@@ -162,6 +228,8 @@ def main():
                 }
             ]
             st.session_state.booking_in_progress = None
+            # Start a fresh server-side session as well
+            st.session_state.session_id = str(uuid.uuid4())
             st.rerun()
         
         # Calendar view section
@@ -176,30 +244,23 @@ def main():
         
         if st.button("Check Availability"):
             try:
-                response = requests.get(
-                    f"{API_BASE_URL}/availability",
-                    params={
-                        "start_date": start_date.isoformat(),
-                        "end_date": end_date.isoformat(),
-                        "duration_minutes": 60
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    available_slots = data.get("available_slots", [])
-                    
-                    if available_slots:
-                        st.success(f"Found {len(available_slots)} available slots!")
-                        for slot in available_slots[:5]:  # Show first 5
-                            start_time = datetime.fromisoformat(slot["start"])
-                            st.write(f"• {start_time.strftime('%b %d, %Y at %I:%M %p')}")
-                    else:
-                        st.warning("No available slots found in this date range.")
-                else:
-                    st.error("Failed to check availability.")
+                data = fetch_availability(start_date.isoformat(), end_date.isoformat())
+            except requests.exceptions.HTTPError:
+                st.error("Failed to check availability.")
             except Exception as e:
                 st.error(f"Error checking availability: {e}")
+            else:
+                available_slots = data.get("available_slots", [])
+                
+                if available_slots:
+                    more = " (and more)" if data.get("next_cursor") else ""
+                    st.success(f"Next {len(available_slots)} available slots{more}:")
+                    for slot in available_slots:
+                        start_time = datetime.fromisoformat(slot["start"])
+                        st.write(f"• {start_time.strftime('%b %d, %Y at %I:%M %p')}")
+                else:
+                    st.warning("No available slots found in this date range.")
+                display_availability_grid(start_date, end_date)
     
     # Main chat interface
     st.header("💬 Chat with TailorTalk")
@@ -235,16 +296,26 @@ def main():
             # Handle booking confirmation
             if response.get("requires_confirmation") and response.get("booking_data"):
                 st.session_state.booking_in_progress = response["booking_data"]
+                st.session_state.booking_idempotency_key = str(uuid.uuid4())
                 
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("✅ Confirm Booking", type="primary"):
-                        booking_result = book_appointment(st.session_state.booking_in_progress)
+                        booking_result = book_appointment(
+                            st.session_state.booking_in_progress,
+                            st.session_state.booking_idempotency_key
+                        )
                         if booking_result.get("success"):
                             st.success(booking_result["message"])
+                            # The cached availability no longer shows the slot just taken
+                            fetch_availability.clear()
+                            fetch_availability_grid.clear()
                             st.session_state.booking_in_progress = None
                         else:
                             st.error(booking_result["message"])
+                            for slot in booking_result.get("alternative_slots", []):
+                                start_time = datetime.fromisoformat(slot["start"])
+                                st.write(f"• Try {start_time.strftime('%b %d, %Y at %I:%M %p')}")
                         st.rerun()
                 
                 with col2: